@@ -1,28 +1,66 @@
+import time
+# Measured first so the startup log can report how long app imports took
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
 from flask import Flask, jsonify, request, g
-from app.extensions import db, migrate, cache, register_db_event_listeners
+from app.extensions import db, cache, init_migrate, register_db_event_listeners
+from app.cli import register_commands
 from app.routes import register_routes
+from app.services.database import TimedQueuePool, connection_manager
+from app.services.jobs import job_manager
+from app.services.metrics import observe_request
+from app.services.request_profiler import request_profiler
+from app.services.pipeline import pipeline_scheduler
+from app.services.system_monitor import system_monitor
+from app.utils.compression import compress_response
+from app.utils.json_provider import ORJSONProvider
+from app.utils.log import configure_logging, start_listener
+from app.utils.process import under_gunicorn
 from config import Config
 from flask_cors import CORS
-import time
 from datetime import datetime
 
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+@contextmanager
+def _startup_phase(timings, name):
+    """Record how long one step of create_app took, in milliseconds."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
 def create_app(config_name=None):
     """
     Application factory pattern for creating Flask app instances.
     """
-    app = Flask(__name__)
-    app.config.from_object(Config)
-    setup_logging(app)
-    initialize_extensions(app)
-    register_middlewares(app)
-    register_routes(app)
-    register_app_routes(app)
-    register_shutdown_handlers(app)
+    timings = {"imports": round(_IMPORT_SECONDS * 1000, 2)}
+    with _startup_phase(timings, "config"):
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        if app.config.get('JSON_PROVIDER') == 'orjson':
+            app.json = ORJSONProvider(app)
+    with _startup_phase(timings, "logging"):
+        setup_logging(app)
+    with _startup_phase(timings, "extensions"):
+        initialize_extensions(app)
+    with _startup_phase(timings, "middlewares"):
+        register_middlewares(app)
+    with _startup_phase(timings, "routes"):
+        register_routes(app)
+        register_app_routes(app)
+        register_commands(app)
+    with _startup_phase(timings, "shutdown_handlers"):
+        register_shutdown_handlers(app)
+    timings["total"] = round(sum(timings.values()), 2)
+    app.extensions["startup_timings_ms"] = timings
     logger = logging.getLogger(__name__)
-    logger.info(f"Flask app created successfully in {app.config.get('ENV', 'unknown')} mode")
+    logger.info(f"Flask app created successfully in {app.config.get('ENV', 'unknown')} mode "
+                f"in {timings['total']}ms ({', '.join(f'{k}={v}ms' for k, v in timings.items() if k != 'total')})")
     return app
 
 def setup_logging(app):
@@ -30,34 +68,13 @@ def setup_logging(app):
     Setup production-ready logging configuration.
     """
     log_level = getattr(logging, app.config.get('LOG_LEVEL', 'INFO').upper())
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-
-    file_handler = RotatingFileHandler(
-        'logs/stock_analytics.log',
-        maxBytes=10240000,
-        backupCount=10
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s %(name)s %(threadName)s : %(message)s'
-    ))
-    file_handler.setLevel(log_level)
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-    console_handler.setLevel(log_level)
-    logging.basicConfig(
-        level=log_level,
-        handlers=[file_handler, console_handler],
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    configure_logging(
+        log_level,
+        rate=app.config.get('LOG_RATE_LIMIT_PER_SECOND', 0),
+        burst=app.config.get('LOG_RATE_LIMIT_BURST', 50)
     )
-    logging.getLogger('werkzeug').setLevel(logging.WARNING)
-    logging.getLogger('urllib3').setLevel(logging.WARNING)
-    if app.logger.hasHandlers():
-        app.logger.handlers.clear()
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(console_handler)
+    # app.logger propagates to the root queue handler
+    app.logger.handlers.clear()
     app.logger.setLevel(log_level)
 
 def initialize_extensions(app):
@@ -67,12 +84,22 @@ def initialize_extensions(app):
     logger = logging.getLogger(__name__)
     
     try:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = dict(
+            app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+            poolclass=TimedQueuePool,
+            pool_logging_name="api"
+        )
         db.init_app(app)
-        migrate.init_app(app, db)
+        # Workers never run migrations; skip loading alembic there
+        if not under_gunicorn():
+            init_migrate(app)
         register_db_event_listeners(app)
         logger.info("Database initialized successfully")
         cache.init_app(app)
         logger.info("Cache initialized successfully")
+        job_manager.init_app(app)
+        pipeline_scheduler.init_app(app)
+        system_monitor.init_app(app)
         CORS(app, 
              origins=app.config.get('CORS_ORIGINS', ['*']),
              methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
@@ -88,6 +115,10 @@ def register_middlewares(app):
     """
     Register application middlewares.
     """
+    if Config.TRUSTED_PROXY_COUNT > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_COUNT)
+
     @app.before_request
     def before_request():
         """Execute before each request."""
@@ -96,12 +127,23 @@ def register_middlewares(app):
         
         app.logger.info(f"Request started - ID: {g.request_id}, "
                        f"Method: {request.method}, Path: {request.path}")
+        if request_profiler.should_profile(request):
+            g.profiler = request_profiler.start()
     
     @app.after_request
     def after_request(response):
         """Execute after each request."""
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            report = request_profiler.finish(profiler, g.start_time, request.method,
+                                             request.path, response.status_code)
+            response.headers['Server-Timing'] = request_profiler.server_timing(report)
+            response.headers['X-Profile-Id'] = report['profile_id']
         if hasattr(g, 'start_time'):
-            duration = round((time.time() - g.start_time) * 1000, 2)
+            elapsed = time.time() - g.start_time
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            observe_request(request.method, route, response.status_code, elapsed)
+            duration = round(elapsed * 1000, 2)
             app.logger.info(f"Request completed - ID: {getattr(g, 'request_id', 'unknown')}, "
                            f"Status: {response.status_code}, Duration: {duration}ms")
         
@@ -110,7 +152,7 @@ def register_middlewares(app):
         response.headers['X-XSS-Protection'] = '1; mode=block'
         response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
         
-        return response
+        return compress_response(response)
     
     @app.teardown_appcontext
     def teardown_db(error):
@@ -134,6 +176,13 @@ def register_app_routes(app):
                 "health": "/v1/health",
                 "detailed_health": "/v1/health/detailed",
                 "analytics": "/v1/analytics/*",
+                "jobs": "/v1/jobs/<job_id>",
+                "history": "/v1/history/<symbol>",
+                "export": "/v1/export/history",
+                "changes": "/v1/changes",
+                "intraday": "/v1/intraday/<symbol>",
+                "pipeline": "/v1/pipeline/runs",
+                "metrics": "/metrics",
                 "updates": "/v1/update_all_symbols"
             }
         })
@@ -143,6 +192,21 @@ def register_app_routes(app):
         """Handle favicon requests."""
         return '', 204
 
+def after_fork():
+    """
+    Reset per-process state in a worker forked from a preloaded master.
+
+    Pooled connections, background threads and executors do not survive a
+    fork (or must not be shared with the parent), so each worker drops the
+    inherited pools and starts its own threads. Called from gunicorn's
+    post_fork hook.
+    """
+    connection_manager.dispose_all(close=False)
+    start_listener()
+    job_manager.after_fork()
+    pipeline_scheduler.after_fork()
+    logging.getLogger(__name__).info(f"Worker {os.getpid()} initialised after fork")
+
 def register_shutdown_handlers(app):
     """
     Register cleanup handlers for graceful shutdown.
@@ -156,21 +220,32 @@ def register_shutdown_handlers(app):
         logger.info("Application shutting down...")
         
         try:
-            db.session.remove()
+            with app.app_context():
+                db.session.remove()
+            connection_manager.dispose_all()
             logger.info("Database connections closed")
         except Exception as e:
             logger.error(f"Error closing database connections: {str(e)}")
         
-        try:
-            cache.clear()
-            logger.info("Cache cleared")
-        except Exception as e:
-            logger.error(f"Error clearing cache: {str(e)}")
+        # Workers come and go under gunicorn (max_requests); don't wipe a
+        # cache the other workers are still using
+        if not under_gunicorn():
+            try:
+                with app.app_context():
+                    cache.clear()
+                logger.info("Cache cleared")
+            except Exception as e:
+                logger.error(f"Error clearing cache: {str(e)}")
         
         logger.info("Application shutdown complete")
     
     atexit.register(cleanup)
     
+    # gunicorn owns SIGTERM/SIGINT (graceful worker shutdown); only install
+    # handlers when running standalone
+    if under_gunicorn():
+        return
+    
     def signal_handler(signum, frame):
         logger = logging.getLogger(__name__)
         logger.info(f"Received signal {signum}, initiating graceful shutdown...")
@@ -0,0 +1,33 @@
+import shutil
+
+import click
+
+from app.services.export import WRITERS, get_export
+from app.services.history import parse_columns, parse_date
+
+
+def register_commands(app):
+    """Register `flask` CLI commands."""
+
+    @app.cli.command("export-history")
+    @click.option("--symbols", default="", help="Comma-separated symbols (default: all).")
+    @click.option("--start", default=None, help="First date, YYYY-MM-DD.")
+    @click.option("--end", default=None, help="Last date, YYYY-MM-DD.")
+    @click.option("--columns", default=None, help="Comma-separated columns (default: OHLCV).")
+    @click.option("--format", "fmt", type=click.Choice(sorted(WRITERS)), default="arrow")
+    @click.option("--output", "-o", required=True, type=click.Path(dir_okay=False, writable=True))
+    def export_history(symbols, start, end, columns, fmt, output):
+        """Export daily candles as Arrow IPC or NPZ, reusing the server's export cache."""
+        try:
+            export = get_export(
+                fmt,
+                [s.strip().upper() for s in symbols.split(",") if s.strip()] or None,
+                parse_date(start),
+                parse_date(end, end_of_day=True),
+                parse_columns(columns),
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        shutil.copyfile(export["path"], output)
+        source = "cache" if export["cached"] else "database"
+        click.echo(f"Wrote {output} (data version {export['data_version']}, from {source})")
@@ -1,41 +1,40 @@
 from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 import logging
 
 logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
-migrate = Migrate()
 cache = Cache()
 
+def init_migrate(app):
+    """
+    Register Flask-Migrate for the `flask db` commands.
+
+    Flask-Migrate pulls in alembic, which only the CLI needs, so it is
+    imported here rather than at module level.
+    """
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
 def register_db_event_listeners(app):
     """Register SQLAlchemy event listeners once app and db are initialized."""
     from sqlalchemy import event
+    from app.services.database import apply_session_settings, connection_manager
 
     with app.app_context():
         engine = db.engine
+        connection_manager.register_engine("api", engine)
+        settings = connection_manager.profile("api").get("settings", {})
 
         @event.listens_for(engine, "connect")
         def set_postgresql_settings(dbapi_connection, connection_record):
             try:
-                with dbapi_connection.cursor() as cursor:
-                    logger.debug("PostgreSQL connection settings applied")
+                apply_session_settings(dbapi_connection, settings)
+                logger.debug("PostgreSQL connection settings applied")
             except Exception as e:
                 logger.warning(f"Could not set PostgreSQL connection settings: {str(e)}")
 
-        @event.listens_for(engine, "before_cursor_execute")
-        def receive_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-            import time
-            context._query_start_time = time.time()
-
-        @event.listens_for(engine, "after_cursor_execute")
-        def receive_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-            import time
-            total = time.time() - context._query_start_time
-            if total > 1.0:
-                logger.warning(f"Slow query detected: {total:.2f}s - {statement[:100]}...")
-
 class DatabaseManager:
     """Database connection and session management utilities."""
 
@@ -52,6 +51,8 @@ class DatabaseManager:
     @staticmethod
     def get_connection_info():
         """Get PostgreSQL database connection information."""
+        from app.services.database import connection_manager
+
         try:
             engine = db.engine
 
@@ -82,7 +83,8 @@ class DatabaseManager:
                 "checked_out_connections": engine.pool.checkedout(),
                 "total_connections": stats[0] if stats else 'unknown',
                 "active_connections": stats[1] if stats else 'unknown',
-                "idle_connections": stats[2] if stats else 'unknown'
+                "idle_connections": stats[2] if stats else 'unknown',
+                "pools": connection_manager.pool_status()
             }
         except Exception as e:
             logger.error(f"Error getting PostgreSQL database info: {str(e)}")
@@ -21,10 +21,21 @@ class StockSymbol(db.Model):
 
 class HistoricalData1D(db.Model):
     __tablename__ = 'HistoricalData1D'
+    __table_args__ = (
+        # Keyset reads on (symbol, date) served from the index alone
+        db.Index(
+            'ix_HistoricalData1D_symbol_date_covering', 'symbol', 'date',
+            postgresql_include=['openPrice', 'highPrice', 'lowPrice', 'closePrice', 'volume']
+        ),
+        db.Index(
+            'ix_HistoricalData1D_ingestSeq_id', 'ingestSeq', 'id',
+            postgresql_where=db.text('"ingestSeq" IS NOT NULL')
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     symbol = db.Column(db.String, db.ForeignKey('StockSymbol.symbol'), nullable=False)
-    date = db.Column(db.DateTime(timezone=True), nullable=False)
+    date = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
     open_price = db.Column('openPrice', db.Float, nullable=True)
     close_price = db.Column('closePrice', db.Float, nullable=True)
     high_price = db.Column('highPrice', db.Float, nullable=True)
@@ -32,6 +43,9 @@ class HistoricalData1D(db.Model):
     volume = db.Column(db.BigInteger, nullable=True)
     open_interest = db.Column('openInterest', db.BigInteger, nullable=True)
     created_at = db.Column('createdAt', db.DateTime(timezone=True), server_default=db.func.current_timestamp())
+    # Id of the transaction that last wrote the row (set by default and trigger); drives /v1/changes
+    ingest_seq = db.Column('ingestSeq', db.BigInteger, nullable=True,
+                           server_default=db.text('pg_current_xact_id()::text::bigint'))
 
     stock_symbol = db.relationship(
         'StockSymbol',
@@ -39,8 +53,29 @@ class HistoricalData1D(db.Model):
         lazy=True
     )
 
+class HistoricalData1M(db.Model):
+    __tablename__ = 'HistoricalData1M'
+    # Monthly range partitions on ts, created by app.services.intraday.
+    # Prices are whole paise and the symbol is StockSymbol.id to keep the
+    # ~375 rows per symbol per trading day narrow.
+    __table_args__ = {'postgresql_partition_by': 'RANGE ("ts")'}
+
+    symbol_id = db.Column('symbolId', db.Integer, db.ForeignKey('StockSymbol.id'), primary_key=True)
+    ts = db.Column(db.DateTime(timezone=True), primary_key=True)
+    open_price = db.Column('openPrice', db.Integer, nullable=False)
+    high_price = db.Column('highPrice', db.Integer, nullable=False)
+    low_price = db.Column('lowPrice', db.Integer, nullable=False)
+    close_price = db.Column('closePrice', db.Integer, nullable=False)
+    volume = db.Column(db.BigInteger, nullable=False)
+
 class SMAResult(db.Model):
     __tablename__ = 'SMA_Results'
+    __table_args__ = (
+        db.Index(
+            'ix_SMA_Results_ingestSeq_id', 'ingestSeq', 'id',
+            postgresql_where=db.text('"ingestSeq" IS NOT NULL')
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     symbol = db.Column(db.String, nullable=False)
@@ -50,3 +85,60 @@ class SMAResult(db.Model):
     sma_value = db.Column(db.Float, nullable=False)
     deviation_pct = db.Column(db.Float, nullable=False)
     date_generated = db.Column(db.DateTime(timezone=True), default=db.func.now())
+    ingest_seq = db.Column('ingestSeq', db.BigInteger, nullable=True,
+                           server_default=db.text('pg_current_xact_id()::text::bigint'))
+
+class JobRun(db.Model):
+    __tablename__ = 'JobRun'
+    __table_args__ = (
+        # At most one queued/running job per dedupe key across all workers
+        db.Index(
+            'uq_JobRun_active_dedupeKey', 'dedupeKey',
+            unique=True,
+            postgresql_where=db.text("status IN ('queued', 'running')")
+        ),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    job_type = db.Column('jobType', db.String(64), nullable=False, index=True)
+    dedupe_key = db.Column('dedupeKey', db.String(128), nullable=True)
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    params = db.Column(db.JSON, nullable=True)
+    progress = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    cancel_requested = db.Column('cancelRequested', db.Boolean, nullable=False, default=False)
+    owner = db.Column(db.String(128), nullable=True)
+    lease_expires_at = db.Column('leaseExpiresAt', db.DateTime(timezone=True), nullable=True)
+    created_at = db.Column('createdAt', db.DateTime(timezone=True), server_default=db.func.now())
+    started_at = db.Column('startedAt', db.DateTime(timezone=True), nullable=True)
+    completed_at = db.Column('completedAt', db.DateTime(timezone=True), nullable=True)
+
+class SMACrossResult(db.Model):
+    __tablename__ = 'SMA_Cross_Results'
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String, nullable=False)
+    short_window = db.Column(db.Integer, nullable=False)
+    long_window = db.Column(db.Integer, nullable=False)
+    sma_short = db.Column(db.Float, nullable=False)
+    sma_long = db.Column(db.Float, nullable=False)
+    signal = db.Column(db.String(16), nullable=False)
+    date_generated = db.Column(db.DateTime(timezone=True), default=db.func.now())
+
+class PipelineStageRun(db.Model):
+    __tablename__ = 'PipelineStageRun'
+    __table_args__ = (
+        db.Index('ix_PipelineStageRun_stage_status', 'stage', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column('runId', db.String(32), nullable=False, index=True)
+    stage = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False)
+    fingerprint = db.Column(db.String(128), nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column('startedAt', db.DateTime(timezone=True), nullable=True)
+    completed_at = db.Column('completedAt', db.DateTime(timezone=True), nullable=True)
+    duration_seconds = db.Column('durationSeconds', db.Float, nullable=True)
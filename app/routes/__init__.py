@@ -3,6 +3,14 @@ from flask import jsonify
 from app.routes.health import health_bp
 from app.routes.update import update_bp, bhavupdate_bp
 from app.routes.analytics import analytics_bp
+from app.routes.jobs import jobs_bp
+from app.routes.pipeline import pipeline_bp
+from app.routes.metrics import metrics_bp
+from app.routes.admin import admin_bp
+from app.routes.history import history_bp
+from app.routes.export import export_bp
+from app.routes.changes import changes_bp
+from app.routes.intraday import intraday_bp
 logger = logging.getLogger(__name__)
 def register_routes(app):
     try:
@@ -10,6 +18,15 @@ def register_routes(app):
         app.register_blueprint(update_bp, url_prefix='/v1')
         app.register_blueprint(bhavupdate_bp, url_prefix='/v1')
         app.register_blueprint(analytics_bp, url_prefix='/v1')
+        app.register_blueprint(jobs_bp, url_prefix='/v1')
+        app.register_blueprint(pipeline_bp, url_prefix='/v1')
+        app.register_blueprint(admin_bp, url_prefix='/v1')
+        app.register_blueprint(history_bp, url_prefix='/v1')
+        app.register_blueprint(export_bp, url_prefix='/v1')
+        app.register_blueprint(changes_bp, url_prefix='/v1')
+        app.register_blueprint(intraday_bp, url_prefix='/v1')
+        # Served at the conventional scrape path, outside the versioned API
+        app.register_blueprint(metrics_bp)
         logger.info("All routes registered successfully")
         register_error_handlers(app)
     except Exception as e:
@@ -0,0 +1,76 @@
+from flask import Blueprint, request, jsonify
+from app.services.query_profiler import query_profiler, SORT_KEYS
+from app.services.request_profiler import request_profiler
+from app.utils.auth import require_admin
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/admin/queries', methods=['GET'])
+@require_admin
+def top_queries():
+    """
+    Top statement fingerprints by total time (or ?sort=count|p99_ms|mean_ms|rows).
+    """
+    try:
+        limit = min(int(request.args.get('limit', 20)), 200)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be an integer"}), 400
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in SORT_KEYS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+    queries = query_profiler.top(limit, sort)
+    return jsonify({
+        "queries": queries,
+        "count": len(queries),
+        "since": datetime.utcfromtimestamp(query_profiler.started_at).isoformat()
+    }), 200
+
+@admin_bp.route('/admin/queries', methods=['DELETE'])
+@require_admin
+def reset_queries():
+    """Clear collected statement statistics."""
+    query_profiler.reset()
+    return jsonify({"message": "Query statistics reset"}), 200
+
+@admin_bp.route('/admin/queries/<fingerprint_id>', methods=['GET'])
+@require_admin
+def query_detail(fingerprint_id):
+    """Statistics, slowest statement and captured plan for one fingerprint."""
+    detail = query_profiler.detail(fingerprint_id)
+    if detail is None:
+        return jsonify({"error": "Unknown query fingerprint", "fingerprint_id": fingerprint_id}), 404
+    return jsonify(detail), 200
+
+@admin_bp.route('/admin/queries/<fingerprint_id>/explain', methods=['POST'])
+@require_admin
+def explain_query(fingerprint_id):
+    """Capture EXPLAIN (ANALYZE, BUFFERS) for the fingerprint's slowest execution."""
+    try:
+        plan = query_profiler.explain(fingerprint_id)
+    except KeyError:
+        return jsonify({"error": "Unknown query fingerprint", "fingerprint_id": fingerprint_id}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e), "fingerprint_id": fingerprint_id}), 400
+    except Exception as e:
+        logger.error(f"EXPLAIN failed for query {fingerprint_id}: {str(e)}")
+        return jsonify({"error": "EXPLAIN failed", "message": str(e)}), 500
+    return jsonify(dict(plan, fingerprint_id=fingerprint_id)), 200
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@require_admin
+def list_profiles():
+    """Recently profiled requests with their time split, newest first."""
+    profiles = request_profiler.list()
+    return jsonify({"profiles": profiles, "count": len(profiles)}), 200
+
+@admin_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@require_admin
+def get_profile(profile_id):
+    """Full report, including top functions, for one profiled request."""
+    report = request_profiler.get(profile_id)
+    if report is None:
+        return jsonify({"error": "Profile not found", "profile_id": profile_id}), 404
+    return jsonify(report), 200
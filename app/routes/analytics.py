@@ -1,5 +1,10 @@
-from flask import Blueprint,request, jsonify
+from flask import Blueprint,request, jsonify, url_for
 from app.services.near_sma import update_sma_results, get_stocks_near_sma, backfill_sma_results
+from app.services.jobs import job_manager, JobAlreadyRunning, JobQueueFull
+from app.services.data_version import request_data_version
+from app.services.single_flight import SingleFlightTimeout, single_flight
+from app.services.admission import limit
+from app.utils.http_cache import conditional
 import logging
 import time
 from datetime import datetime
@@ -22,23 +27,83 @@ def validate_sma_parameters(data):
     except (TypeError, ValueError) as e:
         raise ValueError(f"Invalid parameters: {str(e)}")
 
-@analytics_bp.route("/analytics/sma-nearby", methods=["POST"])
+def wants_async(data):
+    """Check whether the client asked for a background job instead of a synchronous result"""
+    value = data.get("async", request.args.get("async", False))
+    return str(value).lower() in ("1", "true", "yes")
+
+def submit_job(job_type, target, parameters, request_id, dedupe_key=None):
+    """Queue a background job and build the 202 response pointing at its status URL"""
+    try:
+        job = job_manager.submit(job_type, target, parameters, dedupe_key=dedupe_key)
+    except JobAlreadyRunning as e:
+        logger.info(f"{job_type} already active - Request ID: {request_id}")
+        existing = e.job or {}
+        return jsonify({
+            "error": "An identical job is already in progress",
+            "status": "rejected",
+            "job_id": existing.get("job_id"),
+            "running_since": existing.get("started_at") or existing.get("created_at"),
+            "request_id": request_id
+        }), 409
+    except JobQueueFull as e:
+        logger.warning(f"Job queue full - Request ID: {request_id}: {str(e)}")
+        return jsonify({
+            "error": "Too many queued jobs",
+            "message": "The job queue is full, please retry later",
+            "request_id": request_id
+        }), 503, {"Retry-After": "30"}
+    logger.info(f"{job_type} queued as job {job['job_id']} - Request ID: {request_id}")
+    return jsonify({
+        "message": "Job accepted",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": url_for("jobs.get_job", job_id=job["job_id"]),
+        "parameters": parameters,
+        "metadata": {
+            "request_id": request_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    }), 202
+
+@analytics_bp.route("/analytics/sma-nearby", methods=["GET", "POST"])
+@conditional(lambda: (*validate_sma_parameters(request.args), wants_async(request.args)))
+@limit("standard")
 def sma_nearby():
-    """Get stocks near SMA without storing in database"""
+    """Get stocks near SMA without storing in database (GET takes query parameters and supports ETags)"""
     request_id = f"sma_nearby_{int(time.time())}"
     logger.info(f"SMA nearby request started - Request ID: {request_id}")
     try:
-        if not request.is_json:
+        if request.method == "GET":
+            data = request.args.to_dict()
+        elif not request.is_json:
             return jsonify({
                 "error": "Content-Type must be application/json",
                 "request_id": request_id
             }), 400
-        data = request.get_json() or {}
+        else:
+            data = request.get_json() or {}
         sma_period, threshold_pct = validate_sma_parameters(data)
+        if wants_async(data):
+            return submit_job(
+                "sma_nearby",
+                lambda job: get_stocks_near_sma(sma_period, threshold_pct, job.report_progress),
+                {"sma_period": sma_period, "threshold_pct": threshold_pct},
+                request_id
+            )
         start_time = time.time()
-        results = get_stocks_near_sma(sma_period, threshold_pct)
+        # Identical concurrent requests against the same data share one scan
+        data_version = request_data_version()
+        if data_version is None:
+            results, shared = get_stocks_near_sma(sma_period, threshold_pct), False
+        else:
+            results, shared = single_flight.do(
+                "sma_nearby",
+                f"{sma_period}:{threshold_pct}:{data_version}",
+                lambda: get_stocks_near_sma(sma_period, threshold_pct, data_version=data_version)
+            )
         processing_time = round(time.time() - start_time, 3)
-        logger.info(f"SMA nearby completed - Request ID: {request_id}, " f"Results: {len(results)}, Time: {processing_time}s")
+        logger.info(f"SMA nearby completed - Request ID: {request_id}, " f"Results: {len(results)}, Time: {processing_time}s, Shared: {shared}")
         return jsonify({
             "data": results,
             "count": len(results),
@@ -49,6 +114,8 @@ def sma_nearby():
             "metadata": {
                 "request_id": request_id,
                 "processing_time_seconds": processing_time,
+                "data_version": data_version,
+                "shared_result": shared,
                 "timestamp": datetime.utcnow().isoformat()
             }
         }), 200
@@ -58,6 +125,12 @@ def sma_nearby():
             "error": str(e),
             "request_id": request_id
         }), 400
+    except SingleFlightTimeout:
+        return jsonify({
+            "error": "Service Unavailable",
+            "message": "An identical request is still being computed, please retry later",
+            "request_id": request_id
+        }), 503, {"Retry-After": "30"}
     except Exception as e:
         logger.error(f"SMA nearby error - Request ID: {request_id}: {str(e)}")
         return jsonify({
@@ -66,6 +139,7 @@ def sma_nearby():
             "request_id": request_id
         }), 500
 @analytics_bp.route("/analytics/smadb", methods=["POST"])
+@limit("heavy")
 def update_sma_database():
     """Calculate and store SMA results in database"""
     request_id = f"sma_update_{int(time.time())}"
@@ -78,6 +152,14 @@ def update_sma_database():
             }), 400
         data = request.get_json() or {}
         sma_period, threshold_pct = validate_sma_parameters(data)
+        if wants_async(data):
+            return submit_job(
+                "sma_update",
+                lambda job: {"records_updated": update_sma_results(sma_period, threshold_pct, job.report_progress)},
+                {"sma_period": sma_period, "threshold_pct": threshold_pct},
+                request_id,
+                dedupe_key=f"sma_update:{sma_period}:{threshold_pct}"
+            )
         start_time = time.time()
         count = update_sma_results(sma_period, threshold_pct)
         processing_time = round(time.time() - start_time, 3)
@@ -110,6 +192,7 @@ def update_sma_database():
         }), 500
     
 @analytics_bp.route("/analytics/smadb/backfill", methods=["POST"])
+@limit("heavy")
 def backfill_sma_database():
     """Backfill SMA results for the past N days"""
     request_id = f"sma_backfill_{int(time.time())}"
@@ -131,6 +214,14 @@ def backfill_sma_database():
                 "error": "Number of days must be a valid integer between 1 and 8",
                 "request_id": request_id
             }), 400
+        if wants_async(data):
+            return submit_job(
+                "sma_backfill",
+                lambda job: backfill_sma_results(sma_period, threshold_pct, days, job.report_progress),
+                {"sma_period": sma_period, "threshold_pct": threshold_pct, "days": days},
+                request_id,
+                dedupe_key=f"sma_backfill:{sma_period}:{threshold_pct}"
+            )
         start_time = time.time()
         backfill_sma_results(sma_period, threshold_pct, days)
         processing_time = round(time.time() - start_time, 3)
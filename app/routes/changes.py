@@ -0,0 +1,44 @@
+from flask import Blueprint, request, jsonify, url_for
+from app.services.changes import current_cursor, fetch_changes, parse_tables
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+changes_bp = Blueprint('changes', __name__)
+
+@changes_bp.route('/changes', methods=['GET'])
+def changes():
+    """
+    Rows of HistoricalData1D and SMA_Results written since a cursor.
+
+    Query parameters: since (cursor from the previous response, or "now"
+    to start tracking from the current position without reading anything),
+    tables (comma-separated: history, sma_results), limit (rows per table).
+
+    Rows written before the change feed existed carry no sequence. A new
+    consumer takes a cursor with ?since=now, seeds itself from
+    /v1/export/history, then polls with the returned next_cursor, applying
+    rows as upserts by id. Keep requesting while has_more is true.
+    """
+    try:
+        tables = parse_tables(request.args.get('tables'))
+        try:
+            limit = int(request.args.get('limit', Config.CHANGES_PAGE_SIZE))
+        except (TypeError, ValueError):
+            raise ValueError("limit must be an integer")
+        if limit <= 0 or limit > Config.CHANGES_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {Config.CHANGES_MAX_PAGE_SIZE}")
+
+        since = request.args.get('since') or None
+        if since == 'now':
+            return jsonify({"tables": {}, "next_cursor": current_cursor(tables), "has_more": False})
+
+        page = fetch_changes(since, tables, limit)
+        next_args = dict(request.args.items(), since=page["next_cursor"])
+        page["next_url"] = url_for('changes.changes', **next_args)
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading change feed: {str(e)}")
+        return jsonify({"error": "Failed to read changes"}), 500
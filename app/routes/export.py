@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify, send_file
+from app.services.admission import limit
+from app.services.export import get_export
+from app.services.history import parse_columns, parse_date
+from app.services.single_flight import SingleFlightTimeout
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+export_bp = Blueprint('export', __name__)
+
+@export_bp.route('/export/history', methods=['GET'])
+@limit('heavy')
+def export_history():
+    """
+    Download daily candles for many symbols as one binary file.
+
+    Query parameters: symbols (comma-separated, default all), start, end,
+    columns, format=arrow (IPC stream, default) or npz (aligned
+    date x symbol matrices). Files are cached per data version.
+    """
+    fmt = request.args.get('format', 'arrow')
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()] or None
+    if symbols and len(symbols) > Config.EXPORT_MAX_SYMBOLS:
+        return jsonify({"error": f"At most {Config.EXPORT_MAX_SYMBOLS} symbols per export"}), 400
+    try:
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'), end_of_day=True)
+        columns = parse_columns(request.args.get('columns'))
+        export = get_export(fmt, symbols, start, end, columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SingleFlightTimeout:
+        return jsonify({"error": "The same export is still being built, please retry later"}), 503, {"Retry-After": "30"}
+    except Exception as e:
+        logger.error(f"History export failed: {str(e)}")
+        return jsonify({"error": "Failed to build export"}), 500
+
+    response = send_file(
+        export["path"],
+        mimetype=export["mimetype"],
+        as_attachment=True,
+        download_name=export["filename"],
+        conditional=True,
+        etag=export["filename"]
+    )
+    response.headers['X-Data-Version'] = export["data_version"]
+    response.headers['X-Export-Cache'] = 'hit' if export["cached"] else 'miss'
+    return response
@@ -1,8 +1,12 @@
-from flask import Blueprint, jsonify
-import psutil
+from flask import Blueprint, current_app, jsonify
 import time
 from datetime import datetime
 import logging
+from app.services.admission import admission_controller
+from app.services.database import connection_manager
+from app.services.system_monitor import system_monitor
+from app.services.trading_calendar import trading_calendar
+from config import Config
 
 logger = logging.getLogger(__name__)
 health_bp = Blueprint('health', __name__)
@@ -19,50 +23,74 @@ def health():
 
 @health_bp.route('/health/detailed', methods=['GET'])
 def detailed_health():
-    """Detailed health check with system metrics"""
+    """Detailed health check answered from the background system sampler"""
     try:
-        # System metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        
-        # Database connection check (you'll need to implement this)
-        # db_status = check_database_connection()
+        sample = system_monitor.latest()
+        if sample is None:
+            return jsonify({
+                "status": "starting",
+                "service": "stock-analytics",
+                "timestamp": datetime.utcnow().isoformat(),
+                "version": "1.0.0",
+                "warnings": ["Health sample not yet available"]
+            }), 200
+        sample_age = round(time.time() - sample["timestamp"], 1)
         
         health_data = {
             "status": "healthy",
             "service": "stock-analytics",
             "timestamp": datetime.utcnow().isoformat(),
             "version": "1.0.0",
+            "sampled_at": datetime.utcfromtimestamp(sample["timestamp"]).isoformat(),
+            "sample_age_seconds": sample_age,
             "system": {
-                "cpu_usage_percent": cpu_percent,
+                "cpu_usage_percent": sample["cpu_percent"],
                 "memory": {
-                    "total_gb": round(memory.total / (1024**3), 2),
-                    "available_gb": round(memory.available / (1024**3), 2),
-                    "used_percent": memory.percent
+                    "total_gb": sample["memory_total_gb"],
+                    "available_gb": sample["memory_available_gb"],
+                    "used_percent": sample["memory_percent"]
                 },
                 "disk": {
-                    "total_gb": round(disk.total / (1024**3), 2),
-                    "free_gb": round(disk.free / (1024**3), 2),
-                    "used_percent": round((disk.used / disk.total) * 100, 2)
+                    "total_gb": sample["disk_total_gb"],
+                    "free_gb": sample["disk_free_gb"],
+                    "used_percent": sample["disk_used_percent"]
+                },
+                "process": {
+                    "cpu_percent": sample["process_cpu_percent"],
+                    "rss_mb": sample["process_rss_mb"]
                 }
             },
             "services": {
-                "database": "healthy",  # You can implement actual DB check
+                "database": "healthy" if sample["database_healthy"] else "unhealthy",
+                "database_check_ms": sample["db_check_ms"],
+                "cache": {True: "healthy", False: "unhealthy", None: "disabled"}[sample["cache_healthy"]],
                 "api": "healthy"
-            }
+            },
+            "database_pools": sample["database_pools"],
+            "database_replica": connection_manager.replica_status(),
+            "admission": admission_controller.status(),
+            "trading_calendar": trading_calendar.status(),
+            "startup_ms": current_app.extensions.get("startup_timings_ms"),
+            "trends": system_monitor.trends()
         }
         
-        # Determine overall health
-        if cpu_percent > 90 or memory.percent > 90:
+        # Only a database outage fails the check; everything else is a warning
+        warnings = []
+        if sample["cpu_percent"] > 90:
+            warnings.append("High CPU usage")
+        if sample["memory_percent"] > 90:
+            warnings.append("High memory usage")
+        if sample["cache_healthy"] is False:
+            warnings.append("Cache unavailable")
+        if sample_age > Config.HEALTH_SAMPLE_SECONDS * 3:
+            warnings.append("Health sample is stale")
+        if warnings:
             health_data["status"] = "degraded"
-            health_data["warnings"] = []
-            if cpu_percent > 90:
-                health_data["warnings"].append("High CPU usage")
-            if memory.percent > 90:
-                health_data["warnings"].append("High memory usage")
+            health_data["warnings"] = warnings
+        if not sample["database_healthy"]:
+            health_data["status"] = "unhealthy"
         
-        status_code = 200 if health_data["status"] == "healthy" else 503
+        status_code = 503 if health_data["status"] == "unhealthy" else 200
         return jsonify(health_data), status_code
         
     except Exception as e:
@@ -72,4 +100,15 @@ def detailed_health():
             "service": "stock-analytics",
             "timestamp": datetime.utcnow().isoformat(),
             "error": "Health check failed"
-        }), 503
\ No newline at end of file
+        }), 503
+
+@health_bp.route('/health/history', methods=['GET'])
+def health_history():
+    """Buffered system samples, oldest first"""
+    system_monitor.ensure_started()
+    samples = system_monitor.history()
+    return jsonify({
+        "samples": samples,
+        "count": len(samples),
+        "interval_seconds": Config.HEALTH_SAMPLE_SECONDS
+    })
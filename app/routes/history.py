@@ -0,0 +1,116 @@
+from flask import Blueprint, Response, request, jsonify, url_for
+from app.services.data_version import current_data_version
+from app.services.history import (
+    fetch_history, parse_columns, parse_date, symbol_exists, to_arrow_ipc
+)
+from app.utils.http_cache import conditional
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+history_bp = Blueprint('history', __name__)
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+def parse_history_args(args):
+    """Validate the shared history query parameters"""
+    try:
+        limit = int(args.get('limit', Config.HISTORY_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit <= 0 or limit > Config.HISTORY_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {Config.HISTORY_MAX_PAGE_SIZE}")
+    start = parse_date(args.get('start'))
+    end = parse_date(args.get('end'), end_of_day=True)
+    if start and end and start > end:
+        raise ValueError("start must not be after end")
+    return {
+        "columns": parse_columns(args.get('columns')),
+        "start": start,
+        "end": end,
+        "limit": limit,
+        "cursor": args.get('cursor') or None,
+    }
+
+def wants_arrow():
+    if request.args.get('format') == 'arrow':
+        return True
+    return request.accept_mimetypes.best == ARROW_MIMETYPE
+
+def history_response(page, endpoint, **values):
+    """Render a page as columnar JSON or Arrow IPC with next-page links"""
+    next_url = None
+    if page["next_cursor"]:
+        next_args = dict(request.args.items(), cursor=page["next_cursor"])
+        next_url = url_for(endpoint, **values, **next_args)
+    if wants_arrow():
+        response = Response(to_arrow_ipc(page), mimetype=ARROW_MIMETYPE)
+        if next_url:
+            response.headers['X-Next-Cursor'] = page["next_cursor"]
+            response.headers['Link'] = f'<{next_url}>; rel="next"'
+    else:
+        response = jsonify({
+            "columns": list(page["columns"]),
+            "data": page["columns"],
+            "count": page["count"],
+            "next_cursor": page["next_cursor"],
+            "next_url": next_url
+        })
+    response.vary.add('Accept')
+    # The ETag names the version the rows were read with
+    response.headers['X-Data-Version'] = page["data_version"]
+    return response
+
+def history_cache_key():
+    return sorted(request.args.items(multi=True)), wants_arrow()
+
+def history_data_version():
+    """Version on the engine history is read from, which may be the replica"""
+    return current_data_version("analytics", read_only=True)
+
+@history_bp.route('/history/<symbol>', methods=['GET'])
+@conditional(history_cache_key, history_data_version)
+def symbol_history(symbol):
+    """
+    Daily candles for one symbol as parallel arrays.
+
+    Query parameters: start, end (YYYY-MM-DD, inclusive), columns
+    (comma-separated), limit, cursor, format=arrow.
+    """
+    symbol = symbol.upper()
+    try:
+        params = parse_history_args(request.args)
+        page = fetch_history([symbol], **params)
+        if page["count"] == 0 and not params["cursor"] and not symbol_exists(symbol):
+            return jsonify({"error": f"Unknown symbol {symbol}"}), 404
+        # Every row is the same symbol; don't repeat it
+        page["columns"].pop("symbol")
+        return history_response(page, 'history.symbol_history', symbol=symbol)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading history for {symbol}: {str(e)}")
+        return jsonify({"error": "Failed to read history"}), 500
+
+@history_bp.route('/history', methods=['GET'])
+@conditional(history_cache_key, history_data_version)
+def multi_symbol_history():
+    """
+    Daily candles for several symbols (?symbols=A,B,...), ordered by symbol then date.
+    """
+    symbols = list(dict.fromkeys(
+        s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()
+    ))
+    if not symbols:
+        return jsonify({"error": "symbols is required"}), 400
+    if len(symbols) > Config.HISTORY_MAX_SYMBOLS:
+        return jsonify({"error": f"At most {Config.HISTORY_MAX_SYMBOLS} symbols per request"}), 400
+    try:
+        params = parse_history_args(request.args)
+        page = fetch_history(symbols, **params)
+        return history_response(page, 'history.multi_symbol_history')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading history for {len(symbols)} symbols: {str(e)}")
+        return jsonify({"error": "Failed to read history"}), 500
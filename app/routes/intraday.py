@@ -0,0 +1,94 @@
+from flask import Blueprint, request, jsonify, url_for
+from datetime import datetime, timedelta, timezone
+from app.routes.history import history_response
+from app.services.history import parse_date, symbol_exists
+from app.services.intraday import INTERVALS, intraday_page, update_intraday
+from app.services.jobs import job_manager, JobAlreadyRunning, JobQueueFull
+from app.services.admission import limit
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+intraday_bp = Blueprint('intraday', __name__)
+INTRADAY_JOB_TYPE = "update_intraday"
+
+@intraday_bp.route('/intraday/<symbol>', methods=['GET'])
+def symbol_intraday(symbol):
+    """
+    Intraday bars for one symbol as parallel arrays.
+
+    Query parameters: interval (1m, 3m, 5m, 10m, 15m, 30m, 60m; default 1m),
+    start, end (YYYY-MM-DD or ISO timestamps, at most INTRADAY_MAX_DAYS
+    apart; default the last day), format=arrow.
+    """
+    symbol = symbol.upper()
+    try:
+        interval = request.args.get('interval', '1m')
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+        end = parse_date(request.args.get('end'), end_of_day=True) or datetime.now(timezone.utc)
+        start = parse_date(request.args.get('start')) or end - timedelta(days=1)
+        if start > end:
+            raise ValueError("start must not be after end")
+        if end - start > timedelta(days=Config.INTRADAY_MAX_DAYS):
+            raise ValueError(f"At most {Config.INTRADAY_MAX_DAYS} days per request")
+
+        page = intraday_page(symbol, interval, start, end)
+        if page["count"] == 0 and not symbol_exists(symbol):
+            return jsonify({"error": f"Unknown symbol {symbol}"}), 404
+        return history_response(page, 'intraday.symbol_intraday', symbol=symbol)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading intraday bars for {symbol}: {str(e)}")
+        return jsonify({"error": "Failed to read intraday bars"}), 500
+
+@intraday_bp.route('/intraday/update', methods=['POST'])
+@limit('heavy')
+def update_intraday_endpoint():
+    """
+    Start a background fetch of 1-minute candles.
+
+    Optional JSON body: {"symbols": [...], "backfill_days": int}.
+    """
+    data = request.get_json(silent=True) or {}
+    symbols = data.get('symbols')
+    backfill_days = data.get('backfill_days')
+    if symbols is not None and (not isinstance(symbols, list) or not all(isinstance(s, str) for s in symbols)):
+        return jsonify({"error": "symbols must be a list of strings"}), 400
+    if backfill_days is not None and (not isinstance(backfill_days, int) or backfill_days <= 0):
+        return jsonify({"error": "backfill_days must be a positive integer"}), 400
+    if symbols:
+        symbols = [s.upper() for s in symbols]
+
+    try:
+        job = job_manager.submit(
+            INTRADAY_JOB_TYPE,
+            lambda job: update_intraday(symbols, backfill_days, progress_callback=job.report_progress),
+            params={"symbols": symbols, "backfill_days": backfill_days},
+            dedupe_key=INTRADAY_JOB_TYPE
+        )
+        logger.info(f"Intraday update initiated via API - Job ID: {job['job_id']}")
+        return jsonify({
+            "message": "Intraday update initiated successfully",
+            "status": "processing",
+            "job_id": job["job_id"],
+            "status_url": url_for("jobs.get_job", job_id=job["job_id"])
+        }), 202
+    except JobAlreadyRunning as e:
+        return jsonify({
+            "error": "Intraday update is already in progress",
+            "status": "rejected",
+            "job_id": (e.job or {}).get("job_id")
+        }), 409
+    except JobQueueFull:
+        return jsonify({
+            "error": "Too many queued jobs",
+            "message": "The job queue is full, please retry later"
+        }), 503, {"Retry-After": "30"}
+    except Exception as e:
+        logger.error(f"Error in intraday update endpoint: {str(e)}")
+        return jsonify({
+            "error": "Internal server error",
+            "message": "Failed to initiate intraday update"
+        }), 500
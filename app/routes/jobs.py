@@ -0,0 +1,57 @@
+from flask import Blueprint, request, jsonify
+from app.services.jobs import job_manager
+from app.utils.sse import sse_response
+import logging
+
+logger = logging.getLogger(__name__)
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List recent background jobs, optionally filtered by type."""
+    try:
+        limit = min(int(request.args.get('limit', 20)), 100)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be an integer"}), 400
+    jobs = job_manager.list(request.args.get('type'), limit)
+    return jsonify({
+        "jobs": jobs,
+        "count": len(jobs)
+    }), 200
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status, progress and result of a background job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Job not found",
+            "job_id": job_id
+        }), 404
+    return jsonify(job), 200
+
+@jobs_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Request cancellation of a queued or running job."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Job not found",
+            "job_id": job_id
+        }), 404
+    if not job["cancel_requested"]:
+        return jsonify({
+            "error": "Job already finished",
+            "job": job
+        }), 409
+    return jsonify(job), 202
+
+@jobs_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Stream job status and progress as Server-Sent Events until the job finishes."""
+    if job_manager.get(job_id) is None:
+        return jsonify({
+            "error": "Job not found",
+            "job_id": job_id
+        }), 404
+    return sse_response(job_manager.watch(job_id))
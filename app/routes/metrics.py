@@ -0,0 +1,12 @@
+from flask import Blueprint, Response
+from app.services.metrics import render
+import logging
+
+logger = logging.getLogger(__name__)
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render()
+    return Response(body, content_type=content_type)
@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify, url_for
+from app.services.jobs import JobAlreadyRunning, JobQueueFull
+from app.services.admission import limit
+from app.services.pipeline import submit_pipeline, recent_runs
+import logging
+
+logger = logging.getLogger(__name__)
+pipeline_bp = Blueprint('pipeline', __name__)
+
+@pipeline_bp.route('/pipeline/run', methods=['POST'])
+@limit('heavy')
+def run_pipeline_endpoint():
+    """
+    Start the post-market pipeline as a background job.
+    """
+    force = str(request.args.get('force', '')).lower() in ('1', 'true', 'yes')
+    try:
+        job = submit_pipeline(force=force)
+    except JobAlreadyRunning as e:
+        existing = e.job or {}
+        return jsonify({
+            "error": "Pipeline is already running",
+            "status": "rejected",
+            "job_id": existing.get("job_id"),
+            "running_since": existing.get("started_at") or existing.get("created_at")
+        }), 409
+    except JobQueueFull:
+        return jsonify({
+            "error": "Too many queued jobs",
+            "message": "The job queue is full, please retry later"
+        }), 503, {"Retry-After": "30"}
+    logger.info(f"Pipeline run queued as job {job['job_id']} (force={force})")
+    return jsonify({
+        "message": "Pipeline run accepted",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": url_for("jobs.get_job", job_id=job["job_id"])
+    }), 202
+
+@pipeline_bp.route('/pipeline/runs', methods=['GET'])
+def list_pipeline_runs():
+    """
+    Recent pipeline runs with per-stage status and timings.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 10)), 50)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        runs = recent_runs(limit)
+        return jsonify({"runs": runs, "count": len(runs)}), 200
+    except Exception as e:
+        logger.error(f"Error listing pipeline runs: {str(e)}")
+        return jsonify({"error": "Failed to list pipeline runs"}), 500
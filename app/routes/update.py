@@ -1,69 +1,50 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 import logging
-import threading
 import time
 from datetime import datetime
-from app.services.background import update_all_symbols
-from app.services.bhavcopy_update import download_and_process_bhavcopy_nse
+from app.services.background import UPDATE_JOB_TYPE, update_all_symbols
+from app.services.bhavcopy_update import BHAVCOPY_JOB_TYPE, download_and_process_bhavcopy_nse
+from app.services.jobs import job_manager, JobAlreadyRunning, JobQueueFull
+from app.services.admission import limit
+from app.utils.sse import sse_response
 
 logger = logging.getLogger(__name__)
 update_bp = Blueprint('update', __name__)
 bhavupdate_bp = Blueprint('bhavupdate', __name__)
-_background_tasks = {}
-def update_all_symbols_in_background():
-    """
-    Run the update_all_symbols function in a separate thread.
-    """
-    task_id = f"update_symbols_{int(time.time())}"
-    _background_tasks[task_id] = {
-        'status': 'running',
-        'started_at': datetime.utcnow().isoformat(),
-        'message': 'Updating all symbols'
-    }
-    try:
-        logger.info(f"Starting background update of all symbols - Task ID: {task_id}")
-        update_all_symbols()
-        _background_tasks[task_id].update({
-            'status': 'completed',
-            'completed_at': datetime.utcnow().isoformat(),
-            'message': 'All symbols updated successfully'
-        })
-        logger.info(f"Background update completed successfully - Task ID: {task_id}")
-    except Exception as e:
-        error_msg = f"Error while updating symbols: {str(e)}"
-        _background_tasks[task_id].update({
-            'status': 'failed',
-            'completed_at': datetime.utcnow().isoformat(),
-            'error': error_msg
-        })
-        logger.error(f"Background update failed - Task ID: {task_id}: {error_msg}")
-    finally:
-        if len(_background_tasks) > 10:
-            oldest_keys = sorted(_background_tasks.keys())[:-10]
-            for key in oldest_keys:
-                del _background_tasks[key]
 
 @update_bp.route('/update_all_symbols', methods=['POST'])
+@limit('heavy')
 def update_all_symbols_endpoint():
     """
     Endpoint to update historical data for all stocks.
     """
     try:
-        running_tasks = [task for task in _background_tasks.values() if task['status'] == 'running']
-        if running_tasks:
-            return jsonify({
-                "error": "Update is already in progress",
-                "status": "rejected",
-                "running_since": running_tasks[0]['started_at']
-            }), 409
-        thread = threading.Thread(target=update_all_symbols_in_background, daemon=True)
-        thread.start()
-        logger.info("All symbols update initiated via API")
+        job = job_manager.submit(
+            UPDATE_JOB_TYPE,
+            lambda job: update_all_symbols(progress_callback=job.report_progress),
+            dedupe_key=UPDATE_JOB_TYPE
+        )
+        logger.info(f"All symbols update initiated via API - Job ID: {job['job_id']}")
         return jsonify({
             "message": "All symbols update initiated successfully",
             "status": "processing",
+            "job_id": job["job_id"],
+            "status_url": url_for("jobs.get_job", job_id=job["job_id"]),
             "initiated_at": datetime.utcnow().isoformat()
         }), 202
+    except JobAlreadyRunning as e:
+        existing = e.job or {}
+        return jsonify({
+            "error": "Update is already in progress",
+            "status": "rejected",
+            "job_id": existing.get("job_id"),
+            "running_since": existing.get("started_at") or existing.get("created_at")
+        }), 409
+    except JobQueueFull:
+        return jsonify({
+            "error": "Too many queued jobs",
+            "message": "The job queue is full, please retry later"
+        }), 503, {"Retry-After": "30"}
     except Exception as e:
         error_msg = f"Error in update_all_symbols endpoint: {str(e)}"
         logger.error(error_msg)
@@ -78,23 +59,68 @@ def get_update_status():
     Get status of background update tasks.
     """
     try:
+        tasks = {job["job_id"]: job for job in job_manager.list(UPDATE_JOB_TYPE, limit=10)}
         return jsonify({
-            "tasks": _background_tasks,
-            "active_tasks": len([t for t in _background_tasks.values() if t['status'] == 'running'])
+            "tasks": tasks,
+            "active_tasks": len([t for t in tasks.values() if t['status'] in ('queued', 'running')])
         }), 200
     except Exception as e:
         logger.error(f"Error getting update status: {str(e)}")
         return jsonify({"error": "Failed to get status"}), 500
 
+@update_bp.route('/update_all_symbols/events', methods=['GET'])
+def stream_update_events():
+    """
+    Stream progress of the active update as Server-Sent Events.
+    """
+    active = job_manager.active(UPDATE_JOB_TYPE)
+    if not active:
+        return jsonify({
+            "error": "No update in progress",
+            "status": "idle"
+        }), 404
+    return sse_response(job_manager.watch(active[0]["job_id"]))
+
 @bhavupdate_bp.route('/bhavcopy', methods=['POST'])
+@limit('heavy')
 def upload_bhavcopy():
     """
     Endpoint to process BhavCopy CSV file.
     """
     try:
+        if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+            try:
+                job = job_manager.submit(BHAVCOPY_JOB_TYPE, lambda job: download_and_process_bhavcopy_nse(),
+                                         dedupe_key=BHAVCOPY_JOB_TYPE)
+            except JobAlreadyRunning as e:
+                return jsonify({
+                    "error": "BhavCopy processing is already in progress",
+                    "status": "rejected",
+                    "job_id": (e.job or {}).get("job_id")
+                }), 409
+            except JobQueueFull:
+                return jsonify({
+                    "error": "Too many queued jobs",
+                    "message": "The job queue is full, please retry later"
+                }), 503, {"Retry-After": "30"}
+            logger.info(f"BhavCopy processing queued as job {job['job_id']}")
+            return jsonify({
+                "message": "BhavCopy processing accepted",
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "status_url": url_for("jobs.get_job", job_id=job["job_id"])
+            }), 202
         start_time = time.time()
         logger.info("BhavCopy processing initiated via API")
-        result = download_and_process_bhavcopy_nse()
+        try:
+            with job_manager.claim(BHAVCOPY_JOB_TYPE, dedupe_key=BHAVCOPY_JOB_TYPE):
+                result = download_and_process_bhavcopy_nse()
+        except JobAlreadyRunning as e:
+            return jsonify({
+                "error": "BhavCopy processing is already in progress",
+                "status": "rejected",
+                "job_id": (e.job or {}).get("job_id")
+            }), 409
         processing_time = round(time.time() - start_time, 2)
         logger.info(f"BhavCopy processing completed in {processing_time}s")
         return jsonify({
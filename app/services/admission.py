@@ -0,0 +1,189 @@
+import logging
+import math
+import threading
+import time
+from functools import wraps
+from typing import Dict, List
+
+from flask import jsonify, request
+
+from app.services import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Endpoints without an admission decorator (health, history reads, job
+# status) are never queued or throttled.
+COST_CLASSES = ("standard", "heavy")
+
+
+class Rejected(Exception):
+    """Raised when a request is shed; carries the status and Retry-After to send."""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _CostClass:
+    """Concurrency cap with a bounded wait queue for one cost class."""
+
+    def __init__(self, name: str, concurrency: int, queue_depth: int, rate_per_minute: float, burst: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, List[float]] = {}
+        self._buckets_lock = threading.Lock()
+
+    def take_token(self, client: str) -> None:
+        """Per-client token bucket; raises Rejected (429) when the client is out of tokens."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._buckets_lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= Config.ADMISSION_MAX_CLIENTS:
+                    self._prune(now)
+                bucket = self._buckets[client] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            if tokens < 1:
+                bucket[:] = [tokens, now]
+                raise Rejected(429, "rate_limited", math.ceil((1 - tokens) / self.rate))
+            bucket[:] = [tokens - 1, now]
+
+    def _prune(self, now: float) -> None:
+        # Buckets that have refilled completely carry no state worth keeping
+        refill = self.burst / self.rate
+        for client, (_, updated) in list(self._buckets.items()):
+            if now - updated >= refill:
+                del self._buckets[client]
+
+    def acquire(self, timeout: float) -> None:
+        """Take a concurrency slot, queueing for up to `timeout` seconds; raises Rejected (503)."""
+        with self._cond:
+            if self.active < self.concurrency:
+                self.active += 1
+                return
+            if self.waiting >= self.queue_depth:
+                raise Rejected(503, "queue_full", Config.ADMISSION_RETRY_AFTER_SECONDS)
+            self.waiting += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < self.concurrency, timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                raise Rejected(503, "queue_timeout", Config.ADMISSION_RETRY_AFTER_SECONDS)
+            self.active += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def status(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue_depth,
+        }
+
+
+class AdmissionController:
+    """
+    Load shedding for expensive endpoints.
+
+    Each cost class admits `concurrency` requests at a time per worker and
+    lets up to `queue_depth` more wait `ADMISSION_QUEUE_TIMEOUT_SECONDS` for
+    a slot; anything beyond that is rejected straight away with 503 and a
+    Retry-After header rather than tying up a worker thread and a pooled
+    connection. A per-client token bucket in front of the queue returns 429
+    to clients that keep sending heavy requests.
+    """
+
+    def __init__(self):
+        self._classes = {
+            "standard": _CostClass(
+                "standard",
+                Config.ADMISSION_STANDARD_CONCURRENCY,
+                Config.ADMISSION_STANDARD_QUEUE,
+                Config.ADMISSION_STANDARD_RATE_PER_MINUTE,
+                Config.ADMISSION_STANDARD_BURST,
+            ),
+            "heavy": _CostClass(
+                "heavy",
+                Config.ADMISSION_HEAVY_CONCURRENCY,
+                Config.ADMISSION_HEAVY_QUEUE,
+                Config.ADMISSION_HEAVY_RATE_PER_MINUTE,
+                Config.ADMISSION_HEAVY_BURST,
+            ),
+        }
+
+    def admit(self, cost_class: str, client: str) -> _CostClass:
+        """Check the client's rate limit and take a slot. Call `release()` on the result when done."""
+        limiter = self._classes[cost_class]
+        limiter.take_token(client)
+        limiter.acquire(Config.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        return limiter
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        return {name: limiter.status() for name, limiter in self._classes.items()}
+
+
+admission_controller = AdmissionController()
+
+
+def _client_id() -> str:
+    """
+    Rate-limit key: the client address, as resolved through TRUSTED_PROXY_COUNT
+    proxies. X-Client-Id is caller-controlled, so it only labels log lines.
+    """
+    return request.remote_addr or "unknown"
+
+
+def _client_label(client: str) -> str:
+    label = request.headers.get("X-Client-Id")
+    return f"{client} ({label[:64]})" if label else client
+
+
+def limit(cost_class: str):
+    """Run the view under admission control for `cost_class` (one of COST_CLASSES)."""
+    if cost_class not in COST_CLASSES:
+        raise ValueError(f"cost_class must be one of {', '.join(COST_CLASSES)}")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.ADMISSION_ENABLED:
+                return view(*args, **kwargs)
+            client = _client_id()
+            try:
+                limiter = admission_controller.admit(cost_class, client)
+            except Rejected as e:
+                metrics.record_admission(cost_class, e.reason)
+                logger.warning(f"Shed {request.method} {request.path} from {_client_label(client)}: "
+                               f"{e.reason} ({cost_class})")
+                message = ("Too many requests from this client, please slow down" if e.status == 429
+                           else "The server is busy with other requests, please retry later")
+                return jsonify({
+                    "error": "Too Many Requests" if e.status == 429 else "Service Unavailable",
+                    "message": message,
+                    "reason": e.reason,
+                    "retry_after_seconds": e.retry_after,
+                    "status_code": e.status
+                }), e.status, {"Retry-After": str(e.retry_after)}
+            metrics.record_admission(cost_class, "admitted")
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorator
@@ -1,12 +1,26 @@
 import logging
 import requests
-from datetime import datetime, timedelta
-from app.services.database import get_db_connection
+from datetime import date, datetime, timedelta
+from app.services.database import connection_manager, get_db_connection
+from app.services import metrics
+from app.services.trading_calendar import trading_calendar
 import time
-from typing import Optional, List
+from typing import Callable, Optional, List
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Job type and dedupe key shared by every caller of update_all_symbols
+UPDATE_JOB_TYPE = "update_all_symbols"
+
+def _request_error_reason(error: requests.RequestException) -> str:
+    """Low-cardinality label for a failed upstream request."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"http_{error.response.status_code}"
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, requests.ConnectionError):
+        return "connection"
+    return "request"
 
 class StockDataUpdater:
     """Class to handle stock data updates"""
@@ -17,13 +31,29 @@ class StockDataUpdater:
         self.timeout = timeout
         self.base_url = "https://api.upstox.com/v2/historical-candle"
         self.headers = {'Accept': 'application/json'}
-
-    def fetch_historical_data(self, isin: str, start_date: str, end_date: str) -> Optional[List]:
-        """Fetch historical data from the API for a specific ISIN."""
+        self.earliest_date_written: Optional[date] = None
+        self.rows_inserted = 0
+        self.skipped = 0
+
+    def fetch_historical_data(self, isin: str, start_date: str, end_date: str,
+                              interval: str = "day") -> Optional[List]:
+        """
+        Fetch historical data from the API for a specific ISIN.
+
+        `interval` is an Upstox candle interval such as "day" or "1minute".
+        Intraday intervals only cover completed sessions; use
+        fetch_intraday_data for today's candles.
+        """
+        encoded_symbol = f"NSE_EQ%7C{isin}"
+        return self._fetch_candles(isin, f'{self.base_url}/{encoded_symbol}/{interval}/{end_date}/{start_date}')
+
+    def fetch_intraday_data(self, isin: str, interval: str = "1minute") -> Optional[List]:
+        """Fetch the current session's candles for a specific ISIN."""
+        encoded_symbol = f"NSE_EQ%7C{isin}"
+        return self._fetch_candles(isin, f'{self.base_url}/intraday/{encoded_symbol}/{interval}')
+
+    def _fetch_candles(self, isin: str, url: str) -> Optional[List]:
         try:
-            encoded_symbol = f"NSE_EQ%7C{isin}"
-            url = f'{self.base_url}/{encoded_symbol}/day/{end_date}/{start_date}'
-
             logger.debug(f"Fetching data for ISIN {isin}: {url}")
 
             response = requests.get(url, headers=self.headers, timeout=self.timeout)
@@ -38,13 +68,21 @@ class StockDataUpdater:
 
         except requests.RequestException as e:
             logger.error(f"API request failed for ISIN {isin}: {str(e)}")
+            metrics.INGEST_API_ERRORS.labels("upstox", _request_error_reason(e)).inc()
             return None
         except Exception as e:
             logger.error(f"Unexpected error fetching data for ISIN {isin}: {str(e)}")
+            metrics.INGEST_API_ERRORS.labels("upstox", "unexpected").inc()
             return None
 
-    def update_stock_data(self, symbol: str) -> bool:
-        """Update historical data for a single stock symbol."""
+    def update_stock_data(self, symbol: str, latest_session: Optional[date] = None) -> bool:
+        """
+        Update historical data for a single stock symbol.
+
+        Upstream is only called when a session after the symbol's latest
+        candle exists up to `latest_session` (the trading calendar's latest
+        published session by default).
+        """
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -68,10 +106,11 @@ class StockDataUpdater:
                     start_date = latest_date.date() + timedelta(days=1)
                 else:
                     start_date = datetime(2019, 1, 1).date()
-                end_date = datetime.now().date()
+                end_date = latest_session or trading_calendar.latest_session()
 
-                if start_date > end_date:
-                    logger.debug(f"No new data needed for symbol {symbol}")
+                if start_date > end_date or not trading_calendar.has_session_between(start_date, end_date):
+                    logger.debug(f"No new session for symbol {symbol}")
+                    self.skipped += 1
                     return True
 
                 candles = self.fetch_historical_data(isin, start_date.isoformat(), end_date.isoformat())
@@ -106,6 +145,10 @@ class StockDataUpdater:
                         continue
 
                 conn.commit()
+                if inserted_count and (self.earliest_date_written is None or start_date < self.earliest_date_written):
+                    self.earliest_date_written = start_date
+                self.rows_inserted += inserted_count
+                metrics.INGEST_CANDLES.labels("upstox").inc(inserted_count)
                 logger.info(f"Updated {inserted_count} records for symbol {symbol}")
                 return True
 
@@ -113,8 +156,19 @@ class StockDataUpdater:
             logger.error(f"Error updating data for symbol {symbol}: {str(e)}")
             return False
 
-def update_all_symbols(batch_size: int = 50, delay: float = 1.0):
-    """Update historical data for all symbols in the database."""
+def update_all_symbols(batch_size: int = 50, delay: float = 1.0,
+                       progress_callback: Optional[Callable[..., None]] = None):
+    """
+    Update historical data for all symbols in the database.
+
+    Args:
+        batch_size (int): Symbols per batch.
+        delay (float): Pause between batches in seconds.
+        progress_callback (callable): Called with keyword progress after each batch.
+
+    Returns:
+        dict: Counts of successful and failed symbol updates.
+    """
     updater = StockDataUpdater(batch_size, delay, timeout=15.0)
 
     try:
@@ -125,31 +179,73 @@ def update_all_symbols(batch_size: int = 50, delay: float = 1.0):
 
         if not symbols:
             logger.warning("No symbols found in the database")
-            return
+            return {"symbols_total": 0, "successful": 0, "failed": 0}
 
-        logger.info(f"Starting update for {len(symbols)} symbols")
+        latest_session = trading_calendar.latest_session()
+        logger.info(f"Starting update for {len(symbols)} symbols up to session {latest_session}")
 
         successful_updates = 0
         failed_updates = 0
+        recent_errors: List[str] = []
+        started = time.time()
 
         for i in range(0, len(symbols), batch_size):
             batch = symbols[i:i + batch_size]
             batch_start_time = time.time()
+            batch_skipped_before = updater.skipped
 
             for symbol in batch:
-                if updater.update_stock_data(symbol):
+                skipped_before = updater.skipped
+                if updater.update_stock_data(symbol, latest_session):
                     successful_updates += 1
+                    result = "skipped" if updater.skipped > skipped_before else "success"
+                    metrics.INGEST_SYMBOLS.labels("upstox", result).inc()
                 else:
                     failed_updates += 1
+                    metrics.INGEST_SYMBOLS.labels("upstox", "failed").inc()
+                    recent_errors = (recent_errors + [symbol])[-20:]
 
             batch_time = time.time() - batch_start_time
             logger.info(f"Batch {i // batch_size + 1} completed in {batch_time:.2f}s")
+            if progress_callback:
+                done = min(i + batch_size, len(symbols))
+                elapsed = time.time() - started
+                symbols_per_second = done / elapsed if elapsed else 0.0
+                progress_callback(
+                    symbols_total=len(symbols),
+                    symbols_done=done,
+                    successful=successful_updates,
+                    failed=failed_updates,
+                    rows_inserted=updater.rows_inserted,
+                    skipped=updater.skipped,
+                    symbols_per_second=round(symbols_per_second, 2),
+                    rows_per_second=round(updater.rows_inserted / elapsed, 1) if elapsed else 0.0,
+                    eta_seconds=round((len(symbols) - done) / symbols_per_second) if symbols_per_second else None,
+                    failed_symbols=recent_errors
+                )
 
-            if i + batch_size < len(symbols):
+            # No pause is needed if the whole batch was skipped without a request
+            if i + batch_size < len(symbols) and updater.skipped - batch_skipped_before < len(batch):
                 time.sleep(delay)
+                metrics.INGEST_RATE_LIMIT_WAIT.labels("upstox").inc(delay)
 
         logger.info(f"Update completed: {successful_updates} successful, {failed_updates} failed")
 
+        if updater.earliest_date_written:
+            connection_manager.mark_primary_written()
+            trading_calendar.invalidate()
+            from app.services.snapshot import refresh_snapshot_after_ingest
+            refresh_snapshot_after_ingest(updater.earliest_date_written)
+
+        return {
+            "symbols_total": len(symbols),
+            "successful": successful_updates,
+            "failed": failed_updates,
+            "rows_inserted": updater.rows_inserted,
+            "skipped": updater.skipped,
+            "duration_seconds": round(time.time() - started, 2)
+        }
+
     except Exception as e:
         logger.error(f"Error during batch update: {str(e)}")
         raise
@@ -1,4 +1,7 @@
-from app.models import HistoricalData1D, StockSymbol, db
+from app.models import HistoricalData1D, StockSymbol
+from app.services.database import connection_manager
+from app.services import metrics
+from app.services.trading_calendar import trading_calendar
 from sqlalchemy import exists
 from io import BytesIO
 from datetime import datetime, date
@@ -10,6 +13,9 @@ from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Job type and dedupe key shared by every caller of download_and_process_bhavcopy_nse
+BHAVCOPY_JOB_TYPE = "bhavcopy"
+
 
 def safe_float(value: str) -> Optional[float]:
     try:
@@ -26,6 +32,11 @@ def safe_int(value: str) -> Optional[int]:
 
 
 def process_bhavcopy(file) -> Dict[str, int]:
+    with connection_manager.session_scope("ingest") as session:
+        return _process_bhavcopy(session, file)
+
+
+def _process_bhavcopy(session, file) -> Dict[str, int]:
     try:
         content = file.read().decode('utf-8')
         data = csv.DictReader(content.splitlines())
@@ -34,9 +45,10 @@ def process_bhavcopy(file) -> Dict[str, int]:
         skipped_records = 0
         error_records = 0
 
-        existing_isins = set(isin[0] for isin in db.session.query(StockSymbol.isin).all())
+        existing_isins = set(isin[0] for isin in session.query(StockSymbol.isin).all())
         batch_size = 1000
         batch_records = []
+        trade_dates = set()
 
         for row_num, row in enumerate(data, 1):
             try:
@@ -67,14 +79,14 @@ def process_bhavcopy(file) -> Dict[str, int]:
                 close_price = safe_float(row.get('ClsPric'))
                 volume = safe_int(row.get('TtlTradgVol'))
 
-                stock_symbol = StockSymbol.query.filter_by(isin=isin).first()
+                stock_symbol = session.query(StockSymbol).filter_by(isin=isin).first()
                 if not stock_symbol:
                     skipped_records += 1
                     continue
 
                 symbol_fk = stock_symbol.symbol
 
-                record_exists = db.session.query(
+                record_exists = session.query(
                     exists().where(
                         (HistoricalData1D.symbol == symbol_fk) &
                         (HistoricalData1D.date == trade_date)
@@ -96,8 +108,10 @@ def process_bhavcopy(file) -> Dict[str, int]:
                     'open_interest': None
                 })
 
+                trade_dates.add(trade_date)
+
                 if len(batch_records) >= batch_size:
-                    records_inserted += _insert_batch(batch_records)
+                    records_inserted += _insert_batch(session, batch_records)
                     batch_records = []
 
             except Exception as e:
@@ -106,9 +120,18 @@ def process_bhavcopy(file) -> Dict[str, int]:
                 continue
 
         if batch_records:
-            records_inserted += _insert_batch(batch_records)
+            records_inserted += _insert_batch(session, batch_records)
+
+        session.commit()
+        metrics.INGEST_CANDLES.labels("bhavcopy").inc(records_inserted)
+        metrics.INGEST_SYMBOLS.labels("bhavcopy", "success").inc(records_inserted)
+        metrics.INGEST_SYMBOLS.labels("bhavcopy", "failed").inc(error_records)
 
-        db.session.commit()
+        if records_inserted and trade_dates:
+            connection_manager.mark_primary_written()
+            trading_calendar.invalidate()
+            from app.services.snapshot import refresh_snapshot_after_ingest
+            refresh_snapshot_after_ingest(min(trade_dates))
 
         result = {
             "inserted": records_inserted,
@@ -121,29 +144,33 @@ def process_bhavcopy(file) -> Dict[str, int]:
         return result
 
     except Exception as e:
-        db.session.rollback()
+        session.rollback()
         logger.exception("Error processing BhavCopy file", exc_info=True)
         raise
 
 
-def _insert_batch(batch_records) -> int:
+def _insert_batch(session, batch_records) -> int:
     try:
         for record_data in batch_records:
             new_record = HistoricalData1D(**record_data)
-            db.session.add(new_record)
+            session.add(new_record)
 
-        db.session.flush()
+        session.flush()
         return len(batch_records)
 
     except Exception as e:
         logger.exception("Error inserting batch", exc_info=True)
-        db.session.rollback()
+        session.rollback()
         return 0
 
 
 def download_and_process_bhavcopy_nse(target_date: Optional[date] = None) -> Dict[str, Any]:
+    # An explicitly requested date is always fetched; only the default is gated
     if not target_date:
         target_date = datetime.today().date()
+        if not trading_calendar.is_trading_day(target_date):
+            logger.info(f"{target_date} is not a trading day, skipping BhavCopy download")
+            return {"status": "skipped", "reason": f"{target_date} is not a trading day"}
 
     yyyymmdd = target_date.strftime('%Y%m%d')
     # url = f"https://nsearchives.nseindia.com/content/cm/BhavCopy_NSE_CM_0_0_0_{yyyymmdd}_F_0000.csv.zip"
@@ -159,6 +186,7 @@ def download_and_process_bhavcopy_nse(target_date: Optional[date] = None) -> Dic
 
         if response.status_code != 200:
             logger.warning(f"BhavCopy download failed: {response.status_code}")
+            metrics.INGEST_API_ERRORS.labels("bhavcopy", f"http_{response.status_code}").inc()
             return {"status": "error", "reason": "File not found or inaccessible"}
 
         with zipfile.ZipFile(BytesIO(response.content)) as zip_ref:
@@ -169,4 +197,5 @@ def download_and_process_bhavcopy_nse(target_date: Optional[date] = None) -> Dic
 
     except Exception as e:
         logger.exception("Error downloading or processing BhavCopy", exc_info=True)
+        metrics.INGEST_API_ERRORS.labels("bhavcopy", "exception").inc()
         return {"status": "error", "reason": str(e)}
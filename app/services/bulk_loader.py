@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import asyncpg
+import numpy as np
+
+from app.services.database import connection_manager
+from app.services.price_arrays import PriceArrays
+
+logger = logging.getLogger(__name__)
+
+PG_EPOCH = np.datetime64("2000-01-01T00:00:00", "us")
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_HEADER_SIZE = len(COPY_SIGNATURE) + 8
+
+# Source column, NULL replacement and binary wire type for each loadable field.
+# NULLs are replaced in SQL so every row has the same width on the wire.
+PRICE_FIELDS = {
+    "open": ('"openPrice"', "'NaN'::float8", ">f8"),
+    "high": ('"highPrice"', "'NaN'::float8", ">f8"),
+    "low": ('"lowPrice"', "'NaN'::float8", ">f8"),
+    "close": ('"closePrice"', "'NaN'::float8", ">f8"),
+    "volume": ('"volume"', "-1::int8", ">i8"),
+}
+
+
+def _row_dtype(columns: Sequence[str]) -> np.dtype:
+    """Binary COPY tuple layout: field count, then (length, value) per field."""
+    fields = [("field_count", ">i2"), ("symbol_len", ">i4"), ("symbol", ">i4"), ("date_len", ">i4"), ("date", ">i8")]
+    for name in columns:
+        fields.append((f"{name}_len", ">i4"))
+        fields.append((name, PRICE_FIELDS[name][2]))
+    return np.dtype(fields)
+
+
+def _copy_query(columns: Sequence[str]) -> str:
+    selected = ", ".join(
+        f"COALESCE(h.{source}, {default})::{'int8' if wire == '>i8' else 'float8'}"
+        for source, default, wire in (PRICE_FIELDS[name] for name in columns)
+    )
+    return f'''
+        SELECT s.ord::int4, h."date"::timestamptz, {selected}
+        FROM "HistoricalData1D" h
+        JOIN unnest($1::text[]) WITH ORDINALITY AS s(symbol, ord) ON s.symbol = h."symbol"
+        WHERE ($2::date IS NULL OR h."date" >= $2::date)
+          AND ($3::date IS NULL OR h."date" < $3::date)
+        ORDER BY s.ord, h."date"
+    '''
+
+
+def decode_copy_binary(payload: bytes, columns: Sequence[str]) -> np.ndarray:
+    """
+    Decode a fixed-width PostgreSQL binary COPY payload into a structured array.
+
+    Every row must have the layout described by `_row_dtype`, which holds
+    for the NULL-free queries issued by this module.
+    """
+    return decode_copy_rows(payload, _row_dtype(columns))
+
+
+def decode_copy_rows(payload: bytes, dtype: np.dtype) -> np.ndarray:
+    """Decode a complete binary COPY payload whose tuples all have the layout `dtype`."""
+    decoder = CopyRowDecoder(dtype)
+    decoder.feed(payload)
+    return decoder.finish()
+
+
+class CopyRowDecoder:
+    """
+    Incrementally decode a binary COPY stream of fixed-width tuples.
+
+    `dtype` lists the tuple's int16 field count followed by an int32 length
+    and a value per field. Complete rows are decoded as chunks arrive, so
+    only a partial row is buffered between chunks. Every row's field count
+    and lengths are checked. A NULL (length -1) or any other variable-width
+    field raises ValueError, instead of misaligning the rows after it.
+    """
+
+    def __init__(self, dtype: np.dtype):
+        self.dtype = dtype
+        self._fields = dtype.names[1::2]
+        self._widths = [dtype.fields[name][0].itemsize for name in dtype.names[2::2]]
+        self._buffer = bytearray()
+        self._header_read = False
+        self._parts: List[np.ndarray] = []
+        self.row_count = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        if not self._header_read and not self._read_header():
+            return
+        complete = len(self._buffer) // self.dtype.itemsize * self.dtype.itemsize
+        if complete:
+            rows = np.frombuffer(bytes(self._buffer[:complete]), dtype=self.dtype)
+            del self._buffer[:complete]
+            self._check(rows)
+            self._parts.append(rows)
+            self.row_count += len(rows)
+
+    def finish(self) -> np.ndarray:
+        """Return all decoded rows; raises ValueError if the stream was incomplete."""
+        if not self._header_read:
+            raise ValueError("Not a PostgreSQL binary COPY payload")
+        if bytes(self._buffer) != b"\xff\xff":
+            raise ValueError("Binary COPY payload does not match the expected row layout")
+        if not self._parts:
+            return np.empty(0, dtype=self.dtype)
+        return self._parts[0] if len(self._parts) == 1 else np.concatenate(self._parts)
+
+    def _read_header(self) -> bool:
+        if len(self._buffer) < COPY_HEADER_SIZE:
+            return False
+        if self._buffer[:len(COPY_SIGNATURE)] != COPY_SIGNATURE:
+            raise ValueError("Not a PostgreSQL binary COPY payload")
+        extension_length = int.from_bytes(self._buffer[COPY_HEADER_SIZE - 4:COPY_HEADER_SIZE], "big")
+        if len(self._buffer) < COPY_HEADER_SIZE + extension_length:
+            return False
+        del self._buffer[:COPY_HEADER_SIZE + extension_length]
+        self._header_read = True
+        return True
+
+    def _check(self, rows: np.ndarray) -> None:
+        aligned = rows[self.dtype.names[0]] == len(self._fields)
+        for name, width in zip(self._fields, self._widths):
+            lengths = rows[name]
+            aligned &= lengths == width
+            # Rows after a NULL are misaligned, so report the NULL itself
+            nulls = np.flatnonzero(lengths == -1)
+            if len(nulls) and (aligned[:nulls[0]].all()):
+                raise ValueError(f"NULL in binary COPY field {name[:-4]}; the query must not return NULLs")
+        if not aligned.all():
+            raise ValueError("Binary COPY payload does not match the expected row layout")
+
+
+def _asyncpg_dsn(engine_url) -> str:
+    return engine_url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+_loop_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_pools: Dict[Tuple[str, Tuple], "asyncpg.Pool"] = {}
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """
+    One long-lived event loop per process, run on a daemon thread.
+
+    Reusing it (and the pools created on it) avoids a new loop and a new
+    connection per load. A forked worker starts its own loop and drops the
+    parent's pools.
+    """
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _pools.clear()
+            threading.Thread(target=_loop.run_forever, name="bulk-loader", daemon=True).start()
+        return _loop
+
+
+async def _pool(dsn: str, settings: dict) -> "asyncpg.Pool":
+    """A small asyncpg pool per DSN and settings; only touched from the loop thread."""
+    key = (dsn, tuple(sorted(settings.items())))
+    pool = _pools.get(key)
+    if pool is None:
+        pool = await asyncpg.create_pool(
+            dsn, min_size=0, max_size=2,
+            server_settings={k: str(v) for k, v in settings.items()}
+        )
+        _pools[key] = pool
+    return pool
+
+
+async def _copy_prices(dsn: str, settings: dict, columns: Sequence[str], symbols: Optional[Sequence[str]],
+                       start: Optional[date], end: Optional[date]):
+    """Resolve the symbol list and stream matching candles, decoding chunks as they arrive."""
+    decoder = CopyRowDecoder(_row_dtype(columns))
+    received = 0
+
+    async def sink(chunk: bytes):
+        nonlocal received
+        received += len(chunk)
+        decoder.feed(chunk)
+
+    pool = await _pool(dsn, settings)
+    async with pool.acquire() as conn:
+        if symbols is None:
+            rows = await conn.fetch('SELECT "symbol" FROM "StockSymbol" ORDER BY "symbol"')
+            names = [r[0] for r in rows]
+        else:
+            names = sorted(set(symbols))
+        await conn.copy_from_query(_copy_query(columns), names, start, end, output=sink, format="binary")
+    return names, decoder.finish(), received
+
+
+def load_price_arrays(columns: Iterable[str] = ("close",), symbols: Optional[Sequence[str]] = None,
+                      start: Optional[date] = None, end: Optional[date] = None,
+                      read_only: bool = True) -> PriceArrays:
+    """
+    Bulk-load candles over asyncpg's binary COPY straight into NumPy arrays.
+
+    Args:
+        columns (iterable): Any of open, high, low, close, volume.
+        symbols (sequence): Symbols to load; all listed symbols when omitted.
+        start (date): Inclusive start date.
+        end (date): Exclusive end date.
+        read_only (bool): Allow serving from the read replica.
+
+    Returns:
+        PriceArrays: Rows grouped by symbol, dates ascending. Missing prices
+        are NaN and missing volumes are -1.
+    """
+    columns = list(columns)
+    unknown = [c for c in columns if c not in PRICE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown price columns: {', '.join(unknown)}")
+
+    engine = connection_manager.get_read_engine("analytics") if read_only else connection_manager.get_engine("analytics")
+    dsn = _asyncpg_dsn(engine.url)
+    settings = connection_manager.profile("analytics").get("settings", {})
+
+    started = time.time()
+    future = asyncio.run_coroutine_threadsafe(_copy_prices(dsn, settings, columns, symbols, start, end),
+                                              _event_loop())
+    names, rows, received = future.result()
+
+    codes = rows["symbol"].astype(np.int64) - 1
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(names)), out=offsets[1:])
+
+    values = {"date": PG_EPOCH + rows["date"].astype(np.int64).astype("timedelta64[us]")}
+    for name in columns:
+        values[name] = rows[name].astype(PRICE_FIELDS[name][2].replace(">", "<"))
+
+    elapsed = time.time() - started
+    logger.info(f"Bulk loaded {len(rows)} rows ({received / 1e6:.1f} MB) for {len(names)} symbols "
+                f"in {elapsed:.2f}s")
+    return PriceArrays(names, offsets, values)
@@ -0,0 +1,134 @@
+import base64
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, select, text, tuple_
+
+from app.models import HistoricalData1D, SMAResult
+from app.services.database import connection_manager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Feed name -> (model, public column name -> model column). id and seq are always returned.
+CHANGE_TABLES = {
+    "history": (HistoricalData1D, {
+        "symbol": HistoricalData1D.symbol,
+        "date": HistoricalData1D.date,
+        "open": HistoricalData1D.open_price,
+        "high": HistoricalData1D.high_price,
+        "low": HistoricalData1D.low_price,
+        "close": HistoricalData1D.close_price,
+        "volume": HistoricalData1D.volume,
+        "open_interest": HistoricalData1D.open_interest,
+    }),
+    "sma_results": (SMAResult, {
+        "symbol": SMAResult.symbol,
+        "sma_period": SMAResult.sma_period,
+        "threshold_pct": SMAResult.threshold_pct,
+        "close_price": SMAResult.close_price,
+        "sma_value": SMAResult.sma_value,
+        "deviation_pct": SMAResult.deviation_pct,
+        "date_generated": SMAResult.date_generated,
+    }),
+}
+
+# Every transaction id below the oldest one still in flight is settled, so
+# no row can later appear with an ingestSeq under this bound.
+_STABLE_SEQ = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def parse_tables(value: Optional[str]) -> List[str]:
+    """Validate a comma-separated list of feed names."""
+    if not value:
+        return list(CHANGE_TABLES)
+    tables = [t.strip() for t in value.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in CHANGE_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown table(s): {', '.join(unknown)}; choose from {', '.join(CHANGE_TABLES)}")
+    return list(dict.fromkeys(tables))
+
+
+def encode_cursor(positions: Dict[str, Tuple[int, int]]) -> str:
+    raw = json.dumps({name: list(pos) for name, pos in positions.items()}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Tuple[int, int]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        positions = {name: (int(seq), int(row_id)) for name, (seq, row_id) in json.loads(raw).items()}
+    except (ValueError, TypeError, AttributeError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    unknown = [name for name in positions if name not in CHANGE_TABLES]
+    if unknown:
+        raise ValueError("Invalid cursor")
+    return positions
+
+
+def current_cursor(tables: Optional[Sequence[str]] = None) -> str:
+    """A cursor positioned at the current end of the feed (for ?since=now)."""
+    with connection_manager.get_read_engine("analytics").connect() as conn:
+        stable = conn.execute(_STABLE_SEQ).scalar()
+    return encode_cursor({name: (stable, 0) for name in (tables or CHANGE_TABLES)})
+
+
+def fetch_changes(since: Optional[str], tables: Sequence[str], limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Read rows of `tables` inserted or updated after `since`.
+
+    Each write stamps the row's ingestSeq with its transaction id. Pages are
+    keyset scans of the (ingestSeq, id) index starting at the cursor, so a
+    sync reads only the delta since the previous one. Rows are only served
+    below the oldest in-flight transaction id; a slow ingest that commits
+    after a page was read is still picked up on the next poll instead of
+    being skipped. Deleted rows (e.g. SMA results past retention) are not
+    reported.
+
+    Args:
+        since (str): `next_cursor` from a previous call; None starts from the
+            beginning of the feed.
+        tables (list): Feed names, a subset of CHANGE_TABLES.
+        limit (int): Rows per table, capped at CHANGES_MAX_PAGE_SIZE.
+
+    Returns:
+        dict: {"tables": {name: {"columns": {...}, "count": int}},
+        "next_cursor": str, "has_more": bool}
+    """
+    limit = min(limit or Config.CHANGES_PAGE_SIZE, Config.CHANGES_MAX_PAGE_SIZE)
+    positions = decode_cursor(since) if since else {}
+    results = {}
+    has_more = False
+
+    with connection_manager.get_read_engine("analytics").connect() as conn:
+        stable = conn.execute(_STABLE_SEQ).scalar()
+        for name in tables:
+            model, columns = CHANGE_TABLES[name]
+            after_seq, after_id = positions.get(name, (0, 0))
+            stmt = (
+                select(model.ingest_seq, model.id, *columns.values())
+                .where(and_(
+                    model.ingest_seq.isnot(None),
+                    tuple_(model.ingest_seq, model.id) > (after_seq, after_id),
+                    model.ingest_seq < stable,
+                ))
+                .order_by(model.ingest_seq, model.id)
+                .limit(limit + 1)
+            )
+            rows = conn.execute(stmt).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                has_more = True
+                positions[name] = (rows[-1][0], rows[-1][1])
+            elif stable > after_seq:
+                # Caught up: nothing below `stable` is left to read
+                positions[name] = (stable, 0)
+            else:
+                positions[name] = (after_seq, after_id)
+
+            names = ["seq", "id"] + list(columns)
+            arrays = [list(values) for values in zip(*rows)] if rows else [[] for _ in names]
+            results[name] = {"columns": dict(zip(names, arrays)), "count": len(rows)}
+
+    return {"tables": results, "next_cursor": encode_cursor(positions), "has_more": has_more}
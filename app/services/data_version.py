@@ -0,0 +1,53 @@
+import logging
+from typing import Optional
+
+from flask import g, has_request_context
+from sqlalchemy import text
+
+from app.services.database import connection_manager
+
+logger = logging.getLogger(__name__)
+
+_VERSION_QUERY = text('SELECT MAX("date"), MAX("id") FROM "HistoricalData1D"')
+
+
+def current_data_version(profile: str = "api", read_only: bool = False) -> Optional[str]:
+    """
+    Cheap identifier of the price data currently in the primary database.
+
+    Built from the latest trade date and the highest row id, both served
+    from indexes. Any insert of new candles changes it, so it can be used to
+    decide whether derived results need recomputing. With `read_only=True`
+    it is read where the profile's reads go, which may be the replica.
+
+    Returns:
+        str: Version string such as "20241018-4821733", "empty" for an
+        empty table, or None if the database could not be reached.
+    """
+    try:
+        engine = connection_manager.get_read_engine(profile) if read_only else connection_manager.get_engine(profile)
+        with engine.connect() as conn:
+            return read_data_version(conn)
+    except Exception as e:
+        logger.error(f"Could not read data version: {str(e)}")
+        return None
+
+
+def read_data_version(conn) -> str:
+    """Data version as seen by `conn`, e.g. inside a snapshot that also reads the rows."""
+    latest_date, max_id = conn.execute(_VERSION_QUERY).one()
+    if max_id is None:
+        return "empty"
+    return f"{str(latest_date)[:10].replace('-', '')}-{max_id}"
+
+
+def request_data_version() -> Optional[str]:
+    """
+    `current_data_version()` read once per request, so an ETag check and the
+    view it guards agree on the version and share one round trip.
+    """
+    if not has_request_context():
+        return current_data_version()
+    if "data_version" not in g:
+        g.data_version = current_data_version()
+    return g.data_version
@@ -1,50 +1,299 @@
-import psycopg2
 import logging
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy import create_engine
-import os
-from dotenv import load_dotenv
+import threading
+import time
 from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.services import metrics
+from app.services.query_profiler import query_profiler
+from config import Config
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    logger.error("DATABASE_URL environment variable not set.")
-    raise ValueError("DATABASE_URL environment variable not set.")
-
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-    pool_recycle=3600
-)
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+
+REPLICA_SUFFIX = "@replica"
+
+# How far a server has applied writes that replica reads can observe: the latest
+# trade date, then the newest write transaction (ingestSeq is set on insert and
+# update) of the price and SMA tables. Each is served from an index.
+_POSITION_FIELDS = ("latest_date", "history_seq", "sma_results_seq")
+_POSITION_QUERY = text('''
+    SELECT
+        (SELECT MAX("date") FROM "HistoricalData1D"),
+        (SELECT MAX("ingestSeq") FROM "HistoricalData1D" WHERE "ingestSeq" IS NOT NULL),
+        (SELECT MAX("ingestSeq") FROM "SMA_Results" WHERE "ingestSeq" IS NOT NULL)
+''')
+
+
+def _behind(replica: Tuple[Any, ...], primary: Tuple[Any, ...]) -> bool:
+    """Whether the replica has not yet applied something the primary has."""
+    return any(p is not None and (r is None or r < p) for r, p in zip(replica, primary))
+
+
+def apply_session_settings(dbapi_connection, settings: Dict[str, Any]) -> None:
+    """Apply PostgreSQL session settings (statement_timeout, work_mem, ...) to a new connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in settings.items():
+            cursor.execute("SELECT set_config(%s, %s, false)", (name, str(value)))
+    finally:
+        cursor.close()
+    dbapi_connection.commit()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(getattr(self, "logging_name", None) or "default",
+                                      time.perf_counter() - started)
+
+
+class ConnectionManager:
+    """
+    Single connection layer with one engine (and pool) per workload profile.
+
+    Profiles come from `Config.DB_POOL_PROFILES`. Engines are created on first
+    use, so importing this module never touches the database.
+
+    When `Config.DATABASE_REPLICA_URL` is set, read-only sessions on the
+    profiles in `Config.REPLICA_READ_PROFILES` go to the replica unless it
+    is missing price or SMA rows the primary has. Writes always use the primary.
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, Any]]] = None, url: Optional[str] = None):
+        self._profiles = profiles
+        self._url = url
+        self._engines: Dict[str, Engine] = {}
+        self._sessionmakers: Dict[Engine, sessionmaker] = {}
+        self._lock = threading.Lock()
+        self._replica_lock = threading.Lock()
+        self._replica_state: Dict[str, Any] = {"checked_at": 0.0, "lagging": None}
+
+    @property
+    def profiles(self) -> Dict[str, Dict[str, Any]]:
+        return self._profiles if self._profiles is not None else Config.DB_POOL_PROFILES
+
+    @property
+    def url(self) -> str:
+        url = self._url or Config.SQLALCHEMY_DATABASE_URI
+        if not url:
+            logger.error("DATABASE_URL environment variable not set.")
+            raise ValueError("DATABASE_URL environment variable not set.")
+        return url
+
+    @property
+    def replica_url(self) -> Optional[str]:
+        return Config.DATABASE_REPLICA_URL if self._url is None else None
+
+    def profile(self, name: str) -> Dict[str, Any]:
+        try:
+            return self.profiles[name.replace(REPLICA_SUFFIX, "")]
+        except KeyError:
+            raise ValueError(f"Unknown connection profile: {name}")
+
+    def register_engine(self, name: str, engine: Engine) -> None:
+        """Adopt an engine created elsewhere (Flask-SQLAlchemy's) as a profile's pool."""
+        with self._lock:
+            self._engines[name] = engine
+        metrics.instrument_engine(engine, name)
+        query_profiler.instrument_engine(engine, name)
+
+    def get_engine(self, name: str = "api") -> Engine:
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            if name not in self._engines:
+                self._engines[name] = self._create_engine(name)
+            return self._engines[name]
+
+    def _create_engine(self, name: str) -> Engine:
+        profile = self.profile(name)
+        replica = name.endswith(REPLICA_SUFFIX)
+        engine = create_engine(
+            self.replica_url if replica else self.url,
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_timeout=profile["pool_timeout"],
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            poolclass=TimedQueuePool,
+            pool_logging_name=name
+        )
+        metrics.instrument_engine(engine, name)
+        query_profiler.instrument_engine(engine, name)
+
+        settings = dict(profile.get("settings", {}))
+        if replica:
+            settings["default_transaction_read_only"] = "on"
+
+        @event.listens_for(engine, "connect")
+        def set_session_settings(dbapi_connection, connection_record):
+            try:
+                apply_session_settings(dbapi_connection, settings)
+            except Exception as e:
+                logger.warning(f"Could not apply {name} session settings: {str(e)}")
+
+        logger.info(f"Created '{name}' engine (pool_size={profile['pool_size']}, "
+                    f"max_overflow={profile['max_overflow']})")
+        return engine
+
+    def get_read_engine(self, name: str = "analytics") -> Engine:
+        """Return the replica engine for read-only work when it is current, else the primary."""
+        if self.replica_url and name in Config.REPLICA_READ_PROFILES and not self._replica_lagging(name):
+            return self.get_engine(name + REPLICA_SUFFIX)
+        return self.get_engine(name)
+
+    def _replica_lagging(self, name: str) -> bool:
+        state = self._replica_state
+        if time.monotonic() - state["checked_at"] < Config.REPLICA_LAG_CHECK_SECONDS:
+            return state["lagging"]
+
+        with self._replica_lock:
+            state = self._replica_state
+            if time.monotonic() - state["checked_at"] < Config.REPLICA_LAG_CHECK_SECONDS:
+                return state["lagging"]
+            try:
+                # Primary first: anything the replica has applied by the time it
+                # is read then counts, so a busy primary can't make it look behind
+                with self.get_engine(name).connect() as conn:
+                    primary = tuple(conn.execute(_POSITION_QUERY).one())
+                with self.get_engine(name + REPLICA_SUFFIX).connect() as conn:
+                    replica = tuple(conn.execute(_POSITION_QUERY).one())
+                lagging = _behind(replica, primary)
+            except Exception as e:
+                logger.warning(f"Replica lag check failed, reading from primary: {str(e)}")
+                primary = replica = (None,) * len(_POSITION_FIELDS)
+                lagging = True
+
+            if lagging != state["lagging"]:
+                if lagging:
+                    logger.warning(f"Replica behind primary (replica {replica}, primary {primary}); "
+                                   f"routing reads to primary")
+                else:
+                    logger.info("Replica caught up; routing read-only queries to replica")
+            self._replica_state = {
+                "checked_at": time.monotonic(),
+                "lagging": lagging,
+                "primary": {f: str(v) if v is not None else None for f, v in zip(_POSITION_FIELDS, primary)},
+                "replica": {f: str(v) if v is not None else None for f, v in zip(_POSITION_FIELDS, replica)},
+            }
+            return lagging
+
+    def mark_primary_written(self) -> None:
+        """Force a replica lag re-check after price or SMA rows are written to the primary."""
+        self._replica_state = dict(self._replica_state, checked_at=0.0)
+
+    def replica_status(self) -> Dict[str, Any]:
+        if not self.replica_url:
+            return {"configured": False}
+        state = {k: v for k, v in self._replica_state.items() if k != "checked_at"}
+        return dict(state, configured=True, read_profiles=Config.REPLICA_READ_PROFILES)
+
+    @contextmanager
+    def snapshot_scope(self, name: str = "analytics"):
+        """
+        One REPEATABLE READ transaction on a profile's read engine, so that
+        e.g. a data version and the rows it names come from the same snapshot
+        even when reads go to a replica.
+        """
+        with self.get_read_engine(name).connect() as conn:
+            conn.execution_options(isolation_level="REPEATABLE READ")
+            with conn.begin():
+                yield conn
+
+    @contextmanager
+    def session_scope(self, name: str = "api", read_only: bool = False):
+        """
+        Provide a session on a profile's pool, committing on success.
+
+        With `read_only=True` the session may be served by the replica.
+        """
+        engine = self.get_read_engine(name) if read_only else self.get_engine(name)
+        maker = self._sessionmakers.get(engine)
+        if maker is None:
+            maker = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+            self._sessionmakers[engine] = maker
+
+        session: Session = maker()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def pool_status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-profile pool utilisation for engines that have been created."""
+        status = {}
+        for name, engine in list(self._engines.items()):
+            pool = engine.pool
+            try:
+                size = pool.size()
+                checked_out = pool.checkedout()
+                status[name] = {
+                    "pool_size": size,
+                    "checked_out": checked_out,
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                    "max_overflow": self.profiles.get(name, {}).get("max_overflow"),
+                    "utilization_pct": round(checked_out / size * 100, 1) if size else None,
+                }
+            except AttributeError:
+                status[name] = {"pool": pool.status()}
+        return status
+
+    def dispose_all(self, close: bool = True) -> None:
+        """
+        Dispose every engine's pool.
+
+        Pass `close=False` in a forked child: connections inherited from the
+        parent are dropped without being closed, so the parent's sockets
+        are left alone and the child opens its own.
+        """
+        for engine in list(self._engines.values()):
+            engine.dispose(close=close)
+
+
+connection_manager = ConnectionManager()
+
+_db_session = None
+
+
 def get_db_session():
     """
-    Return the SQLAlchemy scoped session.
+    Return a SQLAlchemy scoped session on the API pool.
     """
-    return db_session
+    global _db_session
+    if _db_session is None:
+        _db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False,
+                                                  bind=connection_manager.get_engine("api")))
+    return _db_session
+
+
 @contextmanager
-def get_db_connection():
+def get_db_connection(profile: str = "ingest"):
     """
-    Establish a direct connection to the database using psycopg2.
+    Borrow a raw psycopg2 connection from a profile's pool.
     """
+    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT")
-        )
+        conn = connection_manager.get_engine(profile).raw_connection()
         yield conn
     except Exception as e:
-        logging.error(f"Error connecting to database: {str(e)}")
+        logger.error(f"Error connecting to database: {str(e)}")
         if conn:
             conn.rollback()
         raise
@@ -0,0 +1,92 @@
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One subscriber's bounded event queue.
+
+    When a slow subscriber falls `maxlen` events behind, the oldest events
+    are dropped; progress events are snapshots, so only the latest matters.
+    """
+
+    def __init__(self, broker: "EventBroker", topic: str, maxlen: int = 100):
+        self.broker = broker
+        self.topic = topic
+        self._events = deque(maxlen=maxlen)
+        self._ready = threading.Condition()
+
+    def put(self, event: Dict[str, Any]) -> None:
+        with self._ready:
+            self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return all pending events, waiting up to `timeout` seconds for the first."""
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe keyed by topic.
+
+    Publishing costs a dict lookup when nobody is listening and one deque
+    append per subscriber otherwise, so any number of watchers share a
+    single producer without extra database work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, topic: str, maxlen: int = 100) -> Subscription:
+        subscription = Subscription(self, topic, maxlen)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> int:
+        """Deliver an event to every subscriber of `topic`; returns the subscriber count."""
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return 0
+        with self._lock:
+            targets = list(self._subscribers.get(topic, ()))
+        for subscription in targets:
+            subscription.put(event)
+        return len(targets)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+event_broker = EventBroker()
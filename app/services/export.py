@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import BigInteger, and_, cast, func, select
+
+from app.models import HistoricalData1D, StockSymbol
+from app.services.data_version import read_data_version
+from app.services.database import connection_manager
+from app.services.history import HISTORY_COLUMNS, arrow_schema, to_record_batch
+from app.services.single_flight import single_flight
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "npz": ("application/octet-stream", "npz"),
+}
+
+
+def export_dir() -> str:
+    return Config.EXPORT_DIR
+
+
+def _conditions(symbols: Optional[Sequence[str]], start: Optional[datetime], end: Optional[datetime]) -> List[Any]:
+    conditions = []
+    if symbols:
+        conditions.append(HistoricalData1D.symbol.in_(list(symbols)))
+    if start is not None:
+        conditions.append(HistoricalData1D.date >= start)
+    if end is not None:
+        conditions.append(HistoricalData1D.date <= end)
+    return conditions
+
+
+def _stream_rows(conn, selected: List[Any], conditions: List[Any]):
+    """
+    Yield row chunks of EXPORT_CHUNK_ROWS from a server-side cursor.
+
+    Only one chunk is held in memory at a time.
+    """
+    stmt = select(*selected).order_by(HistoricalData1D.symbol, HistoricalData1D.date)
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+    result = conn.execute(stmt.execution_options(yield_per=Config.EXPORT_CHUNK_ROWS))
+    for partition in result.partitions():
+        yield partition
+
+
+def _write_arrow(conn, path: str, symbols, start, end, columns: Sequence[str]) -> int:
+    import pyarrow.ipc as ipc
+
+    names = ["symbol", "date"] + list(columns)
+    schema = arrow_schema(names)
+    selected = [HistoricalData1D.symbol, HistoricalData1D.date] + [HISTORY_COLUMNS[c] for c in columns]
+    rows_written = 0
+    with open(path, "wb") as f, ipc.new_stream(f, schema) as writer:
+        for rows in _stream_rows(conn, selected, _conditions(symbols, start, end)):
+            writer.write_batch(to_record_batch(dict(zip(names, zip(*rows))), schema))
+            rows_written += len(rows)
+    return rows_written
+
+
+def _write_npz(conn, path: str, symbols, start, end, columns: Sequence[str]) -> int:
+    """
+    Write aligned (date x symbol) float64 matrices, one per column.
+
+    Missing candles are NaN. Besides the column matrices the archive holds
+    `dates` (datetime64[s], UTC) and `symbols`.
+    """
+    import numpy as np
+
+    conditions = _conditions(symbols, start, end)
+    epoch = cast(func.extract("epoch", HistoricalData1D.date), BigInteger)
+    if symbols:
+        symbol_list = sorted(symbols)
+    else:
+        symbol_list = list(conn.execute(select(StockSymbol.symbol).order_by(StockSymbol.symbol)).scalars())
+    date_stmt = select(epoch).distinct().order_by(epoch)
+    if conditions:
+        date_stmt = date_stmt.where(and_(*conditions))
+    dates = np.fromiter(conn.execute(date_stmt).scalars(), dtype=np.int64)
+
+    symbol_index = {symbol: i for i, symbol in enumerate(symbol_list)}
+    matrices = {c: np.full((len(dates), len(symbol_list)), np.nan) for c in columns}
+    selected = [HistoricalData1D.symbol, epoch] + [HISTORY_COLUMNS[c] for c in columns]
+    rows_written = 0
+    for rows in _stream_rows(conn, selected, conditions):
+        chunk = list(zip(*rows))
+        known = np.array([symbol_index.get(s, -1) for s in chunk[0]], dtype=np.int64)
+        keep = known >= 0
+        cols = known[keep]
+        date_rows = np.searchsorted(dates, np.asarray(chunk[1], dtype=np.int64)[keep])
+        for offset, name in enumerate(columns, start=2):
+            values = np.asarray(chunk[offset], dtype=np.float64)[keep]
+            matrices[name][date_rows, cols] = values
+        rows_written += int(keep.sum())
+
+    with open(path, "wb") as f:
+        np.savez(f, dates=dates.astype("datetime64[s]"), symbols=np.array(symbol_list), **matrices)
+    return rows_written
+
+
+WRITERS = {"arrow": _write_arrow, "npz": _write_npz}
+
+
+def export_key(fmt: str, symbols, start, end, columns: Sequence[str], data_version: str) -> str:
+    parts = [
+        fmt,
+        ",".join(sorted(symbols)) if symbols else "*",
+        start.isoformat() if start else "",
+        end.isoformat() if end else "",
+        ",".join(columns),
+        data_version,
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:24]
+
+
+def get_export(fmt: str, symbols: Optional[Sequence[str]], start: Optional[datetime],
+               end: Optional[datetime], columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    Return a cached export file, building it first if needed.
+
+    Files are keyed on the request and the data version, so a repeat pull
+    of unchanged data is served straight from disk and new ingests produce
+    a new file. The version is read in the same snapshot the rows are
+    streamed from. Concurrent requests for the same export share one build.
+
+    Returns:
+        dict: path, filename, mimetype, cached (bool), data_version.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"format must be one of {', '.join(WRITERS)}")
+    # The data version naming the export and the rows written to it come from one snapshot
+    with connection_manager.snapshot_scope("analytics") as conn:
+        return _get_export(conn, fmt, symbols, start, end, columns)
+
+
+def _get_export(conn, fmt: str, symbols, start, end, columns: Sequence[str]) -> Dict[str, Any]:
+    data_version = read_data_version(conn)
+    key = export_key(fmt, symbols, start, end, columns, data_version)
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"history-{data_version}-{key}.{extension}"
+    path = os.path.join(export_dir(), filename)
+    info = {"path": path, "filename": filename, "mimetype": mimetype, "data_version": data_version}
+
+    if os.path.exists(path):
+        os.utime(path)
+        return dict(info, cached=True)
+
+    def build():
+        if os.path.exists(path):
+            return False
+        os.makedirs(export_dir(), exist_ok=True)
+        # Unique per build: single-flight only collapses builds within this
+        # worker, so another worker may be building the same file right now
+        fd, tmp_path = tempfile.mkstemp(dir=export_dir(), prefix=f"{filename}.tmp.")
+        os.close(fd)
+        started = time.time()
+        try:
+            rows = WRITERS[fmt](conn, tmp_path, symbols, start, end, columns)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.info(f"Built {fmt} export {filename}: {rows} rows, "
+                    f"{os.path.getsize(path) / 1024 ** 2:.1f}MB in {time.time() - started:.1f}s")
+        prune_exports()
+        return True
+
+    built, _ = single_flight.do("export", key, build)
+    return dict(info, cached=not built)
+
+
+def prune_exports() -> None:
+    """
+    Keep the EXPORT_CACHE_MAX_FILES most recently used export files.
+
+    Files used within EXPORT_PRUNE_GRACE_SECONDS are kept regardless, as a
+    request may have just been handed one and not opened it yet.
+    """
+    try:
+        entries = [
+            os.path.join(export_dir(), name) for name in os.listdir(export_dir())
+            if name.startswith("history-") and ".tmp." not in name
+        ]
+    except FileNotFoundError:
+        return
+    entries.sort(key=os.path.getmtime, reverse=True)
+    cutoff = time.time() - Config.EXPORT_PRUNE_GRACE_SECONDS
+    for path in entries[Config.EXPORT_CACHE_MAX_FILES:]:
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove old export {path}: {str(e)}")
@@ -0,0 +1,164 @@
+import base64
+import logging
+from datetime import datetime, time, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, select, tuple_
+
+from app.models import HistoricalData1D, StockSymbol
+from app.services.data_version import read_data_version
+from app.services.database import connection_manager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Public column name -> model column. symbol and date are always returned.
+HISTORY_COLUMNS = {
+    "open": HistoricalData1D.open_price,
+    "high": HistoricalData1D.high_price,
+    "low": HistoricalData1D.low_price,
+    "close": HistoricalData1D.close_price,
+    "volume": HistoricalData1D.volume,
+    "open_interest": HistoricalData1D.open_interest,
+}
+DEFAULT_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def parse_columns(value: Optional[str]) -> List[str]:
+    """Validate a comma-separated column projection."""
+    if not value:
+        return list(DEFAULT_COLUMNS)
+    columns = [c.strip() for c in value.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in HISTORY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}; choose from {', '.join(HISTORY_COLUMNS)}")
+    return list(dict.fromkeys(columns))
+
+
+def parse_date(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """Parse YYYY-MM-DD (or a full ISO timestamp) into a UTC datetime bound."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+    if len(value) == 10 and end_of_day:
+        parsed = datetime.combine(parsed.date(), time.max)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def encode_cursor(symbol: str, last_date: datetime) -> str:
+    raw = f"{symbol}|{last_date.isoformat()}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, datetime]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        symbol, last_date = raw.rsplit("|", 1)
+        return symbol, datetime.fromisoformat(last_date)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def fetch_history(symbols: Sequence[str], columns: Sequence[str], start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, limit: Optional[int] = None,
+                  cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read one page of daily candles for `symbols` as parallel column arrays.
+
+    Rows are ordered by (symbol, date) and paged with a keyset cursor on
+    the same pair, so every page is a single range scan of the
+    (symbol, date) index no matter how deep the client has paged.
+
+    Args:
+        symbols (list): Symbols to read.
+        columns (list): Projection, a subset of HISTORY_COLUMNS.
+        start (datetime): Inclusive lower date bound.
+        end (datetime): Inclusive upper date bound.
+        limit (int): Page size, capped at HISTORY_MAX_PAGE_SIZE.
+        cursor (str): `next_cursor` from the previous page.
+
+    Returns:
+        dict: {"columns": {"symbol": [...], "date": [...], <column>: [...]},
+        "count": int, "next_cursor": str or None, "data_version": str} where
+        the data version is read in the same snapshot as the rows.
+    """
+    limit = min(limit or Config.HISTORY_PAGE_SIZE, Config.HISTORY_MAX_PAGE_SIZE)
+    selected = [HistoricalData1D.symbol, HistoricalData1D.date] + [HISTORY_COLUMNS[c] for c in columns]
+
+    conditions = [HistoricalData1D.symbol.in_(list(symbols))]
+    if start is not None:
+        conditions.append(HistoricalData1D.date >= start)
+    if end is not None:
+        conditions.append(HistoricalData1D.date <= end)
+    if cursor:
+        after_symbol, after_date = decode_cursor(cursor)
+        conditions.append(tuple_(HistoricalData1D.symbol, HistoricalData1D.date) > (after_symbol, after_date))
+
+    stmt = (
+        select(*selected)
+        .where(and_(*conditions))
+        .order_by(HistoricalData1D.symbol, HistoricalData1D.date)
+        .limit(limit + 1)
+    )
+    with connection_manager.snapshot_scope("analytics") as conn:
+        rows = conn.execute(stmt).all()
+        data_version = read_data_version(conn)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+
+    names = ["symbol", "date"] + list(columns)
+    if rows:
+        arrays = [list(values) for values in zip(*rows)]
+    else:
+        arrays = [[] for _ in names]
+    return {"columns": dict(zip(names, arrays)), "count": len(rows), "next_cursor": next_cursor,
+            "data_version": data_version}
+
+
+def symbol_exists(symbol: str) -> bool:
+    with connection_manager.get_read_engine("analytics").connect() as conn:
+        return conn.execute(select(StockSymbol.id).where(StockSymbol.symbol == symbol).limit(1)).first() is not None
+
+
+def arrow_schema(names: Sequence[str]):
+    """Arrow schema for history columns; prices are float64."""
+    import pyarrow as pa
+
+    types = {
+        "symbol": pa.string(),
+        "date": pa.timestamp("us", tz="UTC"),
+        "ts": pa.timestamp("us", tz="UTC"),
+        "volume": pa.int64(),
+        "open_interest": pa.int64(),
+    }
+    return pa.schema([(name, types.get(name, pa.float64())) for name in names])
+
+
+def to_record_batch(columns: Dict[str, List[Any]], schema):
+    import pyarrow as pa
+
+    return pa.record_batch(
+        [pa.array(columns[field.name], type=field.type) for field in schema],
+        schema=schema,
+    )
+
+
+def to_arrow_ipc(page: Dict[str, Any]) -> bytes:
+    """Serialise a page as an Arrow IPC stream (one record batch)."""
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    columns = page["columns"]
+    batch = to_record_batch(columns, arrow_schema(list(columns)))
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
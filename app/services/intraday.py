@@ -0,0 +1,483 @@
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import BigInteger, and_, cast, func, select
+
+from app.models import HistoricalData1M, StockSymbol
+from app.services import metrics
+from app.services.background import StockDataUpdater
+from app.services.database import connection_manager, get_db_connection
+from app.services.trading_calendar import trading_calendar
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "upstox_1m"
+PRICE_SCALE = 100  # prices are stored as whole paise
+PG_EPOCH_SECONDS = 946684800  # 2000-01-01T00:00:00Z, the binary COPY timestamp origin
+# NSE session open (09:15 IST) as seconds past midnight UTC; bars are aligned to it
+SESSION_ANCHOR_SECONDS = 3 * 3600 + 45 * 60
+
+# Bar sizes served by downsampling the 1-minute table. Each divides a day,
+# so buckets restart at the session open every day.
+INTERVALS = {"1m": 1, "3m": 3, "5m": 5, "10m": 10, "15m": 15, "30m": 30, "60m": 60}
+PRICE_COLUMNS = ("open", "high", "low", "close")
+COPY_COLUMNS = '"symbolId", "ts", "openPrice", "highPrice", "lowPrice", "closePrice", "volume"'
+
+# One binary COPY tuple: field count, then (length, value) per column
+COPY_ROW_DTYPE = np.dtype([
+    ("field_count", ">i2"),
+    ("symbol_id_len", ">i4"), ("symbol_id", ">i4"),
+    ("ts_len", ">i4"), ("ts", ">i8"),
+    ("open_len", ">i4"), ("open", ">i4"),
+    ("high_len", ">i4"), ("high", ">i4"),
+    ("low_len", ">i4"), ("low", ">i4"),
+    ("close_len", ">i4"), ("close", ">i4"),
+    ("volume_len", ">i4"), ("volume", ">i8"),
+])
+
+_known_partitions = set()
+_partition_lock = threading.Lock()
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"HistoricalData1M_y{month.year}m{month.month:02d}"
+
+
+def ensure_partitions(cursor, first_day: date, last_day: date) -> None:
+    """Create the monthly partitions covering [first_day, last_day] if missing."""
+    month = _month_start(first_day)
+    while month <= last_day:
+        name = partition_name(month)
+        with _partition_lock:
+            known = name in _known_partitions
+        if not known:
+            cursor.execute(
+                f'''
+                CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "HistoricalData1M"
+                FOR VALUES FROM (%s) TO (%s)
+                ''',
+                (f"{month.isoformat()} 00:00:00+00", f"{_next_month(month).isoformat()} 00:00:00+00")
+            )
+            with _partition_lock:
+                _known_partitions.add(name)
+        month = _next_month(month)
+
+
+def list_partitions(cursor) -> List[Tuple[str, date]]:
+    """Existing monthly partitions as (name, month), oldest first."""
+    cursor.execute(
+        '''
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'HistoricalData1M'
+        '''
+    )
+    partitions = []
+    for (name,) in cursor.fetchall():
+        try:
+            suffix = name.rsplit("_", 1)[1]
+            partitions.append((name, date(int(suffix[1:5]), int(suffix[6:8]), 1)))
+        except (IndexError, ValueError):
+            continue
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _parse_timestamps(values: Sequence[str]) -> np.ndarray:
+    """ISO timestamps with a UTC offset -> int64 epoch seconds."""
+    offsets = {v[19:] for v in values}
+    if len(offsets) == 1:
+        offset = offsets.pop()
+        local = np.array([v[:19] for v in values], dtype="datetime64[s]").astype(np.int64)
+        if offset in ("", "Z"):
+            return local
+        shift = datetime.fromisoformat(f"2000-01-01T00:00:00{offset}").utcoffset().total_seconds()
+        return local - int(shift)
+    return np.array([int(datetime.fromisoformat(v).timestamp()) for v in values], dtype=np.int64)
+
+
+def candles_to_rows(symbol_id: int, candles: List[List[Any]]) -> np.ndarray:
+    """
+    Convert Upstox candles ([ts, open, high, low, close, volume, oi]) into
+    binary COPY tuples for HistoricalData1M.
+    """
+    rows = np.zeros(len(candles), dtype=COPY_ROW_DTYPE)
+    if not candles:
+        return rows
+    columns = list(zip(*candles))
+    epoch = _parse_timestamps(columns[0])
+
+    rows["field_count"] = 7
+    rows["symbol_id_len"] = 4
+    rows["symbol_id"] = symbol_id
+    rows["ts_len"] = 8
+    rows["ts"] = (epoch - PG_EPOCH_SECONDS) * 1_000_000
+    for offset, name in enumerate(PRICE_COLUMNS, start=1):
+        rows[f"{name}_len"] = 4
+        rows[name] = np.rint(np.asarray(columns[offset], dtype=np.float64) * PRICE_SCALE)
+    rows["volume_len"] = 8
+    rows["volume"] = np.asarray(columns[5], dtype=np.int64)
+    return rows
+
+
+def encode_copy_binary(rows: np.ndarray) -> bytes:
+    """Frame COPY tuples with the binary COPY header and trailer."""
+    from app.services.bulk_loader import COPY_SIGNATURE
+
+    return COPY_SIGNATURE + b"\x00" * 8 + rows.tobytes() + b"\xff\xff"
+
+
+def write_candles(conn, rows: np.ndarray) -> int:
+    """
+    Insert COPY tuples in one transaction, skipping candles already stored.
+
+    Rows go through a temporary staging table with binary COPY, then into
+    HistoricalData1M with ON CONFLICT DO NOTHING, so refetching a partial
+    session is harmless.
+
+    Returns:
+        int: Rows inserted.
+    """
+    if not len(rows):
+        return 0
+    seconds = rows["ts"].astype(np.int64) // 1_000_000 + PG_EPOCH_SECONDS
+    first_day = datetime.fromtimestamp(int(seconds.min()), timezone.utc).date()
+    last_day = datetime.fromtimestamp(int(seconds.max()), timezone.utc).date()
+
+    cursor = conn.cursor()
+    try:
+        ensure_partitions(cursor, first_day, last_day)
+        cursor.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS "HistoricalData1M_stage" '
+            '(LIKE "HistoricalData1M") ON COMMIT DELETE ROWS'
+        )
+        cursor.copy_expert(
+            f'COPY "HistoricalData1M_stage" ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT binary)',
+            io.BytesIO(encode_copy_binary(rows))
+        )
+        cursor.execute(
+            f'''
+            INSERT INTO "HistoricalData1M" ({COPY_COLUMNS})
+            SELECT {COPY_COLUMNS} FROM "HistoricalData1M_stage"
+            ON CONFLICT ("symbolId", "ts") DO NOTHING
+            '''
+        )
+        inserted = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        with _partition_lock:
+            _known_partitions.clear()
+        raise
+    return inserted
+
+
+class _Pacer:
+    """Spaces upstream requests at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next - now)
+            self._next = max(now, self._next) + self._interval
+        if delay:
+            time.sleep(delay)
+            metrics.INGEST_RATE_LIMIT_WAIT.labels(SOURCE).inc(delay)
+
+
+def _date_chunks(start: date, end: date, days: int) -> Iterator[Tuple[date, date]]:
+    while start <= end:
+        chunk_end = min(start + timedelta(days=days - 1), end)
+        yield start, chunk_end
+        start = chunk_end + timedelta(days=1)
+
+
+def _bounded_map(executor: ThreadPoolExecutor, fn: Callable, items: Iterable, max_pending: int) -> Iterator[Any]:
+    """executor.map that yields in completion order with at most `max_pending` results held."""
+    pending = set()
+    for item in items:
+        pending.add(executor.submit(fn, *item))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def update_intraday(symbols: Optional[Sequence[str]] = None, backfill_days: Optional[int] = None,
+                    progress_callback: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+    """
+    Fetch 1-minute candles from Upstox and store them in HistoricalData1M.
+
+    Each symbol resumes from the session of its latest stored candle, or
+    `backfill_days` back for new symbols. INTRADAY_FETCH_WORKERS threads
+    fetch concurrently under a shared request rate limit, while this thread
+    writes their candles in large binary COPY batches. At most a few
+    symbols' candles are buffered beyond the current batch.
+
+    Args:
+        symbols (list): Symbols to update; all symbols when omitted.
+        backfill_days (int): History to fetch for symbols with no candles.
+        progress_callback (callable): Called with keyword progress after each write.
+
+    Returns:
+        dict: Counts of successful and failed symbols and rows inserted.
+    """
+    backfill_days = backfill_days or Config.INTRADAY_BACKFILL_DAYS
+    today = date.today()
+    default_start = today - timedelta(days=backfill_days)
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if symbols:
+            cursor.execute(
+                'SELECT "id", "symbol", "isin" FROM "StockSymbol" WHERE "symbol" = ANY(%s) ORDER BY "symbol"',
+                (list(symbols),)
+            )
+        else:
+            cursor.execute('SELECT "id", "symbol", "isin" FROM "StockSymbol" ORDER BY "symbol"')
+        targets = cursor.fetchall()
+        # Bounded by the backfill window so only recent partitions are scanned
+        cursor.execute(
+            'SELECT "symbolId", MAX("ts") FROM "HistoricalData1M" WHERE "ts" >= %s GROUP BY "symbolId"',
+            (default_start,)
+        )
+        latest = {row[0]: row[1] for row in cursor.fetchall()}
+
+    if not targets:
+        logger.warning("No symbols found for intraday update")
+        return {"symbols_total": 0, "successful": 0, "failed": 0, "rows_inserted": 0}
+
+    updater = StockDataUpdater(timeout=Config.INTRADAY_FETCH_TIMEOUT)
+    pacer = _Pacer(Config.INTRADAY_REQUESTS_PER_SECOND)
+    yesterday = today - timedelta(days=1)
+    trading_today = trading_calendar.is_trading_day(today)
+
+    def fetch(symbol_id: int, symbol: str, isin: str):
+        start = latest[symbol_id].date() if symbol_id in latest else default_start
+        candles: List[List[Any]] = []
+        for chunk_start, chunk_end in _date_chunks(start, yesterday, Config.INTRADAY_FETCH_DAYS):
+            if not trading_calendar.has_session_between(chunk_start, chunk_end):
+                continue
+            pacer.wait()
+            chunk = updater.fetch_historical_data(isin, chunk_start.isoformat(), chunk_end.isoformat(),
+                                                  interval="1minute")
+            if chunk is None:
+                return symbol, None
+            candles.extend(chunk)
+        if trading_today:
+            pacer.wait()
+            chunk = updater.fetch_intraday_data(isin, interval="1minute")
+            if chunk is None:
+                return symbol, None
+            candles.extend(chunk)
+        try:
+            return symbol, candles_to_rows(symbol_id, candles)
+        except (ValueError, TypeError, IndexError) as e:
+            logger.error(f"Malformed intraday candles for {symbol}: {str(e)}")
+            return symbol, None
+
+    logger.info(f"Starting intraday update for {len(targets)} symbols")
+    started = time.time()
+    successful = failed = rows_inserted = 0
+    recent_errors: List[str] = []
+    buffered: List[np.ndarray] = []
+    buffered_rows = 0
+
+    def flush(conn):
+        nonlocal buffered, buffered_rows, rows_inserted
+        if not buffered:
+            return
+        inserted = write_candles(conn, np.concatenate(buffered))
+        rows_inserted += inserted
+        metrics.INGEST_CANDLES.labels(SOURCE).inc(inserted)
+        buffered, buffered_rows = [], 0
+        if progress_callback:
+            elapsed = time.time() - started
+            done = successful + failed
+            progress_callback(
+                symbols_total=len(targets),
+                symbols_done=done,
+                successful=successful,
+                failed=failed,
+                rows_inserted=rows_inserted,
+                rows_per_second=round(rows_inserted / elapsed, 1) if elapsed else 0.0,
+                failed_symbols=recent_errors
+            )
+
+    workers = max(1, Config.INTRADAY_FETCH_WORKERS)
+    with get_db_connection() as conn, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="intraday-fetch") as executor:
+        for symbol, rows in _bounded_map(executor, fetch, targets, workers * 2):
+            if rows is None:
+                failed += 1
+                metrics.INGEST_SYMBOLS.labels(SOURCE, "failed").inc()
+                recent_errors = (recent_errors + [symbol])[-20:]
+                continue
+            successful += 1
+            metrics.INGEST_SYMBOLS.labels(SOURCE, "success").inc()
+            if len(rows):
+                buffered.append(rows)
+                buffered_rows += len(rows)
+            if buffered_rows >= Config.INTRADAY_WRITE_BATCH_ROWS:
+                flush(conn)
+        flush(conn)
+
+    duration = time.time() - started
+    logger.info(f"Intraday update completed: {successful} successful, {failed} failed, "
+                f"{rows_inserted} rows in {duration:.1f}s")
+    if rows_inserted:
+        connection_manager.mark_primary_written()
+    try:
+        prune_partitions()
+    except Exception as e:
+        logger.warning(f"Could not prune intraday partitions: {str(e)}")
+    return {
+        "symbols_total": len(targets),
+        "successful": successful,
+        "failed": failed,
+        "rows_inserted": rows_inserted,
+        "duration_seconds": round(duration, 2)
+    }
+
+
+def load_intraday(symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+    """
+    Read 1-minute bars for one symbol in [start, end].
+
+    Returns:
+        dict: "ts" (int64 epoch seconds) and open/high/low/close (int64
+        paise) and volume arrays, ascending by ts.
+    """
+    epoch = cast(func.extract("epoch", HistoricalData1M.ts), BigInteger)
+    stmt = (
+        select(epoch, HistoricalData1M.open_price, HistoricalData1M.high_price,
+               HistoricalData1M.low_price, HistoricalData1M.close_price, HistoricalData1M.volume)
+        .join(StockSymbol, StockSymbol.id == HistoricalData1M.symbol_id)
+        .where(and_(StockSymbol.symbol == symbol, HistoricalData1M.ts >= start, HistoricalData1M.ts <= end))
+        .order_by(HistoricalData1M.ts)
+    )
+    with connection_manager.get_read_engine("analytics").connect() as conn:
+        rows = conn.execute(stmt).all()
+    names = ("ts",) + PRICE_COLUMNS + ("volume",)
+    if not rows:
+        return {name: np.empty(0, dtype=np.int64) for name in names}
+    return {name: np.asarray(values, dtype=np.int64) for name, values in zip(names, zip(*rows))}
+
+
+def downsample(bars: Dict[str, np.ndarray], minutes: int) -> Dict[str, np.ndarray]:
+    """
+    Aggregate ascending 1-minute bars into `minutes`-minute bars.
+
+    Buckets are aligned to the 09:15 IST session open and labelled by their
+    start time; empty buckets produce no bar.
+    """
+    ts = bars["ts"]
+    if minutes == 1 or not len(ts):
+        return bars
+    width = minutes * 60
+    bucket = (ts - SESSION_ANCHOR_SECONDS) // width
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.append(starts[1:], len(ts)) - 1
+    return {
+        "ts": bucket[starts] * width + SESSION_ANCHOR_SECONDS,
+        "open": bars["open"][starts],
+        "high": np.maximum.reduceat(bars["high"], starts),
+        "low": np.minimum.reduceat(bars["low"], starts),
+        "close": bars["close"][ends],
+        "volume": np.add.reduceat(bars["volume"], starts),
+    }
+
+
+def intraday_page(symbol: str, interval: str, start: datetime, end: datetime) -> Dict[str, Any]:
+    """Bars for the intraday API in the columnar page shape used by /v1/history."""
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+    bars = downsample(load_intraday(symbol, start, end), INTERVALS[interval])
+    columns = {"ts": [datetime.fromtimestamp(t, timezone.utc) for t in bars["ts"].tolist()]}
+    for name in PRICE_COLUMNS:
+        columns[name] = (bars[name] / PRICE_SCALE).tolist()
+    columns["volume"] = bars["volume"].tolist()
+    return {"columns": columns, "count": len(bars["ts"]), "next_cursor": None}
+
+
+def prune_partitions() -> Dict[str, Any]:
+    """
+    Drop monthly partitions older than INTRADAY_RETENTION_MONTHS.
+
+    When INTRADAY_ARCHIVE_DIR is set each partition is first written there as
+    an Arrow IPC file compressed with INTRADAY_ARCHIVE_COMPRESSION. Dropping
+    a partition is a metadata change, unlike deleting its rows.
+    """
+    if Config.INTRADAY_RETENTION_MONTHS <= 0:
+        return {"dropped": [], "archived": []}
+    cutoff = _month_start(date.today())
+    for _ in range(Config.INTRADAY_RETENTION_MONTHS):
+        cutoff = _month_start(cutoff - timedelta(days=1))
+
+    dropped, archived = [], []
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for name, month in list_partitions(cursor):
+            if month >= cutoff:
+                break
+            if Config.INTRADAY_ARCHIVE_DIR:
+                archived.append(_archive_partition(conn, name))
+            cursor.execute(f'ALTER TABLE "HistoricalData1M" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+            conn.commit()
+            with _partition_lock:
+                _known_partitions.discard(name)
+            dropped.append(name)
+            logger.info(f"Dropped intraday partition {name}")
+    return {"dropped": dropped, "archived": archived}
+
+
+def _archive_partition(conn, name: str) -> str:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    from app.services.bulk_loader import decode_copy_rows
+
+    buffer = io.BytesIO()
+    conn.cursor().copy_expert(
+        f'COPY (SELECT {COPY_COLUMNS} FROM "{name}" ORDER BY 1, 2) TO STDOUT WITH (FORMAT binary)', buffer
+    )
+    rows = decode_copy_rows(buffer.getvalue(), COPY_ROW_DTYPE)
+    table = pa.table({
+        "symbol_id": rows["symbol_id"].astype(np.int32),
+        "ts": pa.array(rows["ts"].astype(np.int64) + PG_EPOCH_SECONDS * 1_000_000, type=pa.timestamp("us", tz="UTC")),
+        **{c: rows[c].astype(np.int32) for c in PRICE_COLUMNS},
+        "volume": rows["volume"].astype(np.int64),
+    })
+    os.makedirs(Config.INTRADAY_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(Config.INTRADAY_ARCHIVE_DIR, f"{name}.arrow")
+    options = ipc.IpcWriteOptions(compression=Config.INTRADAY_ARCHIVE_COMPRESSION or None)
+    with pa.OSFile(path, "wb") as sink, ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    logger.info(f"Archived {len(rows)} rows of {name} to {path}")
+    return path
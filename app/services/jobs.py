@@ -0,0 +1,485 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import JobRun
+from app.services.database import connection_manager
+from app.services.events import event_broker
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+PROGRESS_FLUSH_SECONDS = 1.0
+
+
+class JobQueueFull(Exception):
+    """Raised when this worker's job queue is at capacity."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested."""
+
+
+class JobAlreadyRunning(Exception):
+    """Raised when a job with the same dedupe key is already queued or running."""
+
+    def __init__(self, job: Optional[Dict[str, Any]]):
+        super().__init__("A job with the same dedupe key is already active")
+        self.job = job
+
+
+class JobContext:
+    """Handle passed to a running job for reporting progress and honouring cancellation."""
+
+    def __init__(self, manager: "JobManager", job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+
+    def report_progress(self, **progress: Any) -> None:
+        """Record progress; raises JobCancelled if the job has been cancelled."""
+        self.manager._report_progress(self.job_id, progress)
+        self.check_cancelled()
+
+    def check_cancelled(self) -> None:
+        if self.manager._cancel_requested(self.job_id):
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+
+
+def _json_safe(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=str)) if value is not None else None
+
+
+def _to_dict(run: JobRun, include_result: bool = True) -> Dict[str, Any]:
+    job = {
+        "job_id": run.id,
+        "type": run.job_type,
+        "status": run.status,
+        "params": run.params or {},
+        "progress": run.progress or {},
+        "error": run.error,
+        "cancel_requested": run.cancel_requested,
+        "owner": run.owner,
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "completed_at": run.completed_at.isoformat() if run.completed_at else None,
+    }
+    if run.started_at and run.completed_at:
+        job["duration_seconds"] = round((run.completed_at - run.started_at).total_seconds(), 3)
+    if include_result:
+        job["result"] = run.result
+    return job
+
+
+class JobManager:
+    """
+    Durable job registry backed by the JobRun table, plus a bounded executor.
+
+    Every gunicorn worker shares the registry, so status and duplicate checks
+    are global. A job runs on the worker that accepted it and holds a lease
+    that the worker renews while it is alive; jobs whose lease lapses are
+    marked failed. A dedupe key makes a second active job with the same key
+    impossible (enforced by a partial unique index).
+    """
+
+    def __init__(self):
+        self.app = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def init_app(self, app) -> None:
+        self.app = app
+        app.extensions["job_manager"] = self
+
+    def after_fork(self) -> None:
+        """Drop executor and heartbeat state inherited from the parent process."""
+        self._executor = None
+        self._local = {}
+        self._lock = threading.Lock()
+        self._heartbeat = None
+
+    @property
+    def owner(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=Config.JOB_WORKERS,
+                                                        thread_name_prefix="job")
+        return self._executor
+
+    def _lease_expiry(self):
+        return func.now() + timedelta(seconds=Config.JOB_LEASE_SECONDS)
+
+    def submit(self, job_type: str, target: Callable[[JobContext], Any],
+               params: Optional[Dict[str, Any]] = None, dedupe_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Register a job and queue `target(job)` on this worker's executor.
+
+        Raises:
+            JobQueueFull: If `JOB_MAX_QUEUED` jobs are already waiting here.
+            JobAlreadyRunning: If an active job holds the same dedupe key.
+        """
+        with self._lock:
+            queued = sum(1 for state in self._local.values() if not state["started"])
+        if queued >= Config.JOB_MAX_QUEUED:
+            raise JobQueueFull(f"{queued} jobs already queued")
+
+        job_id = uuid.uuid4().hex
+        try:
+            with connection_manager.session_scope("api") as session:
+                if dedupe_key:
+                    self._reap_expired(session, dedupe_key)
+                run = JobRun(
+                    id=job_id,
+                    job_type=job_type,
+                    dedupe_key=dedupe_key,
+                    status="queued",
+                    params=_json_safe(params or {}),
+                    progress={},
+                    cancel_requested=False,
+                    owner=self.owner,
+                    lease_expires_at=self._lease_expiry()
+                )
+                session.add(run)
+                session.flush()
+                session.refresh(run)
+                job = _to_dict(run)
+        except IntegrityError:
+            raise JobAlreadyRunning(self._find_active(dedupe_key))
+
+        with self._lock:
+            self._local[job_id] = {"started": False, "progress": {}, "cancel": False, "flushed_at": 0.0}
+        self._ensure_heartbeat()
+        self.executor.submit(self._run, job_id, target)
+        logger.info(f"Job queued - ID: {job_id}, Type: {job_type}")
+        return job
+
+    @contextmanager
+    def claim(self, job_type: str, dedupe_key: str,
+              params: Optional[Dict[str, Any]] = None) -> Iterator[JobContext]:
+        """
+        Run work on the calling thread as a registered job holding `dedupe_key`.
+
+        For work that must not overlap a queued job of the same kind but is
+        not itself queued, e.g. a synchronous request or a pipeline stage.
+        The job is recorded as running on entry and finished on exit.
+
+        Raises:
+            JobAlreadyRunning: If an active job holds the same dedupe key.
+        """
+        job_id = uuid.uuid4().hex
+        try:
+            with connection_manager.session_scope("api") as session:
+                self._reap_expired(session, dedupe_key)
+                session.add(JobRun(
+                    id=job_id,
+                    job_type=job_type,
+                    dedupe_key=dedupe_key,
+                    status="running",
+                    params=_json_safe(params or {}),
+                    progress={},
+                    cancel_requested=False,
+                    owner=self.owner,
+                    started_at=func.now(),
+                    lease_expires_at=self._lease_expiry()
+                ))
+        except IntegrityError:
+            raise JobAlreadyRunning(self._find_active(dedupe_key))
+
+        with self._lock:
+            self._local[job_id] = {"started": True, "progress": {}, "cancel": False, "flushed_at": 0.0}
+        self._ensure_heartbeat()
+        logger.info(f"Job claimed - ID: {job_id}, Type: {job_type}")
+        try:
+            yield JobContext(self, job_id)
+        except JobCancelled:
+            self._finish(job_id, "cancelled", error="Cancelled by request")
+            raise
+        except BaseException as e:
+            self._finish(job_id, "failed", error=str(e))
+            raise
+        else:
+            self._finish(job_id, "completed")
+        finally:
+            with self._lock:
+                self._local.pop(job_id, None)
+
+    def _run(self, job_id: str, target: Callable[[JobContext], Any]) -> None:
+        started = time.time()
+        try:
+            with connection_manager.session_scope("api") as session:
+                claimed = session.execute(
+                    update(JobRun)
+                    .where(JobRun.id == job_id, JobRun.status == "queued", JobRun.cancel_requested.is_(False))
+                    .values(status="running", started_at=func.now(), owner=self.owner,
+                            lease_expires_at=self._lease_expiry())
+                ).rowcount
+            if not claimed:
+                logger.info(f"Job {job_id} was cancelled or reaped before it started")
+                return
+
+            with self._lock:
+                self._local[job_id]["started"] = True
+            self._publish(job_id, "status", status="running")
+
+            context = JobContext(self, job_id)
+            if self.app is not None:
+                with self.app.app_context():
+                    result = target(context)
+            else:
+                result = target(context)
+            self._finish(job_id, "completed", result=_json_safe(result))
+            logger.info(f"Job completed - ID: {job_id}, Time: {time.time() - started:.2f}s")
+        except JobCancelled:
+            self._finish(job_id, "cancelled", error="Cancelled by request")
+            logger.info(f"Job cancelled - ID: {job_id}")
+        except Exception as e:
+            self._finish(job_id, "failed", error=str(e))
+            logger.exception(f"Job failed - ID: {job_id}", exc_info=True)
+        finally:
+            with self._lock:
+                self._local.pop(job_id, None)
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            progress = dict(self._local.get(job_id, {}).get("progress", {}))
+        values = {"status": status, "completed_at": func.now(), "error": error, "lease_expires_at": None}
+        if result is not None:
+            values["result"] = result
+        if progress:
+            values["progress"] = progress
+        try:
+            with connection_manager.session_scope("api") as session:
+                session.execute(update(JobRun).where(JobRun.id == job_id).values(**values))
+                self._prune(session)
+        except Exception as e:
+            logger.error(f"Could not record final state of job {job_id}: {str(e)}")
+        self._publish(job_id, "status", status=status, error=error)
+
+    def _report_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        with self._lock:
+            state = self._local.get(job_id)
+            if state is None:
+                return
+            state["progress"].update(progress)
+            snapshot = dict(state["progress"])
+            due = time.time() - state["flushed_at"] >= PROGRESS_FLUSH_SECONDS
+        self._publish(job_id, "progress", status="running", progress=snapshot)
+        if due:
+            self._flush([job_id])
+
+    def _publish(self, job_id: str, event: str, **data: Any) -> None:
+        event_broker.publish(job_id, dict(data, event=event, job_id=job_id))
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        state = self._local.get(job_id)
+        return bool(state and state["cancel"])
+
+    def _flush(self, job_ids: List[str]) -> None:
+        """Persist progress, renew leases and pick up cancellation flags for local jobs."""
+        try:
+            with connection_manager.session_scope("api") as session:
+                for job_id in job_ids:
+                    with self._lock:
+                        state = self._local.get(job_id)
+                        if state is None:
+                            continue
+                        progress = dict(state["progress"])
+                        state["flushed_at"] = time.time()
+                    row = session.execute(
+                        update(JobRun)
+                        .where(JobRun.id == job_id, JobRun.status.in_(ACTIVE_STATUSES))
+                        .values(progress=_json_safe(progress), lease_expires_at=self._lease_expiry())
+                        .returning(JobRun.cancel_requested)
+                    ).first()
+                    if row is not None and row[0]:
+                        with self._lock:
+                            state["cancel"] = True
+        except Exception as e:
+            logger.warning(f"Job heartbeat failed: {str(e)}")
+
+    def _ensure_heartbeat(self) -> None:
+        with self._lock:
+            if self._heartbeat is not None and self._heartbeat.is_alive():
+                return
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(Config.JOB_LEASE_SECONDS / 3, 1.0)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                job_ids = list(self._local)
+            if not job_ids:
+                with self._lock:
+                    if not self._local:
+                        self._heartbeat = None
+                        return
+                continue
+            self._flush(job_ids)
+
+    def _reap_expired(self, session, dedupe_key: Optional[str] = None) -> None:
+        """Mark active jobs whose worker stopped renewing the lease as failed."""
+        query = update(JobRun).where(
+            JobRun.status.in_(ACTIVE_STATUSES),
+            JobRun.lease_expires_at < func.now()
+        )
+        if dedupe_key:
+            query = query.where(JobRun.dedupe_key == dedupe_key)
+        reaped = session.execute(
+            query.values(status="failed", error="Lease expired; worker lost", completed_at=func.now())
+        ).rowcount
+        if reaped:
+            logger.warning(f"Marked {reaped} job(s) with expired leases as failed")
+
+    def _prune(self, session) -> None:
+        """Keep only the newest `JOB_HISTORY_LIMIT` finished jobs."""
+        keep = (
+            select(JobRun.id)
+            .where(JobRun.status.in_(FINISHED_STATUSES))
+            .order_by(JobRun.created_at.desc())
+            .limit(Config.JOB_HISTORY_LIMIT)
+        )
+        session.execute(
+            delete(JobRun)
+            .where(JobRun.status.in_(FINISHED_STATUSES), JobRun.id.not_in(keep.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+
+    def _find_active(self, dedupe_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        with connection_manager.session_scope("api") as session:
+            run = (
+                session.query(JobRun)
+                .filter(JobRun.dedupe_key == dedupe_key, JobRun.status.in_(ACTIVE_STATUSES))
+                .first()
+            )
+            return _to_dict(run, include_result=False) if run else None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with connection_manager.session_scope("api") as session:
+            self._reap_expired(session)
+            run = session.get(JobRun, job_id)
+            return _to_dict(run) if run else None
+
+    def list(self, job_type: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        with connection_manager.session_scope("api") as session:
+            self._reap_expired(session)
+            query = session.query(JobRun)
+            if job_type:
+                query = query.filter(JobRun.job_type == job_type)
+            runs = query.order_by(JobRun.created_at.desc()).limit(limit).all()
+            return [_to_dict(run, include_result=False) for run in runs]
+
+    def active(self, job_type: str) -> List[Dict[str, Any]]:
+        with connection_manager.session_scope("api") as session:
+            self._reap_expired(session)
+            runs = (
+                session.query(JobRun)
+                .filter(JobRun.job_type == job_type, JobRun.status.in_(ACTIVE_STATUSES))
+                .order_by(JobRun.created_at.asc())
+                .all()
+            )
+            return [_to_dict(run, include_result=False) for run in runs]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Request cancellation. Queued jobs are cancelled immediately; running
+        jobs stop at their next progress report.
+        """
+        with connection_manager.session_scope("api") as session:
+            run = session.get(JobRun, job_id, with_for_update=True)
+            if run is None:
+                return None
+            if run.status in ACTIVE_STATUSES:
+                run.cancel_requested = True
+                if run.status == "queued":
+                    run.status = "cancelled"
+                    run.completed_at = func.now()
+                    run.error = "Cancelled by request"
+                session.flush()
+                session.refresh(run)
+            job = _to_dict(run, include_result=False)
+
+        with self._lock:
+            state = self._local.get(job_id)
+            if state is not None:
+                state["cancel"] = True
+        if job["status"] == "cancelled":
+            self._publish(job_id, "status", status="cancelled", error=job["error"])
+        logger.info(f"Cancellation requested - Job ID: {job_id}, Status: {job['status']}")
+        return job
+
+    def watch(self, job_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield (event, data) pairs for a job until it finishes.
+
+        Progress of jobs running in this worker arrives through the in-process
+        event broker as it is reported. Jobs owned by another worker are
+        followed by polling the registry every `JOB_EVENTS_POLL_SECONDS`.
+        A "keepalive" event is yielded when nothing else has been sent for
+        `JOB_EVENTS_KEEPALIVE_SECONDS`.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return
+        yield "status", job
+        if job["status"] in FINISHED_STATUSES:
+            return
+
+        last_progress = job["progress"]
+        last_sent = time.monotonic()
+        with event_broker.subscribe(job_id) as subscription:
+            while True:
+                events = subscription.get(timeout=Config.JOB_EVENTS_POLL_SECONDS)
+                if events:
+                    # Progress events are cumulative snapshots; only the newest one matters
+                    progress = [e for e in events if e["event"] == "progress"]
+                    if progress:
+                        last_progress = progress[-1]["progress"]
+                        yield "progress", progress[-1]
+                    for event in events:
+                        if event["event"] != "status":
+                            continue
+                        if event["status"] in FINISHED_STATUSES:
+                            yield "status", self.get(job_id) or event
+                            return
+                        yield "status", event
+                    last_sent = time.monotonic()
+                elif job_id not in self._local:
+                    job = self.get(job_id)
+                    if job is None:
+                        return
+                    if job["status"] in FINISHED_STATUSES:
+                        yield "status", job
+                        return
+                    if job["progress"] != last_progress:
+                        last_progress = job["progress"]
+                        yield "progress", {"event": "progress", "job_id": job_id,
+                                           "status": job["status"], "progress": last_progress}
+                        last_sent = time.monotonic()
+
+                if time.monotonic() - last_sent >= Config.JOB_EVENTS_KEEPALIVE_SECONDS:
+                    yield "keepalive", {}
+                    last_sent = time.monotonic()
+
+
+job_manager = JobManager()
@@ -0,0 +1,141 @@
+import logging
+import os
+import time
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+from app.utils.sql import classify
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement fingerprint",
+    ["profile", "operation", "table", "fingerprint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["profile"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Connections currently checked out of each pool",
+    ["profile"],
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total",
+    "Coalesced computations by call family and role (leader, follower, remote)",
+    ["name", "role"],
+)
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total",
+    "Admission control outcomes by cost class (admitted, rate_limited, queue_full, queue_timeout)",
+    ["cost_class", "result"],
+)
+INGEST_SYMBOLS = Counter(
+    "ingest_symbols_total",
+    "Symbols processed by ingestion, by source and result",
+    ["source", "result"],
+)
+INGEST_CANDLES = Counter(
+    "ingest_candles_total",
+    "Candles written by ingestion",
+    ["source"],
+)
+INGEST_API_ERRORS = Counter(
+    "ingest_api_errors_total",
+    "Upstream API failures during ingestion",
+    ["source", "reason"],
+)
+INGEST_RATE_LIMIT_WAIT = Counter(
+    "ingest_rate_limit_wait_seconds_total",
+    "Time ingestion spent sleeping to respect upstream rate limits",
+    ["source"],
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(seconds)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_single_flight(name: str, role: str) -> None:
+    SINGLE_FLIGHT_CALLS.labels(name, role).inc()
+
+
+def record_admission(cost_class: str, result: str) -> None:
+    ADMISSION_DECISIONS.labels(cost_class, result).inc()
+
+
+def observe_pool_wait(profile: str, seconds: float) -> None:
+    DB_POOL_WAIT.labels(profile).observe(seconds)
+
+
+def instrument_engine(engine, profile: str) -> None:
+    """Time every statement and track checked-out connections for one engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def observe_query(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_start", None)
+        if started is None:
+            return
+        info = classify(statement)
+        DB_QUERY_LATENCY.labels(profile, info.operation, info.table, info.fingerprint_id).observe(
+            time.perf_counter() - started
+        )
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.labels(profile).inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.labels(profile).dec()
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    Under gunicorn, set PROMETHEUS_MULTIPROC_DIR so every worker writes its
+    samples there and any worker can serve the aggregate.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,11 +1,14 @@
 from app.models import HistoricalData1D, SMAResult, StockSymbol
-from app.extensions import db
+from app.services.database import connection_manager
+from app.services import metrics
+from app.services.data_version import current_data_version
+from app.services.price_arrays import PriceArrays
+from config import Config
 from sqlalchemy import func
-import pandas as pd
-import ta
+import numpy as np
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -18,74 +21,205 @@ def sanitize_result(r: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def update_sma_results(sma_period: int, threshold_pct: float) -> int:
+def update_sma_results(sma_period: int, threshold_pct: float,
+                       progress_callback: Optional[Callable[..., None]] = None) -> int:
     """
     Updates today's SMA results.
     """
     try:
-        logger.info(f"Updating SMA results for period {sma_period}, threshold {threshold_pct}%")
-        results = get_stocks_near_sma(sma_period, threshold_pct)
+        with connection_manager.session_scope("ingest") as session:
+            logger.info(f"Updating SMA results for period {sma_period}, threshold {threshold_pct}%")
+            results = get_stocks_near_sma(sma_period, threshold_pct, progress_callback)
+            if progress_callback:
+                progress_callback(phase="storing", matches=len(results))
 
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        tomorrow_start = today_start + timedelta(days=1)
+            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            tomorrow_start = today_start + timedelta(days=1)
 
-        inserted_count = 0
+            inserted_count = 0
 
-        for r in results:
-            try:
-                r = sanitize_result(r)
+            for r in results:
+                try:
+                    r = sanitize_result(r)
 
-                existing = SMAResult.query.filter(
-                    SMAResult.symbol == r["symbol"],
-                    SMAResult.sma_period == sma_period,
-                    SMAResult.date_generated >= today_start,
-                    SMAResult.date_generated < tomorrow_start
-                ).first()
+                    existing = session.query(SMAResult).filter(
+                        SMAResult.symbol == r["symbol"],
+                        SMAResult.sma_period == sma_period,
+                        SMAResult.date_generated >= today_start,
+                        SMAResult.date_generated < tomorrow_start
+                    ).first()
 
-                if existing:
-                    logger.debug(f"Skipping duplicate for {r['symbol']} on {today_start.date()}")
-                    continue
+                    if existing:
+                        logger.debug(f"Skipping duplicate for {r['symbol']} on {today_start.date()}")
+                        continue
 
-                entry = SMAResult(
-                    symbol=r["symbol"],
-                    sma_period=sma_period,
-                    threshold_pct=threshold_pct,
-                    close_price=r["close"],
-                    sma_value=r["sma"],
-                    deviation_pct=r["proximity_pct"]
-                )
-                db.session.add(entry)
-                inserted_count += 1
+                    entry = SMAResult(
+                        symbol=r["symbol"],
+                        sma_period=sma_period,
+                        threshold_pct=threshold_pct,
+                        close_price=r["close"],
+                        sma_value=r["sma"],
+                        deviation_pct=r["proximity_pct"]
+                    )
+                    session.add(entry)
+                    inserted_count += 1
 
-            except Exception as e:
-                logger.exception(f"Error processing result for {r.get('symbol', 'unknown')}", exc_info=True)
-                continue
+                except Exception as e:
+                    logger.exception(f"Error processing result for {r.get('symbol', 'unknown')}", exc_info=True)
+                    continue
 
-        # Clean up old results
-        cutoff_datetime = datetime.utcnow() - timedelta(days=7)
-        deleted = SMAResult.query.filter(
-            SMAResult.sma_period == sma_period,
-            SMAResult.date_generated < cutoff_datetime
-        ).delete()
-        logger.info(f"Deleted {deleted} old SMA results older than {cutoff_datetime.date()}")
+            # Clean up old results
+            cutoff_datetime = datetime.utcnow() - timedelta(days=7)
+            deleted = session.query(SMAResult).filter(
+                SMAResult.sma_period == sma_period,
+                SMAResult.date_generated < cutoff_datetime
+            ).delete()
+            logger.info(f"Deleted {deleted} old SMA results older than {cutoff_datetime.date()}")
 
-        db.session.commit()
-        logger.info(f"Inserted {inserted_count} new SMA results")
-        return inserted_count
+            session.commit()
+            connection_manager.mark_primary_written()
+            logger.info(f"Inserted {inserted_count} new SMA results")
+            return inserted_count
 
     except Exception as e:
-        db.session.rollback()
         logger.exception("Error updating SMA results", exc_info=True)
         raise
 
 
-def get_stocks_near_sma(sma_window: int, threshold_pct: float) -> List[Dict[str, Any]]:
+def _load_close_arrays(data_version: Optional[str] = None) -> Optional[PriceArrays]:
+    """
+    Return closes grouped by symbol.
+
+    The shared store and the snapshot are used only if they were built from
+    `data_version` (the current database version by default). A failed
+    refresh or a write from outside the app leaves them behind, and they are
+    then skipped for the bulk load.
+
+    Sources in order: the shared store, the Arrow snapshot, then a binary
+    COPY bulk load from the database. Returns None when all of them fail, in
+    which case callers fall back to per-symbol ORM queries.
+    """
+    # Imported here so pyarrow and asyncpg load on first use, not at startup
+    from app.services.bulk_loader import load_price_arrays as load_price_arrays_from_database
+    from app.services.shared_store import shared_price_store
+    from app.services.snapshot import load_price_arrays, read_manifest
+
+    if data_version is None:
+        data_version = current_data_version()
+
+    if Config.SHARED_STORE_ENABLED:
+        try:
+            arrays = shared_price_store.get()
+            if arrays is not None and not _is_current(shared_price_store.data_version, data_version):
+                logger.info(f"Shared price store is at data version {shared_price_store.data_version}, "
+                            f"database at {data_version}; skipping it")
+                arrays = None
+            metrics.record_cache("shared_store", arrays is not None)
+            if arrays is not None:
+                logger.info(f"Using shared price store version {shared_price_store.version}")
+                return arrays
+        except Exception as e:
+            logger.warning(f"Shared price store unavailable: {str(e)}")
+
+    if Config.SNAPSHOT_ENABLED:
+        try:
+            manifest = read_manifest()
+            if manifest is not None and _is_current(manifest.get("data_version"), data_version):
+                arrays = load_price_arrays(("close",))
+            else:
+                if manifest is not None:
+                    logger.info(f"Snapshot is at data version {manifest.get('data_version')}, "
+                                f"database at {data_version}; skipping it")
+                arrays = None
+            metrics.record_cache("snapshot", arrays is not None)
+            if arrays is not None:
+                logger.info(f"Loaded {arrays.row_count} closes for {len(arrays)} symbols from snapshot")
+                return arrays.dropna("close")
+        except Exception as e:
+            logger.warning(f"Snapshot unavailable, reading closes from database: {str(e)}")
+
+    try:
+        return load_price_arrays_from_database(("close",)).dropna("close")
+    except Exception as e:
+        logger.warning(f"Bulk price load failed, falling back to per-symbol queries: {str(e)}")
+
+    return None
+
+
+def _near_sma_from_arrays(arrays: PriceArrays, sma_window: int, threshold_pct: float) -> List[Dict[str, Any]]:
+    """Evaluate the latest close against its SMA for every symbol at once."""
+    closes = arrays.columns["close"]
+    counts = np.diff(arrays.offsets)
+    eligible = np.flatnonzero(counts >= sma_window)
+    ends = arrays.offsets[1:][eligible]
+
+    precomputed = arrays.columns.get(f"sma_{sma_window}")
+    if precomputed is not None:
+        sma = precomputed[ends - 1]
+    else:
+        cumulative = np.concatenate(([0.0], np.cumsum(closes)))
+        sma = (cumulative[ends] - cumulative[ends - sma_window]) / sma_window
+
+    latest = closes[ends - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proximity = np.abs(latest - sma) / sma * 100
+    matches = np.flatnonzero(proximity <= threshold_pct)
+
+    logger.info(f"Evaluated {len(eligible)} symbols with sufficient data")
+    # Round and convert whole columns at once rather than per row
+    symbols = [arrays.symbols[i] for i in eligible[matches]]
+    columns = zip(
+        symbols,
+        np.round(latest[matches], 2).tolist(),
+        np.round(sma[matches], 2).tolist(),
+        np.round(proximity[matches], 2).tolist()
+    )
+    return [
+        {"symbol": symbol, "close": close, "sma": sma_value, "proximity_pct": proximity_pct}
+        for symbol, close, sma_value, proximity_pct in columns
+    ]
+
+
+def _iter_db_close_series(min_rows: int) -> Iterator[Tuple[str, np.ndarray]]:
+    """Yield (symbol, closes) from the database for symbols with at least `min_rows` rows."""
+    with connection_manager.session_scope("analytics", read_only=True) as session:
+        symbols_with_count = (
+            session.query(HistoricalData1D.symbol)
+            .group_by(HistoricalData1D.symbol)
+            .having(func.count(HistoricalData1D.id) >= min_rows)
+            .all()
+        )
+
+        logger.info(f"Found {len(symbols_with_count)} symbols with sufficient data")
+
+        for (symbol,) in symbols_with_count:
+            rows = (
+                session.query(HistoricalData1D.close_price)
+                .filter(HistoricalData1D.symbol == symbol)
+                .filter(HistoricalData1D.close_price.isnot(None))
+                .order_by(HistoricalData1D.date.asc())
+                .all()
+            )
+            if len(rows) >= min_rows:
+                yield symbol, np.array([r[0] for r in rows], dtype=np.float64)
+
+
+def _is_current(built_from: Optional[str], data_version: Optional[str]) -> bool:
+    """Whether a cache built from `built_from` may serve `data_version` (unknown if the DB is unreachable)."""
+    return data_version is None or built_from == data_version
+
+
+def get_stocks_near_sma(sma_window: int, threshold_pct: float,
+                        progress_callback: Optional[Callable[..., None]] = None,
+                        data_version: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Get stocks that are near their SMA.
 
     Args:
         sma_window (int): SMA window period.
         threshold_pct (float): Threshold percentage.
+        progress_callback (callable): Optional progress reporter for background jobs.
+        data_version (str): Data version the caller is answering for, if already read.
 
     Returns:
         List: List of stocks near SMA.
@@ -93,35 +227,21 @@ def get_stocks_near_sma(sma_window: int, threshold_pct: float) -> List[Dict[str,
     try:
         logger.info(f"Calculating stocks near SMA{sma_window} within {threshold_pct}%")
 
-        symbols_with_count = (
-            db.session.query(HistoricalData1D.symbol)
-            .group_by(HistoricalData1D.symbol)
-            .having(func.count(HistoricalData1D.id) >= sma_window)
-            .all()
-        )
+        arrays = _load_close_arrays(data_version)
+        if arrays is not None:
+            results = _near_sma_from_arrays(arrays, sma_window, threshold_pct)
+            logger.info(f"Found {len(results)} stocks near SMA{sma_window}")
+            return results
 
-        logger.info(f"Found {len(symbols_with_count)} symbols with sufficient data")
+        import pandas as pd
+        import ta
 
         results = []
         processed_count = 0
 
-        for (symbol,) in symbols_with_count:
+        for symbol, closes in _iter_db_close_series(sma_window):
             try:
-                rows = (
-                    db.session.query(HistoricalData1D)
-                    .filter(HistoricalData1D.symbol == symbol)
-                    .filter(HistoricalData1D.close_price.isnot(None))
-                    .order_by(HistoricalData1D.date.asc())
-                    .all()
-                )
-
-                if len(rows) < sma_window:
-                    continue
-
-                df = pd.DataFrame([
-                    {'date': r.date, 'close': float(r.close_price)}
-                    for r in rows if r.close_price is not None
-                ])
+                df = pd.DataFrame({'close': closes})
 
                 if df.empty or df['close'].isnull().any():
                     continue
@@ -148,6 +268,8 @@ def get_stocks_near_sma(sma_window: int, threshold_pct: float) -> List[Dict[str,
 
                 if processed_count % 100 == 0:
                     logger.info(f"Processed {processed_count} symbols...")
+                    if progress_callback:
+                        progress_callback(phase="scanning", symbols_processed=processed_count)
 
             except Exception as e:
                 logger.exception(f"Error processing symbol {symbol}", exc_info=True)
@@ -161,7 +283,8 @@ def get_stocks_near_sma(sma_window: int, threshold_pct: float) -> List[Dict[str,
         raise
 
 
-def backfill_sma_results(sma_period: int, threshold_pct: float, days: int = 7) -> None:
+def backfill_sma_results(sma_period: int, threshold_pct: float, days: int = 7,
+                         progress_callback: Optional[Callable[..., None]] = None) -> None:
     """
     Backfill SMA results for the past `days` number of days.
 
@@ -169,102 +292,109 @@ def backfill_sma_results(sma_period: int, threshold_pct: float, days: int = 7) -
         sma_period (int): SMA window period.
         threshold_pct (float): Proximity threshold.
         days (int): Number of days to backfill.
+        progress_callback (callable): Optional progress reporter for background jobs.
     """
-    try:
-        logger.info(f"Backfilling SMA results for the last {days} days")
-        trading_dates = (
-            db.session.query(HistoricalData1D.date)
-            .distinct()
-            .order_by(HistoricalData1D.date.desc())
-            .limit(days)
-            .all()
-        )
-        unique_dates = sorted({row[0].date() for row in trading_dates})
-        if not unique_dates:
-            logger.warning("No trading dates found for backfill")
-            return
-        symbols_with_count = (
-            db.session.query(HistoricalData1D.symbol)
-            .group_by(HistoricalData1D.symbol)
-            .having(func.count(HistoricalData1D.id) >= sma_period + days)
-            .all()
-        )
-
-        for target_date in unique_dates:
-            day_start = datetime.combine(target_date, datetime.min.time())
-            day_end = day_start + timedelta(days=1)
-
-            logger.info(f"Processing SMA for trading date: {target_date}")
-
-            for (symbol,) in symbols_with_count:
-                try:
-                    rows = (
-                        db.session.query(HistoricalData1D)
-                        .filter(HistoricalData1D.symbol == symbol)
-                        .filter(HistoricalData1D.date <= day_end)
-                        .filter(HistoricalData1D.close_price.isnot(None))
-                        .order_by(HistoricalData1D.date.asc())
-                        .all()
-                    )
-
-                    if len(rows) < sma_period:
-                        continue
-
-                    df = pd.DataFrame([
-                        {'date': r.date, 'close': float(r.close_price)}
-                        for r in rows if r.date <= day_end
-                    ])
-
-                    df = df[df['date'] <= pd.Timestamp(day_end)]
-
-                    if df.empty or df['close'].isnull().any():
-                        continue
-
-                    df["sma"] = ta.trend.sma_indicator(df['close'], window=sma_period)
-
-                    match = df[df['date'].dt.date == target_date]
+    import pandas as pd
+    import ta
 
-                    if match.empty:
-                        continue
-
-                    latest = match.iloc[-1]
-
-                    if pd.isna(latest['sma']):
-                        continue
-
-                    proximity_pct = abs(latest['close'] - latest['sma']) / latest['sma'] * 100
-                    if proximity_pct > threshold_pct:
-                        continue
-
-                    existing = SMAResult.query.filter(
-                        SMAResult.symbol == symbol,
-                        SMAResult.sma_period == sma_period,
-                        SMAResult.date_generated >= day_start,
-                        SMAResult.date_generated < day_end
-                    ).first()
-
-                    if existing:
+    try:
+        with connection_manager.session_scope("ingest") as session:
+            logger.info(f"Backfilling SMA results for the last {days} days")
+            trading_dates = (
+                session.query(HistoricalData1D.date)
+                .distinct()
+                .order_by(HistoricalData1D.date.desc())
+                .limit(days)
+                .all()
+            )
+            unique_dates = sorted({row[0].date() for row in trading_dates})
+            if not unique_dates:
+                logger.warning("No trading dates found for backfill")
+                return
+            symbols_with_count = (
+                session.query(HistoricalData1D.symbol)
+                .group_by(HistoricalData1D.symbol)
+                .having(func.count(HistoricalData1D.id) >= sma_period + days)
+                .all()
+            )
+
+            for date_index, target_date in enumerate(unique_dates):
+                day_start = datetime.combine(target_date, datetime.min.time())
+                day_end = day_start + timedelta(days=1)
+
+                logger.info(f"Processing SMA for trading date: {target_date}")
+
+                for (symbol,) in symbols_with_count:
+                    try:
+                        rows = (
+                            session.query(HistoricalData1D)
+                            .filter(HistoricalData1D.symbol == symbol)
+                            .filter(HistoricalData1D.date <= day_end)
+                            .filter(HistoricalData1D.close_price.isnot(None))
+                            .order_by(HistoricalData1D.date.asc())
+                            .all()
+                        )
+
+                        if len(rows) < sma_period:
+                            continue
+
+                        df = pd.DataFrame([
+                            {'date': r.date, 'close': float(r.close_price)}
+                            for r in rows if r.date <= day_end
+                        ])
+
+                        df = df[df['date'] <= pd.Timestamp(day_end)]
+
+                        if df.empty or df['close'].isnull().any():
+                            continue
+
+                        df["sma"] = ta.trend.sma_indicator(df['close'], window=sma_period)
+
+                        match = df[df['date'].dt.date == target_date]
+
+                        if match.empty:
+                            continue
+
+                        latest = match.iloc[-1]
+
+                        if pd.isna(latest['sma']):
+                            continue
+
+                        proximity_pct = abs(latest['close'] - latest['sma']) / latest['sma'] * 100
+                        if proximity_pct > threshold_pct:
+                            continue
+
+                        existing = session.query(SMAResult).filter(
+                            SMAResult.symbol == symbol,
+                            SMAResult.sma_period == sma_period,
+                            SMAResult.date_generated >= day_start,
+                            SMAResult.date_generated < day_end
+                        ).first()
+
+                        if existing:
+                            continue
+
+                        entry = SMAResult(
+                            symbol=symbol,
+                            sma_period=sma_period,
+                            threshold_pct=threshold_pct,
+                            close_price=round(float(latest['close']), 2),
+                            sma_value=round(float(latest['sma']), 2),
+                            deviation_pct=round(float(proximity_pct), 2),
+                            date_generated=day_start
+                        )
+                        session.add(entry)
+
+                    except Exception as e:
+                        logger.exception(f"Error processing symbol {symbol} on {target_date}", exc_info=True)
                         continue
 
-                    entry = SMAResult(
-                        symbol=symbol,
-                        sma_period=sma_period,
-                        threshold_pct=threshold_pct,
-                        close_price=round(float(latest['close']), 2),
-                        sma_value=round(float(latest['sma']), 2),
-                        deviation_pct=round(float(proximity_pct), 2),
-                        date_generated=day_start
-                    )
-                    db.session.add(entry)
-
-                except Exception as e:
-                    logger.exception(f"Error processing symbol {symbol} on {target_date}", exc_info=True)
-                    continue
-
-            db.session.commit()
-            logger.info(f"✅ Finished inserting SMA results for {target_date}")
+                session.commit()
+                logger.info(f"✅ Finished inserting SMA results for {target_date}")
+                if progress_callback:
+                    progress_callback(dates_done=date_index + 1, dates_total=len(unique_dates),
+                                      last_date=target_date.isoformat())
 
     except Exception as e:
-        db.session.rollback()
         logger.exception("❌ Error in backfill_sma_results", exc_info=True)
         raise
\ No newline at end of file
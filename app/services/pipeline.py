@@ -0,0 +1,381 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+from sqlalchemy import func
+
+from app.models import PipelineStageRun
+from app.services.background import UPDATE_JOB_TYPE, update_all_symbols
+from app.services.bhavcopy_update import BHAVCOPY_JOB_TYPE, download_and_process_bhavcopy_nse
+from app.services.data_version import current_data_version
+from app.services.database import connection_manager
+from app.services.jobs import JobAlreadyRunning, JobCancelled, JobQueueFull, job_manager
+from app.services.near_sma import update_sma_results
+from app.services.sma_crossing import update_sma_cross_results
+from app.services.trading_calendar import trading_calendar
+from app.utils.process import under_gunicorn
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_JOB_TYPE = "pipeline"
+
+
+class Stage:
+    """
+    One step of the post-market pipeline.
+
+    Args:
+        name (str): Stage name, also used in the PipelineStageRun table.
+        run (callable): Called with a progress callback; returns a JSON-able result.
+        depends_on (sequence): Stages that must finish before this one starts.
+        fingerprint (callable): Returns a string describing the stage's inputs.
+            The stage is skipped when a previous run completed with the same
+            fingerprint.
+        requires_success (bool): When False the stage still runs after a
+            dependency fails; it only waits for it to finish.
+    """
+
+    def __init__(self, name: str, run: Callable[[Callable[..., None]], Any], depends_on: Sequence[str] = (),
+                 fingerprint: Optional[Callable[[], Optional[str]]] = None, requires_success: bool = True):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.fingerprint = fingerprint
+        self.requires_success = requires_success
+
+
+def _exclusive(job_type: str, run: Callable[[Callable[..., None]], Any],
+               dedupe_key: Optional[str] = None) -> Callable[[Callable[..., None]], Any]:
+    """
+    Wrap a stage so it holds the same job dedupe key as API-started runs of
+    that work; the stage fails instead of overlapping one already running.
+
+    Args:
+        dedupe_key (str): Key the API uses for this work; defaults to `job_type`.
+    """
+    dedupe_key = dedupe_key or job_type
+
+    def stage(progress_callback):
+        try:
+            with job_manager.claim(job_type, dedupe_key=dedupe_key, params={"source": PIPELINE_JOB_TYPE}) as job:
+                def report(**progress):
+                    progress_callback(**progress)
+                    job.report_progress(**progress)
+                return run(report)
+        except JobAlreadyRunning as e:
+            raise RuntimeError(f"{job_type} is already running as job {(e.job or {}).get('job_id')}")
+    return stage
+
+
+def _run_bhavcopy(progress_callback) -> Dict[str, Any]:
+    result = download_and_process_bhavcopy_nse()
+    if result.get("status") == "error":
+        raise RuntimeError(f"BhavCopy load failed: {result.get('reason')}")
+    return result
+
+
+def _versioned(*parts: Any) -> Optional[str]:
+    """Fingerprint from the current data version; None (never skip) if it is unknown."""
+    version = current_data_version()
+    return ":".join(str(p) for p in (version,) + parts) if version else None
+
+
+def default_stages() -> List[Stage]:
+    """bhavcopy load -> Upstox gap fill -> (SMA results, SMA crossovers)."""
+    sma_period, threshold_pct = Config.PIPELINE_SMA_PERIOD, Config.PIPELINE_SMA_THRESHOLD
+    short_window, long_window = Config.PIPELINE_CROSS_SHORT, Config.PIPELINE_CROSS_LONG
+    # Keyed by the session the load is for, so a rerun after midnight or over
+    # a weekend is skipped rather than repeating the previous session's load
+    session = lambda: trading_calendar.latest_session().isoformat()
+    return [
+        Stage("bhavcopy", _exclusive(BHAVCOPY_JOB_TYPE, _run_bhavcopy), fingerprint=session),
+        # The gap fill tops up whatever the bhavcopy missed, so it runs even if that failed
+        Stage("gap_fill",
+              _exclusive(UPDATE_JOB_TYPE, lambda progress: update_all_symbols(progress_callback=progress)),
+              depends_on=("bhavcopy",), fingerprint=session, requires_success=False),
+        Stage("sma_results",
+              _exclusive("sma_update",
+                         lambda progress: {"records_updated": update_sma_results(sma_period, threshold_pct, progress)},
+                         dedupe_key=f"sma_update:{sma_period}:{threshold_pct}"),
+              depends_on=("gap_fill",),
+              fingerprint=lambda: _versioned(sma_period, threshold_pct)),
+        Stage("sma_crossover",
+              lambda progress: {"records_inserted": update_sma_cross_results(short_window, long_window)},
+              depends_on=("gap_fill",),
+              fingerprint=lambda: _versioned(short_window, long_window)),
+    ]
+
+
+def _already_done(stage: str, fingerprint: Optional[str]) -> bool:
+    if fingerprint is None:
+        return False
+    with connection_manager.session_scope("api") as session:
+        return session.query(PipelineStageRun.id).filter(
+            PipelineStageRun.stage == stage,
+            PipelineStageRun.status == "completed",
+            PipelineStageRun.fingerprint == fingerprint
+        ).first() is not None
+
+
+def _record(run_id: str, stage: str, status: str, fingerprint: Optional[str] = None,
+            result: Any = None, error: Optional[str] = None, started_at: Optional[datetime] = None,
+            duration: Optional[float] = None) -> None:
+    try:
+        with connection_manager.session_scope("api") as session:
+            session.add(PipelineStageRun(
+                run_id=run_id,
+                stage=stage,
+                status=status,
+                fingerprint=fingerprint,
+                result=result,
+                error=error,
+                started_at=started_at,
+                completed_at=datetime.utcnow() if started_at else None,
+                duration_seconds=round(duration, 3) if duration is not None else None
+            ))
+    except Exception as e:
+        logger.error(f"Could not record pipeline stage {stage}: {str(e)}")
+
+
+def run_pipeline(stages: Optional[List[Stage]] = None, force: bool = False,
+                 progress_callback: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+    """
+    Run the stage DAG, starting each stage as soon as its dependencies finish.
+
+    Independent stages run in parallel. Every stage outcome (completed,
+    failed, skipped as unchanged, or blocked by a failed dependency) is
+    recorded with its timing in the PipelineStageRun table.
+
+    Args:
+        stages (list): Stages to run; defaults to `default_stages()`.
+        force (bool): Run stages even when their fingerprint is unchanged.
+        progress_callback (callable): Called with the stage status map as it changes.
+
+    Returns:
+        dict: Run id, per-stage outcome and end-to-end duration.
+    """
+    stages = stages or default_stages()
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [d for d in stage.depends_on if d not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(missing)}")
+
+    app = current_app._get_current_object()
+    run_id = uuid.uuid4().hex
+    started = time.time()
+    status: Dict[str, str] = {stage.name: "pending" for stage in stages}
+    outcome: Dict[str, Dict[str, Any]] = {}
+    stage_progress: Dict[str, Dict[str, Any]] = {}
+    logger.info(f"Pipeline run {run_id} started with stages: {', '.join(by_name)}")
+
+    def report():
+        if progress_callback:
+            progress_callback(run_id=run_id, stages=dict(status), stage_progress=dict(stage_progress))
+
+    def execute(stage: Stage) -> Dict[str, Any]:
+        with app.app_context():
+            fingerprint = stage.fingerprint() if stage.fingerprint else None
+            if not force and _already_done(stage.name, fingerprint):
+                logger.info(f"Pipeline stage {stage.name} skipped: inputs unchanged ({fingerprint})")
+                _record(run_id, stage.name, "skipped", fingerprint)
+                return {"status": "skipped", "fingerprint": fingerprint}
+
+            def stage_report(**progress):
+                stage_progress[stage.name] = progress
+                report()
+
+            stage_started_at = datetime.utcnow()
+            stage_started = time.time()
+            try:
+                result = stage.run(stage_report)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                duration = time.time() - stage_started
+                logger.exception(f"Pipeline stage {stage.name} failed after {duration:.2f}s", exc_info=True)
+                _record(run_id, stage.name, "failed", fingerprint, error=str(e),
+                        started_at=stage_started_at, duration=duration)
+                return {"status": "failed", "error": str(e), "duration_seconds": round(duration, 3)}
+
+            duration = time.time() - stage_started
+            logger.info(f"Pipeline stage {stage.name} completed in {duration:.2f}s")
+            _record(run_id, stage.name, "completed", fingerprint, result=_json_result(result),
+                    started_at=stage_started_at, duration=duration)
+            return {"status": "completed", "duration_seconds": round(duration, 3)}
+
+    def schedule(executor, running):
+        """Start every stage whose dependencies have settled; block those with failed ones."""
+        changed = True
+        while changed:
+            changed = False
+            for stage in stages:
+                if status[stage.name] != "pending":
+                    continue
+                deps = [status[d] for d in stage.depends_on]
+                if any(s in ("pending", "running") for s in deps):
+                    continue
+                if stage.requires_success and any(s in ("failed", "blocked") for s in deps):
+                    status[stage.name] = "blocked"
+                    outcome[stage.name] = {"status": "blocked"}
+                    _record(run_id, stage.name, "blocked")
+                    logger.warning(f"Pipeline stage {stage.name} blocked by a failed dependency")
+                    changed = True
+                    continue
+                status[stage.name] = "running"
+                running[executor.submit(execute, stage)] = stage.name
+
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="pipeline") as executor:
+        running = {}
+        schedule(executor, running)
+        while running:
+            report()
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                outcome[name] = future.result()
+                status[name] = outcome[name]["status"]
+            schedule(executor, running)
+
+    stuck = [name for name, s in status.items() if s == "pending"]
+    if stuck:
+        raise ValueError(f"Pipeline has a dependency cycle between: {', '.join(stuck)}")
+
+    total = round(time.time() - started, 3)
+    report()
+    logger.info(f"Pipeline run {run_id} finished in {total}s: {status}")
+    return {"run_id": run_id, "stages": outcome, "duration_seconds": total}
+
+
+def _json_result(result: Any) -> Any:
+    """Results are stored as JSON; keep dicts as they are and wrap anything else."""
+    if result is None or isinstance(result, dict):
+        return result
+    return {"value": str(result)}
+
+
+def submit_pipeline(force: bool = False) -> Dict[str, Any]:
+    """Queue a pipeline run as a background job; at most one runs across all workers."""
+    return job_manager.submit(
+        PIPELINE_JOB_TYPE,
+        lambda job: run_pipeline(force=force, progress_callback=job.report_progress),
+        {"force": force},
+        dedupe_key=PIPELINE_JOB_TYPE
+    )
+
+
+def recent_runs(limit: int = 10) -> List[Dict[str, Any]]:
+    """Latest pipeline runs with per-stage status and timings."""
+    with connection_manager.session_scope("api") as session:
+        run_ids = [
+            run_id for (run_id,) in session.query(PipelineStageRun.run_id)
+            .group_by(PipelineStageRun.run_id)
+            .order_by(func.max(PipelineStageRun.id).desc())
+            .limit(limit)
+        ]
+        rows = (
+            session.query(PipelineStageRun)
+            .filter(PipelineStageRun.run_id.in_(run_ids))
+            .order_by(PipelineStageRun.id.asc())
+            .all()
+        )
+
+    runs: Dict[str, Dict[str, Any]] = {run_id: {"run_id": run_id, "stages": []} for run_id in run_ids}
+    for row in rows:
+        runs[row.run_id]["stages"].append({
+            "stage": row.stage,
+            "status": row.status,
+            "fingerprint": row.fingerprint,
+            "error": row.error,
+            "started_at": row.started_at.isoformat() if row.started_at else None,
+            "completed_at": row.completed_at.isoformat() if row.completed_at else None,
+            "duration_seconds": row.duration_seconds,
+        })
+    for run in runs.values():
+        starts = [s["started_at"] for s in run["stages"] if s["started_at"]]
+        ends = [s["completed_at"] for s in run["stages"] if s["completed_at"]]
+        if starts and ends:
+            run["started_at"], run["completed_at"] = min(starts), max(ends)
+            run["duration_seconds"] = round(
+                (datetime.fromisoformat(max(ends)) - datetime.fromisoformat(min(starts))).total_seconds(), 3)
+    return [runs[run_id] for run_id in run_ids]
+
+
+class PipelineScheduler:
+    """
+    Starts the pipeline at `PIPELINE_RUN_AT` (in `PIPELINE_TIMEZONE`) on trading days.
+
+    Every worker runs a scheduler; the job dedupe key lets only one of them
+    start the run and the others' submissions are rejected.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._forked = False
+
+    def init_app(self, app) -> None:
+        self.app = app
+        # Under gunicorn with preload_app the app is created in the master;
+        # workers start the scheduler from the post_fork hook instead
+        if app.config.get("PIPELINE_SCHEDULE_ENABLED") and (self._forked or not under_gunicorn()):
+            self.start()
+
+    def after_fork(self) -> None:
+        self._forked = True
+        self._thread = None
+        self._stop = threading.Event()
+        if self.app is not None and self.app.config.get("PIPELINE_SCHEDULE_ENABLED"):
+            self.start()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="pipeline-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Pipeline scheduler started; next run at {self.next_run().isoformat()}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def next_run(self, now: Optional[datetime] = None) -> datetime:
+        zone = ZoneInfo(Config.PIPELINE_TIMEZONE)
+        now = now or datetime.now(zone)
+        hour, minute = (int(part) for part in Config.PIPELINE_RUN_AT.split(":"))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        while not trading_calendar.is_trading_day(candidate.date()):
+            candidate += timedelta(days=1)
+        return candidate
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            run_at = self.next_run()
+            delay = (run_at - datetime.now(run_at.tzinfo)).total_seconds()
+            if self._stop.wait(max(delay, 0)):
+                return
+            try:
+                with self.app.app_context():
+                    job = submit_pipeline()
+                logger.info(f"Scheduled pipeline run queued as job {job['job_id']}")
+            except JobAlreadyRunning:
+                logger.info("Scheduled pipeline run already started by another worker")
+            except JobQueueFull:
+                logger.warning("Scheduled pipeline run skipped: job queue full")
+            except Exception as e:
+                logger.error(f"Could not start scheduled pipeline run: {str(e)}")
+            # Do not fire twice for the same minute
+            self._stop.wait(60)
+
+
+pipeline_scheduler = PipelineScheduler()
@@ -0,0 +1,84 @@
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class PriceArrays:
+    """
+    Column arrays for many symbols packed back to back.
+
+    Rows are sorted by (symbol, date). The rows of ``symbols[i]`` live in
+    ``offsets[i]:offsets[i + 1]`` of every column array.
+    """
+
+    def __init__(self, symbols: List[str], offsets: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.symbols = symbols
+        self.offsets = offsets
+        self.columns = columns
+        self._index = {symbol: i for i, symbol in enumerate(symbols)}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def row_count(self) -> int:
+        return int(self.offsets[-1]) if len(self.offsets) else 0
+
+    def series(self, symbol: str, column: str = "close") -> Optional[np.ndarray]:
+        """Return one symbol's values for a column, or None if the symbol is unknown."""
+        i = self._index.get(symbol)
+        if i is None:
+            return None
+        return self.columns[column][self.offsets[i]:self.offsets[i + 1]]
+
+    def iter_series(self, column: str = "close", min_rows: int = 0) -> Iterator[Tuple[str, np.ndarray]]:
+        """Yield (symbol, values) for every symbol with at least ``min_rows`` rows."""
+        values = self.columns[column]
+        for i, symbol in enumerate(self.symbols):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            if end - start >= min_rows:
+                yield symbol, values[start:end]
+
+    def dropna(self, column: str = "close") -> "PriceArrays":
+        """Return a copy without rows whose `column` value is NaN."""
+        keep = ~np.isnan(self.columns[column])
+        if keep.all():
+            return self
+        codes = np.repeat(np.arange(len(self.symbols)), np.diff(self.offsets))[keep]
+        offsets = np.zeros(len(self.symbols) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self.symbols)), out=offsets[1:])
+        columns = {name: values[keep] for name, values in self.columns.items()}
+        return PriceArrays(self.symbols, offsets, columns)
+
+
+def from_symbol_codes(names: List[str], codes: np.ndarray, dates: np.ndarray,
+                      columns: Dict[str, np.ndarray]) -> PriceArrays:
+    """
+    Build PriceArrays from unsorted rows.
+
+    Args:
+        names (list): Symbol names indexed by code.
+        codes (ndarray): Integer symbol code per row.
+        dates (ndarray): Row dates, used as the secondary sort key.
+        columns (dict): Other column arrays aligned with ``codes``.
+
+    Returns:
+        PriceArrays: Rows grouped by symbol in name order, dates ascending.
+    """
+    names = list(names)
+    name_order = np.argsort(np.asarray(names, dtype=object), kind="stable")
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[name_order] = np.arange(len(names))
+
+    codes = rank[np.asarray(codes, dtype=np.int64)]
+    order = np.lexsort((dates, codes))
+    codes = codes[order]
+
+    counts = np.bincount(codes, minlength=len(names))
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    sorted_columns = {"date": dates[order]}
+    for name, values in columns.items():
+        sorted_columns[name] = values[order]
+
+    return PriceArrays([names[i] for i in name_order], offsets, sorted_columns)
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.utils.sql import classify
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ("total_ms", "count", "p99_ms", "mean_ms", "rows")
+
+
+class _FingerprintStats:
+    __slots__ = ("info", "profiles", "count", "total", "max", "rows", "samples",
+                 "slowest_elapsed", "slowest_statement", "slowest_parameters", "slowest_profile", "plan")
+
+    def __init__(self, info):
+        self.info = info
+        self.profiles = set()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=Config.QUERY_PROFILER_SAMPLES)
+        self.slowest_elapsed = 0.0
+        self.slowest_statement = None
+        self.slowest_parameters = None
+        self.slowest_profile = None
+        self.plan = None
+
+
+class QueryProfiler:
+    """
+    Aggregates statement timings per fingerprint across all engines.
+
+    Each execution adds to its fingerprint's count, total time and row count
+    and to a bounded window of recent durations used for p50/p99. The
+    slowest single execution's statement and parameters are kept so that an
+    EXPLAIN (ANALYZE, BUFFERS) plan can be captured for it on demand;
+    executemany batches carry a list of parameter sets and are not kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _FingerprintStats] = {}
+        self.started_at = time.time()
+
+    def instrument_engine(self, engine, profile: str) -> None:
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_profile_timer(conn, cursor, statement, parameters, context, executemany):
+            context._profile_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, "_profile_start", None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            if elapsed > Config.SLOW_QUERY_SECONDS:
+                logger.warning(f"Slow query detected: {elapsed:.2f}s [{profile}] {classify(statement).fingerprint[:200]}")
+            if Config.QUERY_PROFILER_ENABLED:
+                self.record(profile, statement, parameters, elapsed, getattr(cursor, "rowcount", -1), executemany)
+
+    def record(self, profile: str, statement: str, parameters: Any, elapsed: float, rows: int,
+               executemany: bool = False) -> None:
+        info = classify(statement)
+        with self._lock:
+            stats = self._stats.get(info.fingerprint_id)
+            if stats is None:
+                stats = self._stats[info.fingerprint_id] = _FingerprintStats(info)
+            stats.profiles.add(profile)
+            stats.count += 1
+            stats.total += elapsed
+            stats.samples.append(elapsed)
+            if rows and rows > 0:
+                stats.rows += rows
+            if elapsed >= stats.max:
+                stats.max = elapsed
+            if not executemany and elapsed >= stats.slowest_elapsed:
+                stats.slowest_elapsed = elapsed
+                stats.slowest_statement = statement
+                stats.slowest_parameters = parameters
+                stats.slowest_profile = profile
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.started_at = time.time()
+
+    def _summary(self, stats: _FingerprintStats) -> Dict[str, Any]:
+        import numpy as np
+
+        samples = np.fromiter(stats.samples, dtype=np.float64) * 1000
+        p50, p99 = np.percentile(samples, [50, 99]) if len(samples) else (0.0, 0.0)
+        return {
+            "fingerprint_id": stats.info.fingerprint_id,
+            "fingerprint": stats.info.fingerprint,
+            "operation": stats.info.operation,
+            "table": stats.info.table,
+            "profiles": sorted(stats.profiles),
+            "count": stats.count,
+            "total_ms": round(stats.total * 1000, 2),
+            "mean_ms": round(stats.total * 1000 / stats.count, 3),
+            "p50_ms": round(float(p50), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(stats.max * 1000, 3),
+            "rows": stats.rows,
+            "rows_per_call": round(stats.rows / stats.count, 1),
+            "has_plan": stats.plan is not None,
+        }
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[Dict[str, Any]]:
+        """Top fingerprints by `sort` (one of SORT_KEYS)."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            summaries = [self._summary(stats) for stats in self._stats.values()]
+        summaries.sort(key=lambda s: s[sort], reverse=True)
+        return summaries[:limit]
+
+    def detail(self, fingerprint_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stats = self._stats.get(fingerprint_id)
+            if stats is None:
+                return None
+            summary = self._summary(stats)
+            summary["slowest_statement"] = stats.slowest_statement
+            summary["plan"] = stats.plan
+        return summary
+
+    def explain(self, fingerprint_id: str) -> Dict[str, Any]:
+        """
+        Run EXPLAIN (ANALYZE, BUFFERS) for the slowest captured execution of a fingerprint.
+
+        ANALYZE executes the statement, so only SELECTs are explained, always
+        on the analytics pool under QUERY_EXPLAIN_TIMEOUT_MS and inside a
+        transaction that is rolled back, whichever pool the statement ran on.
+
+        Raises:
+            KeyError: If the fingerprint has not been seen.
+            ValueError: If the statement is not a SELECT or only ran via executemany.
+        """
+        from app.services.database import connection_manager
+
+        with self._lock:
+            stats = self._stats.get(fingerprint_id)
+            if stats is None:
+                raise KeyError(fingerprint_id)
+            statement, parameters, profile = stats.slowest_statement, stats.slowest_parameters, stats.slowest_profile
+        if stats.info.operation not in ("SELECT", "WITH"):
+            raise ValueError(f"Only SELECT statements can be explained, not {stats.info.operation}")
+        if statement is None:
+            raise ValueError("No single execution captured; executemany batches cannot be explained")
+
+        started = time.time()
+        with connection_manager.get_engine("analytics").connect() as conn:
+            transaction = conn.begin()
+            try:
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(Config.QUERY_EXPLAIN_TIMEOUT_MS)}")
+                plan = conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+                ).scalar()
+            finally:
+                transaction.rollback()
+
+        captured = {
+            "captured_at": time.time(),
+            "profile": profile,
+            "explained_on": "analytics",
+            "explain_ms": round((time.time() - started) * 1000, 2),
+            "plan": plan,
+        }
+        with self._lock:
+            stats.plan = captured
+        logger.info(f"Captured plan for query {fingerprint_id} ({stats.info.table}) in {captured['explain_ms']}ms")
+        return captured
+
+
+query_profiler = QueryProfiler()
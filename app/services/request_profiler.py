@@ -0,0 +1,112 @@
+import cProfile
+import logging
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Where self time is attributed, matched against a function's file path or,
+# for C functions, its description
+CATEGORIES = (
+    ("db", ("sqlalchemy", "psycopg2", "asyncpg")),
+    ("compute", ("pandas", "numpy", "/ta/", "pyarrow")),
+    ("serialization", ("json", "orjson")),
+)
+
+
+def _category(filename: str, function: str) -> str:
+    location = f"{filename} {function}"
+    for category, markers in CATEGORIES:
+        if any(marker in location for marker in markers):
+            return category
+    return "other"
+
+
+class RequestProfiler:
+    """
+    Opt-in cProfile wrapper for single requests.
+
+    A request is profiled when it carries `X-Profile: 1` together with a
+    valid admin token, or when it is picked by `PROFILE_SAMPLE_RATE`. When
+    neither applies the cost is one header lookup. Reports are kept in a
+    bounded in-memory store.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def should_profile(self, request) -> bool:
+        if request.headers.get("X-Profile") == "1":
+            from app.utils.auth import is_admin_request
+            return is_admin_request()
+        rate = Config.PROFILE_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def start(self) -> Optional[cProfile.Profile]:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler is already active on this thread
+            logger.debug(f"Request profiling skipped: {str(e)}")
+            return None
+        return profiler
+
+    def finish(self, profiler: cProfile.Profile, started: float, method: str, path: str,
+               status: int) -> Dict[str, Any]:
+        """Stop profiling, store the report and return it."""
+        profiler.disable()
+        wall = time.time() - started
+        stats = pstats.Stats(profiler)
+
+        split = {category: 0.0 for category, _ in CATEGORIES}
+        split["other"] = 0.0
+        functions = []
+        for (filename, line, function), (_, calls, self_time, cumulative, _) in stats.stats.items():
+            split[_category(filename, function)] += self_time
+            functions.append((cumulative, self_time, calls, f"{filename}:{line}({function})"))
+        functions.sort(reverse=True)
+
+        report = {
+            "profile_id": uuid.uuid4().hex[:16],
+            "method": method,
+            "path": path,
+            "status": status,
+            "profiled_at": time.time(),
+            "wall_ms": round(wall * 1000, 2),
+            "split_ms": {k: round(v * 1000, 2) for k, v in split.items()},
+            "top_functions": [
+                {"function": name, "calls": calls, "self_ms": round(self_time * 1000, 3),
+                 "cumulative_ms": round(cumulative * 1000, 3)}
+                for cumulative, self_time, calls, name in functions[:Config.PROFILE_TOP_FUNCTIONS]
+            ],
+        }
+        with self._lock:
+            self._reports[report["profile_id"]] = report
+            while len(self._reports) > Config.PROFILE_STORE_SIZE:
+                self._reports.popitem(last=False)
+        return report
+
+    def server_timing(self, report: Dict[str, Any]) -> str:
+        parts = [f"{name};dur={ms}" for name, ms in report["split_ms"].items()]
+        parts.append(f"total;dur={report['wall_ms']}")
+        return ", ".join(parts)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._reports.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            reports = list(self._reports.values())
+        return [{k: v for k, v in r.items() if k != "top_functions"} for r in reversed(reports)]
+
+
+request_profiler = RequestProfiler()
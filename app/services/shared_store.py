@@ -0,0 +1,228 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from app.services.price_arrays import PriceArrays
+from app.utils.file_lock import file_lock
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FTPRICE1"
+POINTER_NAME = "CURRENT"
+LOCK_NAME = ".lock"
+ALIGNMENT = 64
+KEEP_VERSIONS = 2
+
+_PREAMBLE = struct.Struct("<8sQ")
+
+
+def store_dir() -> str:
+    return Config.SHARED_STORE_DIR
+
+
+def _aligned(position: int) -> int:
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _read_pointer() -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(store_dir(), POINTER_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable shared store pointer: {str(e)}")
+        return None
+
+
+def rolling_sma(arrays: PriceArrays, window: int, column: str = "close") -> np.ndarray:
+    """Per-symbol simple moving average; NaN until a symbol has `window` rows."""
+    values = arrays.columns[column]
+    result = np.full(len(values), np.nan)
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    for i in range(len(arrays)):
+        start, end = arrays.offsets[i], arrays.offsets[i + 1]
+        if end - start < window:
+            continue
+        rows = np.arange(start + window - 1, end)
+        result[rows] = (cumulative[rows + 1] - cumulative[rows + 1 - window]) / window
+    return result
+
+
+def publish(arrays: PriceArrays, sma_windows: Iterable[int] = (), data_version: Optional[str] = None) -> int:
+    """
+    Publish price and indicator arrays as a new store version.
+
+    The data file is written under a unique name and then made current by
+    atomically replacing the pointer file, so readers never see a partial
+    version. Publishers in different workers take a file lock, so version
+    numbers are never reused and pruning never removes a file another
+    publisher is about to point at.
+
+    Args:
+        arrays (PriceArrays): Prices grouped by symbol; must not contain NaN closes.
+        sma_windows (iterable): SMA windows to precompute as `sma_<window>` columns.
+        data_version (str): Database data version the arrays were built from.
+
+    Returns:
+        int: The published version number.
+    """
+    columns = dict(arrays.columns)
+    for window in sma_windows:
+        columns[f"sma_{window}"] = rolling_sma(arrays, window)
+    columns["__offsets__"] = arrays.offsets
+
+    os.makedirs(store_dir(), exist_ok=True)
+    with file_lock(os.path.join(store_dir(), LOCK_NAME)):
+        return _publish_locked(arrays, columns, data_version)
+
+
+def _publish_locked(arrays: PriceArrays, columns: Dict[str, np.ndarray], data_version: Optional[str]) -> int:
+    current = _read_pointer()
+    version = (current["version"] if current else 0) + 1
+
+    header = {
+        "version": version,
+        "data_version": data_version,
+        "published_at": datetime.utcnow().isoformat(),
+        "symbols": arrays.symbols,
+        "columns": {},
+    }
+    position = 0
+    for name, values in columns.items():
+        position = _aligned(position)
+        header["columns"][name] = {"dtype": values.dtype.str, "offset": position, "count": len(values)}
+        position += values.nbytes
+
+    header_bytes = json.dumps(header).encode()
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    file_name = f"prices.v{version}.{os.getpid()}.bin"
+    path = os.path.join(store_dir(), file_name)
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in columns.items():
+            f.seek(data_start + header["columns"][name]["offset"])
+            f.write(np.ascontiguousarray(values).view(np.uint8))
+
+    pointer_path = os.path.join(store_dir(), POINTER_NAME)
+    tmp_pointer = f"{pointer_path}.tmp.{os.getpid()}"
+    with open(tmp_pointer, "w") as f:
+        json.dump({"version": version, "file": file_name, "data_start": data_start,
+                   "data_version": data_version}, f)
+    os.replace(tmp_pointer, pointer_path)
+
+    _remove_old_versions(file_name)
+    logger.info(f"Published shared price store version {version}: "
+                f"{len(arrays)} symbols, {arrays.row_count} rows, {len(columns) - 1} columns")
+    return version
+
+
+def _remove_old_versions(current_file: str) -> None:
+    """Unlink superseded data files; workers still mapping them keep their pages."""
+    files = [f for f in os.listdir(store_dir()) if f.startswith("prices.v") and f.endswith(".bin")]
+    files.sort(key=lambda f: int(f.split(".")[1][1:]), reverse=True)
+    for name in files[KEEP_VERSIONS:]:
+        if name == current_file:
+            continue
+        try:
+            os.remove(os.path.join(store_dir(), name))
+        except OSError as e:
+            logger.debug(f"Could not remove old store file {name}: {str(e)}")
+
+
+def publish_from_snapshot() -> Optional[int]:
+    """Publish the current Arrow snapshot's closes and configured SMAs."""
+    from app.services.snapshot import load_price_arrays, read_manifest, snapshot_lock
+
+    # The manifest's data version must describe the partitions read with it
+    with snapshot_lock():
+        manifest = read_manifest()
+        arrays = load_price_arrays(("close",))
+    if arrays is None or manifest is None:
+        logger.warning("No snapshot available to publish to the shared store")
+        return None
+    return publish(arrays.dropna("close"), Config.SHARED_STORE_SMA_WINDOWS, manifest.get("data_version"))
+
+
+class SharedPriceStore:
+    """
+    Read-only view of the published price store.
+
+    Every worker maps the same file, so the arrays exist once in the page
+    cache regardless of worker count. Each call to `get` checks the pointer
+    file and swaps to a newer version when one has been published.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pointer_stat = None
+        self._version = None
+        self._file = None
+        self._data_version = None
+        self._arrays = None
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    @property
+    def data_version(self) -> Optional[str]:
+        """Database data version of the mapped arrays, if recorded at publish time."""
+        return self._data_version
+
+    def get(self) -> Optional[PriceArrays]:
+        """Return the current arrays, or None if nothing has been published."""
+        try:
+            stat = os.stat(os.path.join(store_dir(), POINTER_NAME))
+        except FileNotFoundError:
+            return None
+
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key == self._pointer_stat:
+            return self._arrays
+
+        with self._lock:
+            if key != self._pointer_stat:
+                pointer = _read_pointer()
+                if pointer is None:
+                    return self._arrays
+                if (pointer["version"], pointer["file"]) != (self._version, self._file):
+                    self._arrays = self._map(pointer)
+                    self._version, self._file = pointer["version"], pointer["file"]
+                    self._data_version = pointer.get("data_version")
+                    logger.info(f"Mapped shared price store version {self._version}")
+                self._pointer_stat = key
+            return self._arrays
+
+    def _map(self, pointer: Dict[str, Any]) -> PriceArrays:
+        with open(os.path.join(store_dir(), pointer["file"]), "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Invalid shared store file {pointer['file']}")
+        header = json.loads(buffer[_PREAMBLE.size:_PREAMBLE.size + header_length])
+
+        columns = {}
+        for name, spec in header["columns"].items():
+            columns[name] = np.frombuffer(
+                buffer,
+                dtype=np.dtype(spec["dtype"]),
+                count=spec["count"],
+                offset=pointer["data_start"] + spec["offset"],
+            )
+        offsets = columns.pop("__offsets__")
+        return PriceArrays(header["symbols"], offsets, columns)
+
+
+shared_price_store = SharedPriceStore()
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from app.services import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightTimeout(Exception):
+    """Raised when an identical in-flight call did not finish within SINGLE_FLIGHT_WAIT_SECONDS."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical computations into one.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for it and get the same result or
+    exception. A waiter that gives up raises SingleFlightTimeout rather than
+    starting a second copy of a computation that is already slow. Nothing is
+    kept once the call completes, so a later request always recomputes -
+    callers put the data version in the key so that a shared result can
+    never be older than the data it was asked about.
+
+    With `SINGLE_FLIGHT_SHARED` enabled and a shared cache backend
+    configured, the leader also takes a short lock in the cache and
+    publishes its result there, so leaders in other gunicorn workers wait
+    on it instead of starting their own computation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, name: str, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once for all concurrent callers with the same key.
+
+        Args:
+            name (str): Call family, used for metrics and cache keys.
+            key (str): Normalized parameters plus data version.
+            fn (Callable): Computation to run if no identical call is in flight.
+
+        Returns:
+            tuple: (result, shared) where `shared` is True if the result came
+            from another caller's computation.
+
+        Raises:
+            SingleFlightTimeout: If the identical call this caller waited on,
+                here or in another worker, did not finish in time.
+        """
+        flight_key = f"{name}:{key}"
+        with self._lock:
+            call = self._calls.get(flight_key)
+            leader = call is None
+            if leader:
+                call = self._calls[flight_key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            metrics.record_single_flight(name, "follower")
+            if not call.done.wait(Config.SINGLE_FLIGHT_WAIT_SECONDS):
+                metrics.record_single_flight(name, "timeout")
+                logger.warning(f"Timed out waiting for in-flight {name} call")
+                raise SingleFlightTimeout(f"In-flight {name} call did not finish in time")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, shared = self._lead(name, flight_key, fn)
+            return call.result, shared
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(flight_key, None)
+            call.done.set()
+            if call.waiters:
+                logger.info(f"Shared {name} result with {call.waiters} concurrent request(s)")
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def _lead(self, name: str, flight_key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        cache = _shared_cache()
+        if cache is None:
+            metrics.record_single_flight(name, "leader")
+            return fn(), False
+
+        lock_key = f"single_flight:lock:{flight_key}"
+        result_key = f"single_flight:result:{flight_key}"
+        try:
+            acquired = cache.add(lock_key, 1, timeout=int(Config.SINGLE_FLIGHT_WAIT_SECONDS) + 1)
+        except Exception as e:
+            logger.warning(f"Single-flight lock unavailable, computing locally: {str(e)}")
+            acquired = True
+
+        if not acquired:
+            result = self._wait_remote(name, cache, result_key, lock_key)
+            if result is not None:
+                metrics.record_single_flight(name, "remote")
+                return result, True
+
+        metrics.record_single_flight(name, "leader")
+        try:
+            result = fn()
+        except Exception:
+            if acquired:
+                _release(cache, lock_key)
+            raise
+        try:
+            cache.set(result_key, result, timeout=Config.SINGLE_FLIGHT_RESULT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Could not publish single-flight result: {str(e)}")
+        if acquired:
+            _release(cache, lock_key)
+        return result, False
+
+    def _wait_remote(self, name: str, cache, result_key: str, lock_key: str) -> Any:
+        """
+        Poll the cache for another worker's result.
+
+        Returns None, so the caller computes, only if the other leader released
+        its lock without publishing (e.g. it failed) or the cache stopped
+        answering.
+
+        Raises:
+            SingleFlightTimeout: If the lock is still held at the deadline.
+        """
+        deadline = time.monotonic() + Config.SINGLE_FLIGHT_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                result = cache.get(result_key)
+                if result is not None:
+                    return result
+                if not cache.has(lock_key):
+                    # The other leader finished without publishing (e.g. it failed)
+                    return cache.get(result_key)
+            except Exception as e:
+                logger.warning(f"Single-flight wait failed: {str(e)}")
+                return None
+            time.sleep(Config.SINGLE_FLIGHT_POLL_SECONDS)
+        metrics.record_single_flight(name, "timeout")
+        logger.warning(f"Timed out waiting for {name} call in another worker")
+        raise SingleFlightTimeout(f"In-flight {name} call in another worker did not finish in time")
+
+
+def _release(cache, lock_key: str) -> None:
+    try:
+        cache.delete(lock_key)
+    except Exception as e:
+        logger.warning(f"Could not release single-flight lock: {str(e)}")
+
+
+def _shared_cache():
+    if not Config.SINGLE_FLIGHT_SHARED:
+        return None
+    from flask import current_app, has_app_context
+    from app.extensions import cache
+
+    if not has_app_context() or current_app.config.get("CACHE_TYPE", "null") in ("null", "NullCache"):
+        return None
+    return cache
+
+
+single_flight = SingleFlight()
@@ -1,8 +1,6 @@
 from app.models import HistoricalData1D, SMACrossResult
 from app.extensions import db
 from sqlalchemy import func
-import pandas as pd
-import ta
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
@@ -95,6 +93,9 @@ def get_sma_cross_signals(short_window: int, long_window: int) -> List[Dict[str,
     Returns:
         List: List of SMA crossing signals.
     """
+    import pandas as pd
+    import ta
+
     try:
         logger.info(f"Calculating SMA crossing signals with short_window={short_window} and long_window={long_window}")
 
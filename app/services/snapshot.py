@@ -0,0 +1,349 @@
+import json
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+from sqlalchemy import text
+
+from app.services.price_arrays import PriceArrays, from_symbol_codes
+from app.utils.file_lock import file_lock
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".lock"
+SNAPSHOT_FORMAT = 1
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("symbol", pa.string()),
+    ("date", pa.timestamp("us", tz="UTC")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.int64()),
+])
+
+SNAPSHOT_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def snapshot_dir() -> str:
+    return Config.SNAPSHOT_DIR
+
+
+def snapshot_lock():
+    """Serialises snapshot exports (and the shared store publish that follows) across workers."""
+    os.makedirs(snapshot_dir(), exist_ok=True)
+    return file_lock(os.path.join(snapshot_dir(), LOCK_NAME))
+
+
+def _partition_file(year: int) -> str:
+    return f"year={year}.arrow"
+
+
+def read_manifest() -> Optional[Dict[str, Any]]:
+    """Return the snapshot manifest, or None if no snapshot has been written."""
+    path = os.path.join(snapshot_dir(), MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable snapshot manifest {path}: {str(e)}")
+        return None
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        logger.warning(f"Ignoring snapshot manifest with format {manifest.get('format')}")
+        return None
+    return manifest
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_manifest(manifest: Dict[str, Any]) -> None:
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    _write_atomic(os.path.join(snapshot_dir(), MANIFEST_NAME), write)
+
+
+def _export_year(year: int) -> Dict[str, Any]:
+    """Write one year of candles to an uncompressed Arrow IPC file."""
+    from app.services.bulk_loader import load_price_arrays as load_from_database
+
+    arrays = load_from_database(SNAPSHOT_COLUMNS, start=date(year, 1, 1), end=date(year + 1, 1, 1), read_only=False)
+    counts = np.diff(arrays.offsets)
+    volume = arrays.columns["volume"]
+    table = pa.table({
+        "symbol": pa.array(np.repeat(np.asarray(arrays.symbols, dtype=object), counts), pa.string()),
+        "date": pa.array(arrays.columns["date"], SNAPSHOT_SCHEMA.field("date").type),
+        "open": arrays.columns["open"],
+        "high": arrays.columns["high"],
+        "low": arrays.columns["low"],
+        "close": arrays.columns["close"],
+        "volume": pa.array(volume, pa.int64(), mask=volume < 0),
+    }, schema=SNAPSHOT_SCHEMA)
+
+    file_name = _partition_file(year)
+
+    def write(tmp_path):
+        # Uncompressed IPC, one record batch, rows sorted by (symbol, date):
+        # readers memory-map each column as a single contiguous buffer.
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with ipc.new_file(sink, SNAPSHOT_SCHEMA) as writer:
+                writer.write_table(table.combine_chunks())
+
+    _write_atomic(os.path.join(snapshot_dir(), file_name), write)
+
+    max_date = arrays.columns["date"].max() if arrays.row_count else None
+    return {
+        "file": file_name,
+        "rows": arrays.row_count,
+        "max_date": str(max_date) if max_date is not None else None,
+        "exported_at": datetime.utcnow().isoformat(),
+    }
+
+
+def export_snapshot(since: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Export HistoricalData1D into yearly Arrow IPC partitions.
+
+    Args:
+        since (date): Earliest trade date touched by the last ingest. Only
+            partitions from that year onward are rewritten. A full export runs
+            when omitted or when no snapshot exists yet.
+
+    Returns:
+        Dict: The updated manifest.
+    """
+    with snapshot_lock():
+        return _export_snapshot(since)
+
+
+def _export_snapshot(since: Optional[date]) -> Dict[str, Any]:
+    from app.services.data_version import current_data_version
+    from app.services.database import connection_manager
+
+    manifest = read_manifest()
+    full = manifest is None or since is None
+    if full:
+        manifest = {"format": SNAPSHOT_FORMAT, "version": 0, "partitions": {}}
+
+    # Read before exporting: rows written meanwhile make the snapshot look
+    # older than it is, never newer
+    data_version = current_data_version("analytics")
+    with connection_manager.get_engine("analytics").connect() as conn:
+        bounds = conn.execute(text('SELECT MIN("date"), MAX("date") FROM "HistoricalData1D"')).fetchone()
+    if not bounds or bounds[0] is None:
+        logger.warning("No historical data available for snapshot export")
+        return manifest
+
+    first_year = bounds[0].year if full else max(since.year, bounds[0].year)
+    years = range(first_year, bounds[1].year + 1)
+    for year in years:
+        partition = _export_year(year)
+        manifest["partitions"][str(year)] = partition
+        logger.info(f"Snapshot partition {year} written: {partition['rows']} rows")
+
+    manifest["version"] = manifest.get("version", 0) + 1
+    manifest["max_date"] = bounds[1].isoformat()
+    manifest["data_version"] = data_version
+    manifest["updated_at"] = datetime.utcnow().isoformat()
+    _write_manifest(manifest)
+    logger.info(f"Snapshot version {manifest['version']} exported ({len(years)} partition(s))")
+    return manifest
+
+
+def refresh_snapshot_after_ingest(since: Optional[date]) -> None:
+    """
+    Refresh the snapshot and shared store after an ingest; never raises.
+
+    Held under the snapshot lock throughout, so concurrent ingests (bhavcopy
+    and the Upstox gap fill use different job keys) export and publish one
+    after the other and the last manifest carries the newest data version.
+    """
+    if not Config.SNAPSHOT_ENABLED:
+        return
+    try:
+        with snapshot_lock():
+            export_snapshot(since)
+            if Config.SHARED_STORE_ENABLED:
+                _publish_shared_store()
+    except Exception as e:
+        logger.error(f"Snapshot refresh failed: {str(e)}")
+
+
+def _publish_shared_store() -> None:
+    from app.services.shared_store import publish_from_snapshot
+
+    try:
+        publish_from_snapshot()
+    except Exception as e:
+        logger.error(f"Shared price store publish failed: {str(e)}")
+
+
+def _read_partitions(columns: Iterable[str], start: Optional[date], end: Optional[date]) -> List[pa.Table]:
+    """Memory-mapped partition tables overlapping [start, end], oldest first."""
+    manifest = read_manifest()
+    if not manifest or not manifest.get("partitions"):
+        return []
+
+    wanted = ["symbol", "date"] + [c for c in columns if c not in ("symbol", "date")]
+    tables = []
+    for year, partition in sorted(manifest["partitions"].items(), key=lambda item: int(item[0])):
+        if start and int(year) < start.year:
+            continue
+        if end and int(year) > end.year:
+            continue
+        source = pa.memory_map(os.path.join(snapshot_dir(), partition["file"]), "r")
+        table = ipc.open_file(source).read_all().select(wanted)
+        if start or end:
+            table = _filter_dates(table, start, end)
+        tables.append(table)
+    return tables
+
+
+def _filter_dates(table: pa.Table, start: Optional[date], end: Optional[date]) -> pa.Table:
+    """Apply the date bounds, leaving the table untouched when none of its rows fall outside them."""
+    dates = table.column("date")
+    mask = None
+    if start:
+        mask = pc.greater_equal(dates, _date_scalar(start))
+    if end:
+        upper = pc.less(dates, _date_scalar(end + timedelta(days=1)))
+        mask = upper if mask is None else pc.and_(mask, upper)
+    if mask is None or pc.all(mask).as_py():
+        return table
+    return table.filter(mask)
+
+
+def read_snapshot(columns: Iterable[str] = ("close",), start: Optional[date] = None,
+                  end: Optional[date] = None) -> Optional[pa.Table]:
+    """
+    Memory-map snapshot partitions and return them as one Arrow table.
+
+    Column buffers reference the mapped files directly, so the read itself
+    does not copy data. Returns None when no snapshot is available.
+    """
+    tables = _read_partitions(columns, start, end)
+    return pa.concat_tables(tables) if tables else None
+
+
+def _date_scalar(d: date) -> pa.Scalar:
+    return pa.scalar(datetime.combine(d, time.min, tzinfo=timezone.utc), type=SNAPSHOT_SCHEMA.field("date").type)
+
+
+def _column_values(column: pa.ChunkedArray) -> np.ndarray:
+    """
+    NumPy view of a column.
+
+    Single-chunk float columns without nulls (prices are written with NaN,
+    never null) are returned without copying. Missing volumes become -1, as
+    in the database bulk loader.
+    """
+    array = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    if pa.types.is_floating(array.type):
+        return array.to_numpy(zero_copy_only=False)
+    if array.null_count:
+        array = pc.fill_null(array, -1)
+    return array.to_numpy(zero_copy_only=False)
+
+
+def _partition_arrays(table: pa.Table, columns: List[str]) -> Optional[PriceArrays]:
+    """
+    PriceArrays over one partition, using its (symbol, date) sort order.
+
+    Returns None if the partition is not grouped by symbol (written by an
+    older version), in which case the caller sorts instead.
+    """
+    symbols = table.column("symbol")
+    symbols = symbols.combine_chunks() if symbols.num_chunks != 1 else symbols.chunk(0)
+    runs = pc.run_end_encode(symbols)
+    names = runs.values.to_pylist()
+    if len(set(names)) != len(names):
+        return None
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    offsets[1:] = runs.run_ends.to_numpy()
+    values = {"date": _column_values(table.column("date"))}
+    for name in columns:
+        values[name] = _column_values(table.column(name))
+    return PriceArrays(names, offsets, values)
+
+
+def _sorted_partition_arrays(table: pa.Table, columns: List[str]) -> PriceArrays:
+    symbols = table.column("symbol")
+    names = pc.unique(symbols)
+    codes = pc.index_in(symbols, value_set=names).to_numpy()
+    values = {name: _column_values(table.column(name)) for name in columns}
+    return from_symbol_codes(names.to_pylist(), codes, _column_values(table.column("date")), values)
+
+
+def merge_price_arrays(parts: List[PriceArrays]) -> PriceArrays:
+    """
+    Interleave per-partition arrays into one set grouped by symbol.
+
+    Partitions must be in date order. Each row is copied once into its final
+    position; nothing is re-sorted.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    names = sorted(set().union(*(part.symbols for part in parts)))
+    index = {name: i for i, name in enumerate(names)}
+
+    counts = np.zeros((len(parts), len(names)), dtype=np.int64)
+    for p, part in enumerate(parts):
+        codes = np.fromiter((index[name] for name in part.symbols), dtype=np.int64, count=len(part.symbols))
+        counts[p, codes] = np.diff(part.offsets)
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(counts.sum(axis=0), out=offsets[1:])
+    # Where partition p's rows for each symbol start in the merged arrays
+    starts = offsets[:-1] + np.cumsum(counts, axis=0) - counts
+
+    columns = {name: np.empty(offsets[-1], dtype=values.dtype) for name, values in parts[0].columns.items()}
+    for p, part in enumerate(parts):
+        codes = np.fromiter((index[name] for name in part.symbols), dtype=np.int64, count=len(part.symbols))
+        local_counts = np.diff(part.offsets)
+        destination = (np.repeat(starts[p, codes] - part.offsets[:-1], local_counts)
+                       + np.arange(part.row_count))
+        for name, values in part.columns.items():
+            columns[name][destination] = values
+    return PriceArrays(names, offsets, columns)
+
+
+def load_price_arrays(columns: Iterable[str] = ("close",), start: Optional[date] = None,
+                      end: Optional[date] = None) -> Optional[PriceArrays]:
+    """
+    Load snapshot columns grouped by symbol.
+
+    Partitions are written sorted by (symbol, date), so a read confined to
+    one partition returns views of the memory-mapped file. Reads spanning
+    several partitions copy each row once to interleave them by symbol.
+    Missing prices are NaN and missing volumes are -1.
+
+    Returns:
+        PriceArrays: Arrays sorted by (symbol, date), or None without a snapshot.
+    """
+    columns = list(columns)
+    tables = _read_partitions(columns, start, end)
+    if not tables:
+        return None
+
+    parts = []
+    for table in tables:
+        part = _partition_arrays(table, columns)
+        parts.append(part if part is not None else _sorted_partition_arrays(table, columns))
+    return merge_price_arrays(parts)
@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from app.services.database import connection_manager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TREND_FIELDS = ("cpu_percent", "memory_percent", "process_rss_mb", "db_check_ms")
+
+
+class SystemMonitor:
+    """
+    Samples host, process, database and cache health on a background thread.
+
+    Samples go into a ring buffer of `HEALTH_HISTORY_SIZE` entries taken
+    every `HEALTH_SAMPLE_SECONDS`, so health endpoints answer from memory
+    instead of blocking on `psutil.cpu_percent(interval=1)` or a database
+    round trip. The thread starts on first use in each process, which keeps
+    it alive across gunicorn forks.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._samples = deque(maxlen=Config.HEALTH_HISTORY_SIZE)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._process = None
+
+    def init_app(self, app) -> None:
+        self.app = app
+        app.extensions["system_monitor"] = self
+
+    def ensure_started(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._process = psutil.Process()
+            # Prime the counters so the first interval-free reading is meaningful
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+            self._thread = threading.Thread(target=self._loop, name="system-monitor", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        # The first sample is taken straight away so callers wait at most one round trip
+        while True:
+            try:
+                sample = self.sample()
+                with self._lock:
+                    self._samples.append(sample)
+            except Exception as e:
+                logger.error(f"System health sampling failed: {str(e)}")
+            time.sleep(Config.HEALTH_SAMPLE_SECONDS)
+
+    def sample(self, cpu_interval: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Collect one sample.
+
+        CPU figures cover the time since the previous sample unless
+        `cpu_interval` is given, in which case they are measured over it.
+        Cache health is None when no cache backend is configured.
+        """
+        from app.extensions import cache_manager, db, db_manager
+
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        process_memory = self._process.memory_info()
+
+        database_healthy, db_check_ms = None, None
+        cache_healthy = None
+        if self.app is not None:
+            with self.app.app_context():
+                started = time.perf_counter()
+                database_healthy = db_manager.health_check()
+                db_check_ms = round((time.perf_counter() - started) * 1000, 2)
+                db.session.remove()
+                if self.app.config.get("CACHE_TYPE", "null") not in ("null", "NullCache"):
+                    cache_healthy = cache_manager.health_check()
+
+        return {
+            "timestamp": time.time(),
+            "cpu_percent": psutil.cpu_percent(interval=cpu_interval),
+            "process_cpu_percent": self._process.cpu_percent(interval=None),
+            "memory_total_gb": round(memory.total / (1024**3), 2),
+            "memory_available_gb": round(memory.available / (1024**3), 2),
+            "memory_percent": memory.percent,
+            "process_rss_mb": round(process_memory.rss / (1024**2), 1),
+            "disk_total_gb": round(disk.total / (1024**3), 2),
+            "disk_free_gb": round(disk.free / (1024**3), 2),
+            "disk_used_percent": round((disk.used / disk.total) * 100, 2),
+            "database_healthy": database_healthy,
+            "db_check_ms": db_check_ms,
+            "cache_healthy": cache_healthy,
+            "database_pools": connection_manager.pool_status(),
+        }
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent sample, or None until the sampler thread has taken its first one."""
+        self.ensure_started()
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def trends(self, points: int = 12) -> Dict[str, Any]:
+        """Recent values plus min/avg/max over the buffer for the headline fields."""
+        with self._lock:
+            samples = list(self._samples)
+        trends = {}
+        for field in TREND_FIELDS:
+            values = [s[field] for s in samples if s.get(field) is not None]
+            if not values:
+                continue
+            trends[field] = {
+                "recent": values[-points:],
+                "min": min(values),
+                "avg": round(sum(values) / len(values), 2),
+                "max": max(values),
+            }
+        if samples:
+            trends["window_seconds"] = round(samples[-1]["timestamp"] - samples[0]["timestamp"], 1)
+            trends["samples"] = len(samples)
+        return trends
+
+    def history(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            samples = list(self._samples)
+        return [dict(s, sampled_at=datetime.utcfromtimestamp(s["timestamp"]).isoformat()) for s in samples]
+
+
+system_monitor = SystemMonitor()
@@ -0,0 +1,147 @@
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import text
+
+from app.services.database import connection_manager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Distinct candle dates via a loose index scan of ix_HistoricalData1D_date:
+# one index probe per trading day rather than a scan of every row.
+_INGESTED_DATES = text('''
+    WITH RECURSIVE d AS (
+        SELECT MIN("date") AS v FROM "HistoricalData1D"
+        UNION ALL
+        SELECT (SELECT MIN("date") FROM "HistoricalData1D" WHERE "date" > d.v)
+        FROM d WHERE d.v IS NOT NULL
+    )
+    SELECT v FROM d WHERE v IS NOT NULL
+''')
+
+
+def load_holidays(path: str) -> Set[date]:
+    """
+    Read exchange holidays from a JSON list of "YYYY-MM-DD" strings or of
+    objects with a "date" key. A missing file means no known holidays.
+    """
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return set()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read holiday list {path}: {str(e)}")
+        return set()
+    holidays = set()
+    for entry in entries:
+        value = entry.get("date") if isinstance(entry, dict) else entry
+        try:
+            holidays.add(date.fromisoformat(value))
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid holiday entry {entry!r} in {path}")
+    return holidays
+
+
+class TradingCalendar:
+    """
+    Which days have an NSE session, so ingestion only asks upstream for
+    sessions that exist.
+
+    A day is a session if candles were ingested for it. Otherwise only
+    weekends and days in the holiday list (CALENDAR_HOLIDAYS_FILE) are
+    treated as closed: a weekday with no candles may be a day ingestion
+    missed, and it must stay eligible for backfill.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ingested: Set[date] = set()
+        self._first: Optional[date] = None
+        self._last: Optional[date] = None
+        self._holidays: Set[date] = set()
+        self._loaded_at: Optional[float] = None
+
+    def refresh(self) -> None:
+        """Reload ingested dates and the holiday list."""
+        holidays = load_holidays(Config.CALENDAR_HOLIDAYS_FILE)
+        try:
+            with connection_manager.get_read_engine("analytics").connect() as conn:
+                ingested = {value.date() for value in conn.execute(_INGESTED_DATES).scalars()}
+        except Exception as e:
+            logger.warning(f"Could not load ingested trading dates: {str(e)}")
+            with self._lock:
+                self._holidays = holidays
+                self._loaded_at = time.monotonic()
+            return
+        with self._lock:
+            self._ingested = ingested
+            self._first = min(ingested) if ingested else None
+            self._last = max(ingested) if ingested else None
+            self._holidays = holidays
+            self._loaded_at = time.monotonic()
+        logger.info(f"Trading calendar loaded: {len(ingested)} sessions, {len(holidays)} listed holidays")
+
+    def invalidate(self) -> None:
+        """Reload on next use, e.g. after new dates were ingested."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > Config.CALENDAR_REFRESH_SECONDS:
+            self.refresh()
+
+    def is_trading_day(self, day: date) -> bool:
+        self._ensure_loaded()
+        with self._lock:
+            if day in self._ingested:
+                return True
+            return day.weekday() < 5 and day not in self._holidays
+
+    def has_session_between(self, start: date, end: date) -> bool:
+        """Whether any session falls in [start, end]."""
+        day = start
+        while day <= end:
+            if self.is_trading_day(day):
+                return True
+            day += timedelta(days=1)
+        return False
+
+    def latest_session(self, now: Optional[datetime] = None) -> date:
+        """
+        The most recent session whose end-of-day data should be published.
+
+        Today counts only from CALENDAR_PUBLISH_TIME (IST) onwards.
+        """
+        now = (now or datetime.now(timezone.utc)).astimezone(IST)
+        publish_at = datetime.strptime(Config.CALENDAR_PUBLISH_TIME, "%H:%M").time()
+        day = now.date()
+        if now.time() < publish_at:
+            day -= timedelta(days=1)
+        # Bounded in case the holiday list is badly wrong
+        for _ in range(30):
+            if self.is_trading_day(day):
+                return day
+            day -= timedelta(days=1)
+        return day
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions_ingested": len(self._ingested),
+                "first_session": self._first.isoformat() if self._first else None,
+                "last_session": self._last.isoformat() if self._last else None,
+                "holidays_listed": len(self._holidays),
+            }
+
+
+trading_calendar = TradingCalendar()
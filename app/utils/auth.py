@@ -0,0 +1,33 @@
+import hmac
+import logging
+from functools import wraps
+
+from flask import jsonify, request
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin(view):
+    """Allow the request only with an `X-Admin-Token` header matching `Config.ADMIN_TOKEN`."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return jsonify({
+                "error": "Forbidden",
+                "message": "Admin endpoints are disabled; set ADMIN_TOKEN to enable them"
+            }), 403
+        if not is_admin_request():
+            logger.warning(f"Rejected admin request to {request.path} from {request.remote_addr}")
+            return jsonify({
+                "error": "Unauthorized",
+                "message": "A valid X-Admin-Token header is required"
+            }), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def is_admin_request() -> bool:
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(Config.ADMIN_TOKEN) and hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode())
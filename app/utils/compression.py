@@ -0,0 +1,80 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Response, request
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/csv", "text/plain")
+
+
+def _choose_encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def _compressor(encoding: str):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=Config.COMPRESS_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(Config.COMPRESS_LEVEL, zlib.DEFLATED, 31)  # 31 = gzip container
+    return compressor.compress, compressor.flush
+
+
+def _stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    compress, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a JSON/CSV/text response with br (if installed) or gzip.
+
+    Buffered bodies are compressed in one go once they reach
+    `COMPRESS_MIN_BYTES`; streamed bodies are compressed chunk by chunk as
+    they are sent. A strong ETag gets the encoding appended so the encoded
+    and identity representations never share a validator.
+    """
+    if (not Config.COMPRESS_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    if not response.is_streamed and response.content_length is not None \
+            and response.content_length < Config.COMPRESS_MIN_BYTES:
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        compress, finish = _compressor(encoding)
+        response.set_data(compress(response.get_data()) + finish())
+    response.headers["Content-Encoding"] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
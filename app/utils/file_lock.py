@@ -0,0 +1,53 @@
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class _PathLock:
+    __slots__ = ("thread_lock", "depth", "fd")
+
+    def __init__(self):
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.fd = None
+
+
+_registry_lock = threading.Lock()
+_locks: Dict[str, _PathLock] = {}
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive lock on `path` across gunicorn workers and threads.
+
+    Other processes are excluded with flock on the lock file, other threads
+    of this process with a lock per path. The holding thread may take it
+    again, so a locked section can call code that locks the same path.
+    """
+    path = os.path.abspath(path)
+    with _registry_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = _PathLock()
+
+    with lock.thread_lock:
+        if lock.depth == 0:
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+            lock.fd = fd
+        lock.depth += 1
+        try:
+            yield
+        finally:
+            lock.depth -= 1
+            if lock.depth == 0:
+                fcntl.flock(lock.fd, fcntl.LOCK_UN)
+                os.close(lock.fd)
+                lock.fd = None
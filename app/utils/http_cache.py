@@ -0,0 +1,79 @@
+import hashlib
+import logging
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from flask import make_response, request
+
+from app.services.data_version import request_data_version
+
+logger = logging.getLogger(__name__)
+
+# Suffixes compress_response() appends to a strong ETag
+ENCODING_SUFFIXES = ("", "-gzip", "-br")
+
+
+def make_etag(*parts: Any) -> str:
+    return hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+def _matching_etag(etag: str) -> Optional[str]:
+    """The representation of `etag` the client already holds, if any."""
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    for suffix in ENCODING_SUFFIXES:
+        if if_none_match.contains(etag + suffix):
+            return etag + suffix
+    return None
+
+
+def conditional(key_func: Optional[Callable[[], Any]] = None,
+                version_func: Optional[Callable[[], Optional[str]]] = None):
+    """
+    Strong ETags and If-None-Match handling for GET views over price data.
+
+    The ETag is derived from the request path, the normalized parameters
+    returned by `key_func` (the query string by default) and the current
+    data version, so it changes only when new data is ingested. A matching
+    If-None-Match is answered with 304 before the view runs, skipping both
+    the computation and serialization. If the parameters are invalid or the
+    data version cannot be read, the view runs normally.
+
+    `version_func` reads the version to check against (the primary's by
+    default). A view whose rows come from elsewhere, e.g. a replica, sets
+    an X-Data-Version header with the version it read alongside them, and
+    the ETag is built from that instead.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+            try:
+                key = key_func() if key_func else sorted(request.args.items(multi=True))
+            except ValueError:
+                return view(*args, **kwargs)
+            data_version = version_func() if version_func else request_data_version()
+            if data_version is None:
+                return view(*args, **kwargs)
+
+            etag = make_etag(request.path, key, data_version)
+            held = _matching_etag(etag)
+            if held is not None:
+                response = make_response("", 304)
+                response.set_etag(held)
+                response.vary.add("Accept-Encoding")
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                served_version = response.headers.get("X-Data-Version")
+                if served_version and served_version != data_version:
+                    etag = make_etag(request.path, key, served_version)
+                response.set_etag(etag)
+            # Clients may keep the body but must revalidate before reusing it
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
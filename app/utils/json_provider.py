@@ -0,0 +1,64 @@
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+from typing import Any, Union
+
+import numpy as np
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+def _default(o: Any) -> Any:
+    """Fallback for types orjson does not serialise natively."""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, np.ndarray):
+        # Non-contiguous or object arrays that OPT_SERIALIZE_NUMPY rejects
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, date):
+        # datetime/date subclasses such as pandas.Timestamp
+        return o.isoformat()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    NumPy scalars and arrays, datetimes, dates and Decimals serialise
+    without per-value Python conversion, so analytics code can hand NumPy
+    results straight to `jsonify`. NaN and infinity become null. Keys are
+    sorted like Flask's default provider unless `sort_keys` is False.
+    """
+
+    def _options(self) -> int:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self._options() | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
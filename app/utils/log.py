@@ -0,0 +1,125 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional, Tuple
+
+FILE_FORMAT = '%(asctime)s %(levelname)s %(name)s %(threadName)s : %(message)s'
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+_handlers: List[logging.Handler] = []
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site for records at or below `max_level`.
+
+    Each logging call site (file and line) may emit `burst` records at once
+    and `rate` per second after that; the rest are dropped. The next record
+    let through from a throttled call site reports how many were dropped.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rate: float, burst: int, max_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens, updated, suppressed = bucket
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                bucket[:] = [tokens, now, suppressed + 1]
+                return False
+            bucket[:] = [tokens - 1, now, 0]
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} similar messages suppressed]"
+            record.args = None
+        return True
+
+
+def configure_logging(level: int = logging.INFO, log_dir: str = "logs", rate: float = 0,
+                      burst: int = 50) -> None:
+    """
+    Route all logging through one queue drained by a background listener.
+
+    Loggers only enqueue records, so request and ingest threads never wait
+    on file I/O or handler locks. The rotating file and console handlers
+    run on the listener thread. Calling this again replaces the previous
+    setup.
+
+    Args:
+        level (int): Root log level.
+        log_dir (str): Directory for the rotating log file.
+        rate (float): Records per second allowed per call site at INFO and
+            below; 0 disables rate limiting.
+        burst (int): Records a call site may emit at once before throttling.
+    """
+    global _listener, _handlers
+    stop_logging()
+
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, 'stock_analytics.log'),
+        maxBytes=10240000,
+        backupCount=10
+    )
+    file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    file_handler.setLevel(level)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    console_handler.setLevel(level)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    if rate > 0:
+        queue_handler.addFilter(RateLimitFilter(rate, burst))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _handlers = [file_handler, console_handler]
+    _listener = QueueListener(log_queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    logging.getLogger('urllib3').setLevel(logging.WARNING)
+
+
+def start_listener() -> None:
+    """Restart the listener thread, e.g. in a worker forked after logging was configured."""
+    if _listener is not None and (_listener._thread is None or not _listener._thread.is_alive()):
+        _listener._thread = None
+        _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        if _listener._thread is not None and _listener._thread.is_alive():
+            _listener.stop()
+        for handler in _handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,6 @@
+import os
+
+
+def under_gunicorn() -> bool:
+    """True inside a gunicorn master or worker (the arbiter sets SERVER_SOFTWARE)."""
+    return os.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn/")
@@ -0,0 +1,52 @@
+import hashlib
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))+", re.I)
+_WHITESPACE = re.compile(r"\s+")
+_OPERATION = re.compile(r"^\s*(\w+)")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN|TABLE)\s+(\"[^\"]+\"|[\w.]+)", re.I)
+
+
+class StatementInfo(NamedTuple):
+    fingerprint: str
+    fingerprint_id: str
+    operation: str
+    table: str
+
+
+def normalize(statement: str) -> str:
+    """
+    Reduce a SQL statement to its shape.
+
+    Literals and bind parameters become ``?``, IN lists and multi-row VALUES
+    collapse to a single element, and whitespace is collapsed, so the same
+    query with different arguments yields the same text.
+    """
+    text = _COMMENT.sub(" ", statement)
+    text = _STRING.sub("?", text)
+    text = _PARAM.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("IN (?)", text)
+    text = _VALUES_LIST.sub("VALUES (...)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=4096)
+def classify(statement: str) -> StatementInfo:
+    """Fingerprint a statement and extract its operation and first table (cached per statement text)."""
+    fingerprint = normalize(statement)
+    operation = _OPERATION.match(fingerprint)
+    table = _TABLE.search(fingerprint)
+    return StatementInfo(
+        fingerprint=fingerprint,
+        fingerprint_id=hashlib.sha1(fingerprint.encode()).hexdigest()[:12],
+        operation=operation.group(1).upper() if operation else "UNKNOWN",
+        table=table.group(1).strip('"') if table else "",
+    )
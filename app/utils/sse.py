@@ -0,0 +1,79 @@
+import json
+import threading
+from typing import Any, Dict, Iterable, Tuple
+
+from flask import Response, jsonify, stream_with_context
+
+from config import Config
+
+_streams_lock = threading.Lock()
+_open_streams = 0
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """
+    Serialise one Server-Sent Event; keepalives are sent as comments.
+
+    No `id:` is sent: a reconnecting client gets a fresh stream that starts
+    with the job's full status, so there is nothing to resume from.
+    """
+    if event == "keepalive":
+        return ": keepalive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: Iterable[Tuple[str, Dict[str, Any]]]) -> Response:
+    """
+    Stream (event, data) pairs as a text/event-stream response.
+
+    Each stream holds one of the worker's gthread threads for as long as the
+    client is connected, so at most `SSE_MAX_STREAMS` run per worker; beyond
+    that the client gets a 503 with Retry-After instead of starving ordinary
+    requests of threads.
+    """
+    global _open_streams
+    with _streams_lock:
+        admitted = _open_streams < Config.SSE_MAX_STREAMS
+        if admitted:
+            _open_streams += 1
+    if not admitted:
+        retry_after = Config.ADMISSION_RETRY_AFTER_SECONDS
+        response = jsonify({
+            "error": "Service Unavailable",
+            "message": "Too many event streams are open, please retry later",
+            "reason": "streams_full",
+            "retry_after_seconds": retry_after,
+            "status_code": 503
+        })
+        response.status_code = 503
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    def generate():
+        # Tell EventSource clients how long to wait before reconnecting
+        yield "retry: 5000\n\n"
+        for event, data in events:
+            yield format_event(event, data)
+
+    closed = threading.Event()
+
+    def release():
+        global _open_streams
+        if closed.is_set():
+            return
+        closed.set()
+        with _streams_lock:
+            _open_streams -= 1
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
+    # The server closes the response when the client disconnects or the stream ends
+    response.call_on_close(release)
+    return response
@@ -4,13 +4,192 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _pool_profile(name, pool_size, max_overflow, pool_timeout, statement_timeout, work_mem, jit):
+    """Build a connection pool profile, overridable with DB_<NAME>_* variables."""
+    prefix = f"DB_{name.upper()}_"
+    return {
+        "pool_size": int(os.getenv(prefix + "POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv(prefix + "MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": float(os.getenv(prefix + "POOL_TIMEOUT", pool_timeout)),
+        "settings": {
+            "statement_timeout": os.getenv(prefix + "STATEMENT_TIMEOUT", statement_timeout),
+            "work_mem": os.getenv(prefix + "WORK_MEM", work_mem),
+            "jit": os.getenv(prefix + "JIT", jit),
+            "application_name": f"stock-analytics-{name}",
+        },
+    }
+
+
 class Config:
     DEBUG = False
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # "orjson" (fast, NumPy-aware) or "default" for Flask's stdlib json provider
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+
+    # Response compression (br needs the optional brotli package, otherwise gzip)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+    # gunicorn (see gunicorn.conf.py). gthread serves THREADS requests per
+    # worker; gevent needs the gevent (and psycogreen) packages installed.
+    GUNICORN_BIND = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+    GUNICORN_WORKER_CLASS = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+    GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", str(min(os.cpu_count() or 1, 4))))
+    GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "8"))
+    GUNICORN_WORKER_CONNECTIONS = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "200"))
+    GUNICORN_PRELOAD = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+    GUNICORN_TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+    GUNICORN_GRACEFUL_TIMEOUT = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+    # Workers run background jobs in-process, so recycling one after N requests
+    # would kill its jobs once graceful_timeout runs out; 0 disables recycling
+    GUNICORN_MAX_REQUESTS = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+
+    # Logging goes through a queue; INFO and below is rate-limited per call site
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_RATE_LIMIT_PER_SECOND = float(os.getenv("LOG_RATE_LIMIT_PER_SECOND", "20"))
+    LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "100"))
+
+    # Named connection pools; each applies its own session settings on connect
+    DB_POOL_PROFILES = {
+        "api": _pool_profile("api", 10, 10, 5, "30s", "8MB", "off"),
+        "analytics": _pool_profile("analytics", 4, 4, 30, "5min", "64MB", "on"),
+        "ingest": _pool_profile("ingest", 4, 2, 60, "0", "32MB", "off"),
+    }
+    # Optional streaming replica for read-only analytics/history queries
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+    REPLICA_READ_PROFILES = [p.strip() for p in os.getenv("REPLICA_READ_PROFILES", "analytics").split(",") if p.strip()]
+    REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "30"))
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": DB_POOL_PROFILES["api"]["pool_size"],
+        "max_overflow": DB_POOL_PROFILES["api"]["max_overflow"],
+        "pool_timeout": DB_POOL_PROFILES["api"]["pool_timeout"],
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+    }
     UPSTOX_HIST_API_URL = 'https://api.upstox.com/v2/historical-candle/'
 
+    # Background job pool for long-running analytics requests. Jobs are
+    # recorded in the JobRun table; a job whose worker stops renewing its
+    # lease for JOB_LEASE_SECONDS is marked failed.
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "10"))
+    JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "100"))
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+    # Server-Sent Events for job progress
+    JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "2"))
+    JOB_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("JOB_EVENTS_KEEPALIVE_SECONDS", "15"))
+    # Each open stream holds a gunicorn thread; keep this below GUNICORN_THREADS
+    SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "4"))
+
+    # Statement profiler (per-fingerprint timings, on-demand EXPLAIN)
+    QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "true").lower() == "true"
+    QUERY_PROFILER_SAMPLES = int(os.getenv("QUERY_PROFILER_SAMPLES", "1024"))
+    SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "1.0"))
+    QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+
+    # Per-request profiling: admins send X-Profile: 1, or a sampled fraction is profiled
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "50"))
+    PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "25"))
+
+    # Shared secret for /v1/admin/* endpoints (sent as X-Admin-Token); unset disables them
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+    # Flask-Caching backend; set CACHE_TYPE=RedisCache and CACHE_REDIS_URL to share across workers
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "null")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+    # Request coalescing for identical analytics calls. SINGLE_FLIGHT_SHARED
+    # also coalesces across workers through the cache backend above.
+    SINGLE_FLIGHT_SHARED = os.getenv("SINGLE_FLIGHT_SHARED", "false").lower() == "true"
+    SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "120"))
+    SINGLE_FLIGHT_POLL_SECONDS = float(os.getenv("SINGLE_FLIGHT_POLL_SECONDS", "0.1"))
+    SINGLE_FLIGHT_RESULT_SECONDS = int(os.getenv("SINGLE_FLIGHT_RESULT_SECONDS", "30"))
+
+    # Admission control for expensive endpoints, per worker process. Each cost
+    # class admits CONCURRENCY requests and queues up to QUEUE more; clients
+    # get RATE_PER_MINUTE requests per class with bursts of BURST (0 disables).
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "15"))
+    ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+    ADMISSION_STANDARD_CONCURRENCY = int(os.getenv("ADMISSION_STANDARD_CONCURRENCY", "16"))
+    ADMISSION_STANDARD_QUEUE = int(os.getenv("ADMISSION_STANDARD_QUEUE", "64"))
+    ADMISSION_STANDARD_RATE_PER_MINUTE = float(os.getenv("ADMISSION_STANDARD_RATE_PER_MINUTE", "120"))
+    ADMISSION_STANDARD_BURST = int(os.getenv("ADMISSION_STANDARD_BURST", "20"))
+    ADMISSION_HEAVY_CONCURRENCY = int(os.getenv("ADMISSION_HEAVY_CONCURRENCY", "2"))
+    ADMISSION_HEAVY_QUEUE = int(os.getenv("ADMISSION_HEAVY_QUEUE", "2"))
+    ADMISSION_HEAVY_RATE_PER_MINUTE = float(os.getenv("ADMISSION_HEAVY_RATE_PER_MINUTE", "6"))
+    ADMISSION_HEAVY_BURST = int(os.getenv("ADMISSION_HEAVY_BURST", "3"))
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted for
+    # the client address (rate limits are keyed on it); 0 uses the socket peer
+    TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+
+    # Background health sampler behind /v1/health/detailed
+    HEALTH_SAMPLE_SECONDS = float(os.getenv("HEALTH_SAMPLE_SECONDS", "5"))
+    HEALTH_HISTORY_SIZE = int(os.getenv("HEALTH_HISTORY_SIZE", "120"))
+
+    # Post-market pipeline: bhavcopy -> gap fill -> SMA results / crossovers
+    PIPELINE_SCHEDULE_ENABLED = os.getenv("PIPELINE_SCHEDULE_ENABLED", "false").lower() == "true"
+    PIPELINE_RUN_AT = os.getenv("PIPELINE_RUN_AT", "18:30")
+    PIPELINE_TIMEZONE = os.getenv("PIPELINE_TIMEZONE", "Asia/Kolkata")
+    PIPELINE_SMA_PERIOD = int(os.getenv("PIPELINE_SMA_PERIOD", "50"))
+    PIPELINE_SMA_THRESHOLD = float(os.getenv("PIPELINE_SMA_THRESHOLD", "2.0"))
+    PIPELINE_CROSS_SHORT = int(os.getenv("PIPELINE_CROSS_SHORT", "50"))
+    PIPELINE_CROSS_LONG = int(os.getenv("PIPELINE_CROSS_LONG", "200"))
+
+    # /v1/history candle reads (keyset-paginated)
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "5000"))
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "50000"))
+    HISTORY_MAX_SYMBOLS = int(os.getenv("HISTORY_MAX_SYMBOLS", "100"))
+
+    # Bulk history exports (Arrow IPC / NPZ), cached on disk per data version
+    EXPORT_DIR = os.getenv("EXPORT_DIR", "data/exports")
+    EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+    EXPORT_CACHE_MAX_FILES = int(os.getenv("EXPORT_CACHE_MAX_FILES", "20"))
+    EXPORT_PRUNE_GRACE_SECONDS = float(os.getenv("EXPORT_PRUNE_GRACE_SECONDS", "60"))
+    EXPORT_MAX_SYMBOLS = int(os.getenv("EXPORT_MAX_SYMBOLS", "5000"))
+
+    # /v1/changes incremental sync (rows per table per page)
+    CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "10000"))
+    CHANGES_MAX_PAGE_SIZE = int(os.getenv("CHANGES_MAX_PAGE_SIZE", "50000"))
+
+    # Intraday (1-minute) candles in monthly partitions of HistoricalData1M
+    INTRADAY_BACKFILL_DAYS = int(os.getenv("INTRADAY_BACKFILL_DAYS", "30"))
+    INTRADAY_FETCH_DAYS = int(os.getenv("INTRADAY_FETCH_DAYS", "30"))
+    INTRADAY_FETCH_WORKERS = int(os.getenv("INTRADAY_FETCH_WORKERS", "4"))
+    INTRADAY_FETCH_TIMEOUT = float(os.getenv("INTRADAY_FETCH_TIMEOUT", "15"))
+    INTRADAY_REQUESTS_PER_SECOND = float(os.getenv("INTRADAY_REQUESTS_PER_SECOND", "20"))
+    INTRADAY_WRITE_BATCH_ROWS = int(os.getenv("INTRADAY_WRITE_BATCH_ROWS", "200000"))
+    INTRADAY_MAX_DAYS = int(os.getenv("INTRADAY_MAX_DAYS", "31"))
+    # Partitions older than this many months are dropped (0 keeps everything),
+    # after being archived as compressed Arrow IPC when INTRADAY_ARCHIVE_DIR is set
+    INTRADAY_RETENTION_MONTHS = int(os.getenv("INTRADAY_RETENTION_MONTHS", "0"))
+    INTRADAY_ARCHIVE_DIR = os.getenv("INTRADAY_ARCHIVE_DIR", "")
+    INTRADAY_ARCHIVE_COMPRESSION = os.getenv("INTRADAY_ARCHIVE_COMPRESSION", "zstd")
+
+    # Trading calendar: every ingested date is a session, and so is any other
+    # weekday not in the holiday list. End-of-day data counts as published
+    # from CALENDAR_PUBLISH_TIME (IST).
+    CALENDAR_HOLIDAYS_FILE = os.getenv("CALENDAR_HOLIDAYS_FILE", "data/nse_holidays.json")
+    CALENDAR_PUBLISH_TIME = os.getenv("CALENDAR_PUBLISH_TIME", "17:00")
+    CALENDAR_REFRESH_SECONDS = int(os.getenv("CALENDAR_REFRESH_SECONDS", "3600"))
+
+    # Columnar price snapshots (Arrow IPC) refreshed after each ingest
+    SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "true").lower() == "true"
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+
+    # Memory-mapped price store shared by all gunicorn workers; point the
+    # directory at /dev/shm to keep it off disk if shm is large enough
+    SHARED_STORE_ENABLED = os.getenv("SHARED_STORE_ENABLED", "true").lower() == "true"
+    SHARED_STORE_DIR = os.getenv("SHARED_STORE_DIR", "data/shared")
+    SHARED_STORE_SMA_WINDOWS = [int(w) for w in os.getenv("SHARED_STORE_SMA_WINDOWS", "20,50,200").split(",") if w.strip()]
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -0,0 +1,47 @@
+# gunicorn.conf.py
+import os
+import shutil
+
+from config import Config
+
+# Per-worker metric files, aggregated by /metrics. Must be set before the
+# app (and prometheus_client) is imported, which preload_app does next.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+
+if Config.GUNICORN_WORKER_CLASS == "gevent":
+    # Patch before the app is preloaded so threads, sockets and psycopg2
+    # all cooperate with the event loop
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+bind = Config.GUNICORN_BIND
+worker_class = Config.GUNICORN_WORKER_CLASS
+workers = Config.GUNICORN_WORKERS
+threads = Config.GUNICORN_THREADS
+worker_connections = Config.GUNICORN_WORKER_CONNECTIONS
+preload_app = Config.GUNICORN_PRELOAD
+timeout = Config.GUNICORN_TIMEOUT
+graceful_timeout = Config.GUNICORN_GRACEFUL_TIMEOUT
+keepalive = 5
+max_requests = Config.GUNICORN_MAX_REQUESTS
+max_requests_jitter = Config.GUNICORN_MAX_REQUESTS // 10
+# Heartbeat files on tmpfs so a slow disk can't get workers killed
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def on_starting(server):
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def post_fork(server, worker):
+    from app import after_fork
+    after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,25 @@
+"""Add index on HistoricalData1D date
+
+Revision ID: 3f1c9a2b7d45
+Revises: 8c0424206618
+Create Date: 2026-10-19 10:05:12.418233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a2b7d45'
+down_revision = '8c0424206618'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Latest-trade-date lookups (replica lag checks, backfill date scans)
+    op.create_index('ix_HistoricalData1D_date', 'HistoricalData1D', ['date'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_HistoricalData1D_date', table_name='HistoricalData1D', if_exists=True)
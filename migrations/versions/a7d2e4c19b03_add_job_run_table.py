@@ -0,0 +1,45 @@
+"""Add JobRun table
+
+Revision ID: a7d2e4c19b03
+Revises: 3f1c9a2b7d45
+Create Date: 2026-10-19 11:42:37.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d2e4c19b03'
+down_revision = '3f1c9a2b7d45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('JobRun',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('jobType', sa.String(length=64), nullable=False),
+    sa.Column('dedupeKey', sa.String(length=128), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('progress', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('cancelRequested', sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.Column('owner', sa.String(length=128), nullable=True),
+    sa.Column('leaseExpiresAt', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('createdAt', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('startedAt', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completedAt', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_JobRun_jobType', 'JobRun', ['jobType'], unique=False)
+    op.create_index('uq_JobRun_active_dedupeKey', 'JobRun', ['dedupeKey'], unique=True,
+                    postgresql_where=sa.text("status IN ('queued', 'running')"))
+
+
+def downgrade():
+    op.drop_index('uq_JobRun_active_dedupeKey', table_name='JobRun')
+    op.drop_index('ix_JobRun_jobType', table_name='JobRun')
+    op.drop_table('JobRun')
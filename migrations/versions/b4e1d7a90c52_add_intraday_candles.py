@@ -0,0 +1,36 @@
+"""Add HistoricalData1M, partitioned by month
+
+Revision ID: b4e1d7a90c52
+Revises: f2a9c4e7b160
+Create Date: 2026-10-19 18:21:44.107362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e1d7a90c52'
+down_revision = 'f2a9c4e7b160'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Monthly partitions are created on demand by the intraday ingester
+    op.create_table('HistoricalData1M',
+    sa.Column('symbolId', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('openPrice', sa.Integer(), nullable=False),
+    sa.Column('highPrice', sa.Integer(), nullable=False),
+    sa.Column('lowPrice', sa.Integer(), nullable=False),
+    sa.Column('closePrice', sa.Integer(), nullable=False),
+    sa.Column('volume', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['symbolId'], ['StockSymbol.id'], ),
+    sa.PrimaryKeyConstraint('symbolId', 'ts'),
+    postgresql_partition_by='RANGE ("ts")'
+    )
+
+
+def downgrade():
+    op.drop_table('HistoricalData1M')
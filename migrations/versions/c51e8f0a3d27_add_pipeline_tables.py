@@ -0,0 +1,52 @@
+"""Add SMA cross results and pipeline stage run tables
+
+Revision ID: c51e8f0a3d27
+Revises: a7d2e4c19b03
+Create Date: 2026-10-19 14:05:12.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c51e8f0a3d27'
+down_revision = 'a7d2e4c19b03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('SMA_Cross_Results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('symbol', sa.String(), nullable=False),
+    sa.Column('short_window', sa.Integer(), nullable=False),
+    sa.Column('long_window', sa.Integer(), nullable=False),
+    sa.Column('sma_short', sa.Float(), nullable=False),
+    sa.Column('sma_long', sa.Float(), nullable=False),
+    sa.Column('signal', sa.String(length=16), nullable=False),
+    sa.Column('date_generated', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('PipelineStageRun',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('runId', sa.String(length=32), nullable=False),
+    sa.Column('stage', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('fingerprint', sa.String(length=128), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('startedAt', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completedAt', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('durationSeconds', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_PipelineStageRun_runId', 'PipelineStageRun', ['runId'], unique=False)
+    op.create_index('ix_PipelineStageRun_stage_status', 'PipelineStageRun', ['stage', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_PipelineStageRun_stage_status', table_name='PipelineStageRun')
+    op.drop_index('ix_PipelineStageRun_runId', table_name='PipelineStageRun')
+    op.drop_table('PipelineStageRun')
+    op.drop_table('SMA_Cross_Results')
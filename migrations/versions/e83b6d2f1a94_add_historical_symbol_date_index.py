@@ -0,0 +1,30 @@
+"""Add covering (symbol, date) index on HistoricalData1D
+
+Revision ID: e83b6d2f1a94
+Revises: c51e8f0a3d27
+Create Date: 2026-10-19 16:20:41.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83b6d2f1a94'
+down_revision = 'c51e8f0a3d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset-paginated /v1/history reads: one range scan per page, answered
+    # from the index without visiting the heap
+    op.create_index(
+        'ix_HistoricalData1D_symbol_date_covering', 'HistoricalData1D', ['symbol', 'date'],
+        unique=False, if_not_exists=True,
+        postgresql_include=['openPrice', 'highPrice', 'lowPrice', 'closePrice', 'volume']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_HistoricalData1D_symbol_date_covering', table_name='HistoricalData1D', if_exists=True)
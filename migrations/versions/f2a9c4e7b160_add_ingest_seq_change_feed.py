@@ -0,0 +1,56 @@
+"""Add ingestSeq to HistoricalData1D and SMA_Results for the change feed
+
+Revision ID: f2a9c4e7b160
+Revises: e83b6d2f1a94
+Create Date: 2026-10-19 17:02:18.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c4e7b160'
+down_revision = 'e83b6d2f1a94'
+branch_labels = None
+depends_on = None
+
+TABLES = ('HistoricalData1D', 'SMA_Results')
+INGEST_SEQ = 'pg_current_xact_id()::text::bigint'
+
+
+def upgrade():
+    # Stamp each insert/update with the writing transaction's id. The
+    # default is set after the column is added so existing rows keep NULL
+    # and the table is not rewritten.
+    op.execute(f'''
+        CREATE OR REPLACE FUNCTION set_ingest_seq() RETURNS trigger AS $$
+        BEGIN
+            NEW."ingestSeq" := {INGEST_SEQ};
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    for table in TABLES:
+        op.add_column(table, sa.Column('ingestSeq', sa.BigInteger(), nullable=True))
+        op.alter_column(table, 'ingestSeq', server_default=sa.text(INGEST_SEQ))
+        op.execute(f'''
+            CREATE TRIGGER "trg_{table}_ingestSeq" BEFORE UPDATE ON "{table}"
+            FOR EACH ROW EXECUTE FUNCTION set_ingest_seq()
+        ''')
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_ingestSeq_id', table, ['ingestSeq', 'id'],
+                unique=False, if_not_exists=True,
+                postgresql_where=sa.text('"ingestSeq" IS NOT NULL'),
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_ingestSeq_id', table_name=table, if_exists=True)
+        op.execute(f'DROP TRIGGER IF EXISTS "trg_{table}_ingestSeq" ON "{table}"')
+        op.drop_column(table, 'ingestSeq')
+    op.execute('DROP FUNCTION IF EXISTS set_ingest_seq()')
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from app.services import admission
+from app.services.admission import Rejected, _client_id, _CostClass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_allows_burst_then_rejects(clock):
+    limiter = _CostClass("heavy", 2, 2, rate_per_minute=6, burst=3)
+    for _ in range(3):
+        limiter.take_token("10.0.0.1")
+
+    with pytest.raises(Rejected) as e:
+        limiter.take_token("10.0.0.1")
+    assert (e.value.status, e.value.reason, e.value.retry_after) == (429, "rate_limited", 10)
+
+
+def test_token_bucket_refills_over_time(clock):
+    limiter = _CostClass("heavy", 2, 2, rate_per_minute=6, burst=1)
+    limiter.take_token("a")
+    with pytest.raises(Rejected):
+        limiter.take_token("a")
+
+    clock[0] += 10
+    limiter.take_token("a")
+
+
+def test_token_buckets_are_per_client(clock):
+    limiter = _CostClass("heavy", 2, 2, rate_per_minute=6, burst=1)
+    limiter.take_token("a")
+    limiter.take_token("b")
+    with pytest.raises(Rejected):
+        limiter.take_token("a")
+
+
+def test_zero_rate_disables_the_bucket(clock):
+    limiter = _CostClass("heavy", 2, 2, rate_per_minute=0, burst=1)
+    for _ in range(10):
+        limiter.take_token("a")
+
+
+def test_full_buckets_are_pruned_at_capacity(clock, monkeypatch):
+    monkeypatch.setattr(admission.Config, "ADMISSION_MAX_CLIENTS", 2)
+    limiter = _CostClass("heavy", 2, 2, rate_per_minute=60, burst=1)
+    limiter.take_token("a")
+    limiter.take_token("b")
+
+    clock[0] += 1
+    limiter.take_token("c")
+    assert set(limiter._buckets) == {"c"}
+
+
+def test_queue_rejects_beyond_depth():
+    limiter = _CostClass("heavy", 1, 0, rate_per_minute=0, burst=1)
+    limiter.acquire(0.1)
+
+    with pytest.raises(Rejected) as e:
+        limiter.acquire(0.1)
+    assert (e.value.status, e.value.reason) == (503, "queue_full")
+
+    limiter.release()
+    limiter.acquire(0.1)
+
+
+def test_queued_request_times_out_or_gets_released_slot():
+    limiter = _CostClass("heavy", 1, 1, rate_per_minute=0, burst=1)
+    limiter.acquire(0.1)
+    with pytest.raises(Rejected) as e:
+        limiter.acquire(0.05)
+    assert e.value.reason == "queue_timeout"
+
+    threading.Timer(0.05, limiter.release).start()
+    limiter.acquire(2)
+    assert limiter.status()["active"] == 1
+
+
+def test_client_id_ignores_client_supplied_header():
+    app = Flask(__name__)
+    with app.test_request_context(headers={"X-Client-Id": "spoofed"}, environ_base={"REMOTE_ADDR": "10.1.2.3"}):
+        assert _client_id() == "10.1.2.3"
@@ -0,0 +1,90 @@
+import pytest
+from flask import Flask
+
+from app.routes import analytics
+from app.routes.analytics import analytics_bp
+from app.routes.jobs import jobs_bp
+from app.services import admission
+from app.services.jobs import JobAlreadyRunning
+from app.services.single_flight import SingleFlightTimeout
+from app.utils import http_cache
+
+
+class _FakeJobManager:
+    """Registry with JobManager.submit's dedupe contract; jobs are recorded, not run."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, job_type, target, params=None, dedupe_key=None):
+        for job in self.jobs:
+            if dedupe_key and job["dedupe_key"] == dedupe_key:
+                raise JobAlreadyRunning(job)
+        job = {"job_id": f"job{len(self.jobs) + 1}", "type": job_type, "status": "queued",
+               "params": params, "dedupe_key": dedupe_key, "created_at": "2025-01-02T10:00:00"}
+        self.jobs.append(job)
+        return job
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    manager = _FakeJobManager()
+    monkeypatch.setattr(analytics, "job_manager", manager)
+    monkeypatch.setattr(analytics, "update_sma_results", lambda *a, **k: pytest.fail("must run as a job"))
+    monkeypatch.setattr(analytics, "get_stocks_near_sma", lambda *a, **k: pytest.fail("must run as a job"))
+    monkeypatch.setattr(http_cache, "request_data_version", lambda: None)
+    monkeypatch.setattr(admission.Config, "ADMISSION_ENABLED", False)
+    return manager
+
+
+@pytest.fixture
+def client(jobs):
+    app = Flask(__name__)
+    app.register_blueprint(analytics_bp, url_prefix="/v1")
+    app.register_blueprint(jobs_bp, url_prefix="/v1")
+    return app.test_client()
+
+
+def test_async_sma_update_returns_202_with_job(client, jobs):
+    response = client.post("/v1/analytics/smadb", json={"sma_period": 20, "threshold_pct": 1.5, "async": True})
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["job_id"] == "job1"
+    assert body["status_url"] == "/v1/jobs/job1"
+    assert body["parameters"] == {"sma_period": 20, "threshold_pct": 1.5}
+    assert jobs.jobs[0]["dedupe_key"] == "sma_update:20:1.5"
+
+
+def test_duplicate_async_sma_update_returns_existing_job(client, jobs):
+    first = client.post("/v1/analytics/smadb?async=1", json={"sma_period": 20})
+    second = client.post("/v1/analytics/smadb?async=1", json={"sma_period": 20})
+    other = client.post("/v1/analytics/smadb?async=1", json={"sma_period": 50})
+
+    assert first.status_code == 202
+    assert second.status_code == 409
+    assert second.get_json()["job_id"] == first.get_json()["job_id"]
+    assert second.get_json()["running_since"] == "2025-01-02T10:00:00"
+    assert other.status_code == 202
+    assert len(jobs.jobs) == 2
+
+
+def test_async_sma_nearby_get_is_queued(client, jobs):
+    response = client.get("/v1/analytics/sma-nearby?sma_period=10&async=1")
+
+    assert response.status_code == 202
+    assert jobs.jobs[0]["type"] == "sma_nearby"
+    assert jobs.jobs[0]["params"] == {"sma_period": 10, "threshold_pct": 2.0}
+
+
+def test_single_flight_timeout_returns_503(client, monkeypatch):
+    monkeypatch.setattr(analytics, "request_data_version", lambda: "20250102-1")
+
+    def timed_out(name, key, fn):
+        raise SingleFlightTimeout("still computing")
+
+    monkeypatch.setattr(analytics.single_flight, "do", timed_out)
+    response = client.get("/v1/analytics/sma-nearby?sma_period=10")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
@@ -0,0 +1,74 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app.services.bulk_loader import (
+    COPY_SIGNATURE, PG_EPOCH, CopyRowDecoder, _row_dtype, decode_copy_binary, decode_copy_rows
+)
+
+HEADER = COPY_SIGNATURE + struct.pack(">ii", 0, 0)
+TRAILER = b"\xff\xff"
+
+
+def _tuple(symbol_ord, micros, close):
+    return (struct.pack(">h", 3) + struct.pack(">ii", 4, symbol_ord) + struct.pack(">iq", 8, micros)
+            + struct.pack(">id", 8, close))
+
+
+def _null_close_tuple(symbol_ord, micros):
+    return struct.pack(">h", 3) + struct.pack(">ii", 4, symbol_ord) + struct.pack(">iq", 8, micros) + struct.pack(">i", -1)
+
+
+def test_decodes_rows():
+    payload = HEADER + _tuple(1, 0, 10.5) + _tuple(2, 86_400_000_000, 11.25) + TRAILER
+
+    rows = decode_copy_binary(payload, ["close"])
+
+    assert rows["symbol"].tolist() == [1, 2]
+    assert rows["close"].tolist() == [10.5, 11.25]
+    assert (PG_EPOCH + rows["date"].astype(np.int64).astype("timedelta64[us]"))[1] == np.datetime64("2000-01-02")
+
+
+def test_empty_result():
+    assert len(decode_copy_binary(HEADER + TRAILER, ["close"])) == 0
+
+
+def test_header_extension_is_skipped():
+    payload = COPY_SIGNATURE + struct.pack(">ii", 0, 4) + b"abcd" + _tuple(1, 0, 1.0) + TRAILER
+    assert decode_copy_binary(payload, ["close"])["close"].tolist() == [1.0]
+
+
+def test_streamed_chunks_match_whole_payload():
+    payload = HEADER + b"".join(_tuple(i, i, float(i)) for i in range(50)) + TRAILER
+    decoder = CopyRowDecoder(_row_dtype(["close"]))
+    for i in range(0, len(payload), 7):
+        decoder.feed(payload[i:i + 7])
+
+    rows = decoder.finish()
+
+    assert rows["close"].tolist() == [float(i) for i in range(50)]
+    assert decoder.row_count == 50
+
+
+def test_null_field_is_rejected():
+    payload = HEADER + _null_close_tuple(1, 0) + _tuple(2, 0, 2.0) + _tuple(3, 0, 3.0) + TRAILER
+    with pytest.raises(ValueError, match="NULL"):
+        decode_copy_binary(payload, ["close"])
+
+
+def test_null_in_last_row_is_rejected():
+    payload = HEADER + _tuple(1, 0, 1.0) + _null_close_tuple(2, 0) + TRAILER
+    with pytest.raises(ValueError):
+        decode_copy_binary(payload, ["close"])
+
+
+def test_truncated_payload_is_rejected():
+    payload = HEADER + _tuple(1, 0, 1.0) + _tuple(2, 0, 2.0)[:-3]
+    with pytest.raises(ValueError):
+        decode_copy_binary(payload, ["close"])
+
+
+def test_not_a_copy_payload():
+    with pytest.raises(ValueError, match="Not a PostgreSQL"):
+        decode_copy_rows(b"x" * 40, _row_dtype(["close"]))
@@ -0,0 +1,39 @@
+import base64
+
+import pytest
+
+from app.services.changes import decode_cursor, encode_cursor, parse_tables
+
+
+def _raw_cursor(payload: bytes) -> str:
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    positions = {"history": (9876543210, 42), "sma_results": (100, 0)}
+    cursor = encode_cursor(positions)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == positions
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "!!!",
+    _raw_cursor(b"not json"),
+    _raw_cursor(b"[1, 2]"),
+    _raw_cursor(b'{"history": [1]}'),
+    _raw_cursor(b'{"history": ["a", 1]}'),
+    _raw_cursor(b'{"history": 5}'),
+    _raw_cursor(b'{"prices": [1, 2]}'),
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_parse_tables():
+    assert parse_tables(None) == ["history", "sma_results"]
+    assert parse_tables("sma_results, history,sma_results") == ["sma_results", "history"]
+    with pytest.raises(ValueError, match="Unknown table"):
+        parse_tables("history,prices")
@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+from app.services.database import REPLICA_SUFFIX, ConnectionManager
+from config import Config
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def one(self):
+        return self.row
+
+
+class _Engine:
+    def __init__(self, position):
+        self.position = position
+        self.checks = 0
+
+    @contextmanager
+    def connect(self):
+        self.checks += 1
+        if isinstance(self.position, Exception):
+            raise self.position
+        yield self
+
+    def execute(self, statement):
+        return _Result(self.position)
+
+
+DAY = datetime(2025, 1, 2)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_REPLICA_URL", "postgresql://replica/db")
+    monkeypatch.setattr(Config, "REPLICA_READ_PROFILES", ["analytics"])
+    monkeypatch.setattr(Config, "REPLICA_LAG_CHECK_SECONDS", 30)
+
+    def build(primary, replica):
+        manager = ConnectionManager(profiles={"analytics": {}, "api": {}})
+        manager._engines["analytics"] = _Engine(primary)
+        manager._engines["analytics" + REPLICA_SUFFIX] = _Engine(replica)
+        manager._engines["api"] = _Engine(primary)
+        return manager
+    return build
+
+
+def test_current_replica_serves_reads(manager):
+    cm = manager((DAY, 100, 50), (DAY, 100, 50))
+
+    assert cm.get_read_engine("analytics") is cm._engines["analytics" + REPLICA_SUFFIX]
+    assert cm.replica_status()["lagging"] is False
+
+
+def test_replica_missing_rows_for_same_date_is_lagging(manager):
+    cm = manager((DAY, 101, 50), (DAY, 100, 50))
+
+    assert cm.get_read_engine("analytics") is cm._engines["analytics"]
+    assert cm.replica_status()["replica"]["history_seq"] == "100"
+
+
+def test_replica_missing_sma_rewrite_is_lagging(manager):
+    cm = manager((DAY, 100, 60), (DAY, 100, None))
+
+    assert cm.get_read_engine("analytics") is cm._engines["analytics"]
+
+
+def test_replica_ahead_of_primary_read_is_current(manager):
+    cm = manager((DAY, 100, 50), (DAY, 102, 51))
+
+    assert cm.get_read_engine("analytics") is cm._engines["analytics" + REPLICA_SUFFIX]
+
+
+def test_failed_check_routes_to_primary(manager):
+    cm = manager((DAY, 100, 50), OSError("replica down"))
+
+    assert cm.get_read_engine("analytics") is cm._engines["analytics"]
+    assert cm.replica_status()["lagging"] is True
+
+
+def test_result_is_cached_until_primary_written(manager):
+    cm = manager((DAY, 100, 50), (DAY, 100, 50))
+    replica = cm._engines["analytics" + REPLICA_SUFFIX]
+    cm.get_read_engine("analytics")
+    cm.get_read_engine("analytics")
+    assert replica.checks == 1
+
+    cm._engines["analytics"].position = (DAY, 105, 50)
+    cm.mark_primary_written()
+    assert cm.get_read_engine("analytics") is cm._engines["analytics"]
+    assert replica.checks == 2
+
+
+def test_profiles_outside_replica_reads_use_primary(manager):
+    cm = manager((DAY, 100, 50), (DAY, 100, 50))
+
+    assert cm.get_read_engine("api") is cm._engines["api"]
+    assert cm._engines["analytics" + REPLICA_SUFFIX].checks == 0
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.services import export
+from app.services.export import export_key, prune_exports
+
+
+def _touch(directory, name, age):
+    path = directory / name
+    path.write_bytes(b"x")
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_keeps_newest_and_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(export.Config, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(export.Config, "EXPORT_CACHE_MAX_FILES", 1)
+    monkeypatch.setattr(export.Config, "EXPORT_PRUNE_GRACE_SECONDS", 60)
+    newest = _touch(tmp_path, "history-a.arrow", 1)
+    just_served = _touch(tmp_path, "history-b.arrow", 5)
+    old = _touch(tmp_path, "history-c.arrow", 600)
+    building = _touch(tmp_path, "history-d.arrow.tmp.123", 600)
+    unrelated = _touch(tmp_path, "notes.txt", 600)
+
+    prune_exports()
+
+    assert newest.exists() and just_served.exists()
+    assert not old.exists()
+    assert building.exists() and unrelated.exists()
+
+
+def test_prune_without_export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export.Config, "EXPORT_DIR", str(tmp_path / "missing"))
+    prune_exports()
+
+
+def test_export_key_depends_on_request_and_version():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    key = export_key("arrow", ["TCS", "INFY"], start, None, ["close"], "20241018-1")
+
+    assert key == export_key("arrow", ["INFY", "TCS"], start, None, ["close"], "20241018-1")
+    assert key != export_key("npz", ["INFY", "TCS"], start, None, ["close"], "20241018-1")
+    assert key != export_key("arrow", ["INFY", "TCS"], start, None, ["close"], "20241019-2")
+    assert key != export_key("arrow", None, start, None, ["close"], "20241018-1")
+
+
+def test_concurrent_builds_of_the_same_export_do_not_share_a_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(export.Config, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(export, "read_data_version", lambda conn: "20241018-1")
+    # Let every caller build, as happens across workers
+    monkeypatch.setattr(export.single_flight, "do", lambda name, key, fn: (fn(), False))
+    barrier = threading.Barrier(2)
+    temp_paths = []
+
+    def write(conn, path, symbols, start, end, columns):
+        temp_paths.append(path)
+        with open(path, "wb") as f:
+            f.write(b"first half ")
+            barrier.wait(5)
+            f.write(b"second half")
+        return 1
+
+    monkeypatch.setitem(export.WRITERS, "arrow", write)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(export._get_export(None, "arrow", None, None, None,
+                                                                                 ["close"])))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(set(temp_paths)) == 2
+    assert len(results) == 2 and results[0]["path"] == results[1]["path"]
+    with open(results[0]["path"], "rb") as f:
+        assert f.read() == b"first half second half"
+    assert os.listdir(tmp_path) == [os.path.basename(results[0]["path"])]
@@ -0,0 +1,63 @@
+import multiprocessing
+import threading
+import time
+
+from app.utils.file_lock import file_lock
+
+
+def _hold(path, started, release):
+    with file_lock(path):
+        started.set()
+        release.wait(5)
+
+
+def test_threads_are_serialised(tmp_path):
+    path = str(tmp_path / ".lock")
+    active, overlaps = [0], []
+
+    def work():
+        with file_lock(path):
+            active[0] += 1
+            overlaps.append(active[0])
+            time.sleep(0.01)
+            active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert overlaps == [1] * 8
+
+
+def test_reentrant_in_holding_thread(tmp_path):
+    path = str(tmp_path / ".lock")
+    with file_lock(path):
+        with file_lock(path):
+            pass
+        with file_lock(path):
+            pass
+
+
+def test_other_process_is_excluded(tmp_path):
+    path = str(tmp_path / ".lock")
+    context = multiprocessing.get_context("fork")
+    started, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold, args=(path, started, release))
+    holder.start()
+    try:
+        assert started.wait(5)
+        acquired = threading.Event()
+
+        def wait_for_lock():
+            with file_lock(path):
+                acquired.set()
+
+        waiter = threading.Thread(target=wait_for_lock, daemon=True)
+        waiter.start()
+        assert not acquired.wait(0.2)
+        release.set()
+        assert acquired.wait(5)
+    finally:
+        release.set()
+        holder.join(5)
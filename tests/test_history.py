@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pytest
+from flask import Flask
+
+from app.routes import history as history_routes
+from app.routes.history import history_bp
+from app.utils.http_cache import make_etag
+
+from app.services.history import (decode_cursor, encode_cursor, parse_columns, parse_date,
+                                  to_arrow_ipc)
+
+
+def test_cursor_round_trip():
+    last = datetime(2024, 10, 18, tzinfo=timezone.utc)
+    cursor = encode_cursor("M&M", last)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("M&M", last)
+
+
+def test_cursor_round_trip_with_separator_in_symbol():
+    last = datetime(2024, 1, 2, 9, 15)
+    assert decode_cursor(encode_cursor("A|B", last)) == ("A|B", last)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "bm8tc2VwYXJhdG9y", "VENTfG5vdC1hLWRhdGU"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_parse_columns():
+    assert parse_columns(None) == ["open", "high", "low", "close", "volume"]
+    assert parse_columns("close, volume,close") == ["close", "volume"]
+    with pytest.raises(ValueError, match="Unknown column"):
+        parse_columns("close,vwap")
+
+
+def test_parse_date_bounds():
+    assert parse_date("2024-10-18") == datetime(2024, 10, 18, tzinfo=timezone.utc)
+    assert parse_date("2024-10-18", end_of_day=True) == datetime(2024, 10, 18, 23, 59, 59, 999999,
+                                                                  tzinfo=timezone.utc)
+    assert parse_date(None) is None
+    with pytest.raises(ValueError):
+        parse_date("18/10/2024")
+
+
+def test_arrow_ipc_page():
+    page = {"columns": {
+        "symbol": ["TCS", "TCS"],
+        "date": [datetime(2024, 10, 17, tzinfo=timezone.utc), datetime(2024, 10, 18, tzinfo=timezone.utc)],
+        "close": [4100.5, 4120.0],
+        "volume": [1000, None],
+    }}
+
+    table = pa.ipc.open_stream(to_arrow_ipc(page)).read_all()
+    assert table.schema.field("volume").type == pa.int64()
+    assert table.schema.field("date").type == pa.timestamp("us", tz="UTC")
+    assert table.column("close").to_pylist() == [4100.5, 4120.0]
+    assert table.column("volume").to_pylist() == [1000, None]
+
+
+@pytest.fixture
+def history_client(monkeypatch):
+    reads, versions = [], {"read": "20241018-7"}
+
+    def fetch_history(symbols, **params):
+        reads.append(symbols)
+        return {"columns": {"symbol": ["TCS"], "date": [datetime(2024, 10, 18, tzinfo=timezone.utc)], "close": [1.0]},
+                "count": 1, "next_cursor": None, "data_version": "20241018-7"}
+
+    monkeypatch.setattr(history_routes, "fetch_history", fetch_history)
+    monkeypatch.setattr(history_routes, "current_data_version", lambda profile, read_only: versions["read"])
+    app = Flask(__name__)
+    app.register_blueprint(history_bp, url_prefix="/v1")
+    client = app.test_client()
+    client.reads, client.versions = reads, versions
+    return client
+
+
+def test_history_etag_names_the_version_read_with_the_rows(history_client):
+    history_client.versions["read"] = "20241018-6"
+    response = history_client.get("/v1/history?symbols=TCS&columns=close")
+
+    assert response.headers["X-Data-Version"] == "20241018-7"
+    key = ([("columns", "close"), ("symbols", "TCS")], False)
+    assert response.headers["ETag"] == f'"{make_etag("/v1/history", key, "20241018-7")}"'
+
+
+def test_history_revalidates_against_the_read_engine_version(history_client):
+    etag = history_client.get("/v1/history?symbols=TCS").headers["ETag"]
+
+    assert history_client.get("/v1/history?symbols=TCS", headers={"If-None-Match": etag}).status_code == 304
+    assert len(history_client.reads) == 1
+
+    history_client.versions["read"] = "20241021-9"
+    assert history_client.get("/v1/history?symbols=TCS", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,142 @@
+import gzip
+
+import pytest
+from flask import Flask, jsonify, request
+
+from app.services import data_version
+from app.utils import compression, http_cache
+from app.utils.compression import compress_response
+from app.utils.http_cache import conditional, make_etag
+
+
+@pytest.fixture
+def version(monkeypatch):
+    current = ["20241018-100"]
+    monkeypatch.setattr(http_cache, "request_data_version", lambda: current[0])
+    monkeypatch.setattr(compression, "brotli", None)
+    monkeypatch.setattr(compression.Config, "COMPRESS_MIN_BYTES", 10)
+    return current
+
+
+@pytest.fixture
+def client(version):
+    app = Flask(__name__)
+    app.after_request(compress_response)
+    calls = []
+
+    def key():
+        period = int(request.args.get("period", 50))
+        return period, request.args.get("async") == "1"
+
+    @app.route("/sma")
+    @conditional(key)
+    def sma():
+        calls.append(1)
+        if request.args.get("async") == "1":
+            return jsonify({"job_id": "j"}), 202
+        return jsonify({"rows": list(range(50))})
+
+    test_client = app.test_client()
+    test_client.calls = calls
+    return test_client
+
+
+def test_make_etag_is_stable_and_sensitive_to_parts():
+    assert make_etag("/sma", (50, False), "v1") == make_etag("/sma", (50, False), "v1")
+    assert make_etag("/sma", (50, False), "v1") != make_etag("/sma", (50, True), "v1")
+    assert make_etag("/sma", (50, False), "v1") != make_etag("/sma", (50, False), "v2")
+
+
+def test_matching_etag_returns_304_without_running_view(client):
+    first = client.get("/sma?period=50")
+    etag = first.headers["ETag"].strip('"')
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    second = client.get("/sma?period=50", headers={"If-None-Match": f'"{etag}"'})
+    assert second.status_code == 304
+    assert len(client.calls) == 1
+
+
+def test_new_data_version_invalidates_etag(client, version):
+    etag = client.get("/sma").headers["ETag"]
+    version[0] = "20241019-200"
+
+    assert client.get("/sma", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_async_requests_do_not_match_sync_etag(client):
+    etag = client.get("/sma").headers["ETag"]
+
+    response = client.get("/sma?async=1", headers={"If-None-Match": etag})
+    assert response.status_code == 202
+    assert "ETag" not in response.headers
+
+
+def test_invalid_parameters_run_the_view(client):
+    response = client.get("/sma?period=x", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert len(client.calls) == 1
+
+
+def test_gzip_response_gets_suffixed_etag_and_revalidates(client):
+    response = client.get("/sma", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert b'"rows"' in gzip.decompress(response.data)
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    revalidated = client.get("/sma", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+
+
+def test_small_and_unaccepted_responses_are_not_compressed(client, monkeypatch):
+    assert "Content-Encoding" not in client.get("/sma").headers
+    monkeypatch.setattr(compression.Config, "COMPRESS_MIN_BYTES", 1 << 20)
+    assert "Content-Encoding" not in client.get("/sma", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_streamed_response_is_compressed_incrementally(version):
+    app = Flask(__name__)
+    app.after_request(compress_response)
+
+    @app.route("/csv")
+    def csv():
+        return app.response_class((f"{i},x\n" for i in range(1000)), mimetype="text/csv")
+
+    response = app.test_client().get("/csv", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(response.data).decode().splitlines()[999] == "999,x"
+
+
+def test_request_data_version_is_read_once_per_request(monkeypatch):
+    reads = []
+    monkeypatch.setattr(data_version, "current_data_version", lambda profile="api": reads.append(1) or "v1")
+    app = Flask(__name__)
+
+    with app.test_request_context():
+        assert data_version.request_data_version() == "v1"
+        assert data_version.request_data_version() == "v1"
+    with app.test_request_context():
+        data_version.request_data_version()
+    assert len(reads) == 2
+
+
+def test_etag_uses_the_version_the_view_served(version):
+    app = Flask(__name__)
+
+    @app.route("/rows")
+    @conditional(version_func=lambda: "replica-1")
+    def rows():
+        return jsonify({"rows": []}), 200, {"X-Data-Version": "replica-2"}
+
+    client = app.test_client()
+    etag = client.get("/rows").headers["ETag"].strip('"')
+    assert etag == make_etag("/rows", [], "replica-2")
+
+    version[0] = "replica-2"
+    assert client.get("/rows", headers={"If-None-Match": f'"{etag}"'}).status_code == 200
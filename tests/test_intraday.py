@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.services.bulk_loader import decode_copy_rows
+from app.services.intraday import (COPY_ROW_DTYPE, PG_EPOCH_SECONDS, SESSION_ANCHOR_SECONDS, _parse_timestamps,
+                                   candles_to_rows, downsample, encode_copy_binary)
+
+
+def _epoch(text):
+    return int(datetime.fromisoformat(text).timestamp())
+
+
+def test_parse_timestamps_with_shared_offset():
+    values = ["2024-10-18T09:15:00+05:30", "2024-10-18T15:29:00+05:30"]
+
+    assert _parse_timestamps(values).tolist() == [_epoch(v) for v in values]
+    assert _parse_timestamps(values)[0] == int(datetime(2024, 10, 18, 3, 45, tzinfo=timezone.utc).timestamp())
+
+
+def test_parse_timestamps_utc_and_mixed_offsets():
+    assert _parse_timestamps(["2024-10-18T03:45:00Z"]).tolist() == [_epoch("2024-10-18T03:45:00+00:00")]
+    mixed = ["2024-10-18T09:15:00+05:30", "2024-10-18T03:46:00+00:00"]
+    assert _parse_timestamps(mixed).tolist() == [_epoch(v) for v in mixed]
+
+
+def test_candles_to_rows_encodes_copy_tuples():
+    candles = [
+        ["2024-10-18T09:15:00+05:30", 4100.55, 4110.0, 4099.1, 4105.25, 1200, 0],
+        ["2024-10-18T09:16:00+05:30", 4105.25, 4106.0, 4101.0, 4102.0, 800, 0],
+    ]
+    rows = candles_to_rows(7, candles)
+
+    assert rows.dtype == COPY_ROW_DTYPE
+    assert rows["field_count"].tolist() == [7, 7]
+    assert rows["symbol_id"].tolist() == [7, 7]
+    assert rows["ts"][0] == (_epoch(candles[0][0]) - PG_EPOCH_SECONDS) * 1_000_000
+    assert rows["open"].tolist() == [410055, 410525]
+    assert rows["close"].tolist() == [410525, 410200]
+    assert rows["volume"].tolist() == [1200, 800]
+    assert candles_to_rows(7, []).size == 0
+
+
+def test_encoded_rows_decode_as_binary_copy():
+    rows = candles_to_rows(3, [["2024-10-18T09:15:00+05:30", 1.0, 2.0, 0.5, 1.5, 10, 0]])
+    decoded = decode_copy_rows(encode_copy_binary(rows), COPY_ROW_DTYPE)
+
+    assert decoded.tobytes() == rows.tobytes()
+
+
+def _bars(minutes_after_open, prices, volumes):
+    ts = np.array([86400 * 20000 + SESSION_ANCHOR_SECONDS + m * 60 for m in minutes_after_open], dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.int64)
+    return {"ts": ts, "open": prices, "high": prices + 5, "low": prices - 5, "close": prices,
+            "volume": np.asarray(volumes, dtype=np.int64)}
+
+
+def test_downsample_aligns_to_session_open():
+    bars = _bars([0, 1, 2, 3, 4, 5, 7], [100, 101, 102, 103, 104, 110, 111], [1, 1, 1, 1, 1, 2, 3])
+    five = downsample(bars, 5)
+
+    day_open = 86400 * 20000 + SESSION_ANCHOR_SECONDS
+    assert five["ts"].tolist() == [day_open, day_open + 300]
+    assert five["open"].tolist() == [100, 110]
+    assert five["high"].tolist() == [109, 116]
+    assert five["low"].tolist() == [95, 105]
+    assert five["close"].tolist() == [104, 111]
+    assert five["volume"].tolist() == [5, 5]
+
+
+def test_downsample_skips_empty_buckets_and_passes_through_one_minute():
+    bars = _bars([0, 31], [100, 200], [1, 2])
+
+    assert downsample(bars, 15)["ts"].tolist() == [bars["ts"][0], bars["ts"][0] + 30 * 60]
+    assert downsample(bars, 1) is bars
+    empty = {k: v[:0] for k, v in bars.items()}
+    assert downsample(empty, 5) is empty
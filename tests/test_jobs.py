@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import JobRun
+from app.services import jobs as jobs_module
+from app.services.jobs import JobAlreadyRunning, JobCancelled, JobContext, JobManager
+
+
+class _Registry:
+    """session_scope over an in-memory SQLite copy of the JobRun table."""
+
+    def __init__(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool,
+                                    connect_args={"check_same_thread": False})
+        JobRun.__table__.create(self.engine)
+        with self.engine.begin() as conn:
+            # SQLite needs its own partial index; the model only declares the PostgreSQL one
+            conn.execute(text('DROP INDEX "uq_JobRun_active_dedupeKey"'))
+            conn.execute(text('CREATE UNIQUE INDEX "uq_JobRun_active_dedupeKey" ON "JobRun" ("dedupeKey") '
+                              "WHERE status IN ('queued', 'running')"))
+        self.maker = sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+
+    @contextmanager
+    def session_scope(self, name="api", read_only=False):
+        session = self.maker()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def status(self, job_id):
+        with self.session_scope() as session:
+            return session.get(JobRun, job_id).status
+
+
+class _Executor:
+    """Holds submitted work until the test runs it."""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, fn, *args):
+        self.pending.append((fn, args))
+
+    def run_all(self):
+        while self.pending:
+            fn, args = self.pending.pop(0)
+            fn(*args)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = _Registry()
+    monkeypatch.setattr(jobs_module, "connection_manager", registry)
+    return registry
+
+
+@pytest.fixture
+def manager(registry, monkeypatch):
+    manager = JobManager()
+    manager._executor = _Executor()
+    monkeypatch.setattr(manager, "_ensure_heartbeat", lambda: None)
+    # func.now() + interval is PostgreSQL arithmetic; SQLite compares naive UTC strings
+    monkeypatch.setattr(manager, "_lease_expiry", lambda: datetime.utcnow() + timedelta(minutes=5))
+    return manager
+
+
+def test_duplicate_dedupe_key_raises_with_the_active_job(manager):
+    first = manager.submit("sma_update", lambda job: None, dedupe_key="sma_update:50:2.0")
+
+    with pytest.raises(JobAlreadyRunning) as e:
+        manager.submit("sma_update", lambda job: None, dedupe_key="sma_update:50:2.0")
+    assert e.value.job["job_id"] == first["job_id"]
+
+    manager.submit("sma_update", lambda job: None, dedupe_key="sma_update:20:2.0")
+
+
+def test_finished_job_releases_its_dedupe_key(manager):
+    first = manager.submit("sma_update", lambda job: "done", dedupe_key="k")
+    manager.executor.run_all()
+
+    second = manager.submit("sma_update", lambda job: None, dedupe_key="k")
+    assert second["job_id"] != first["job_id"]
+
+
+def test_expired_lease_is_reaped_and_key_reused(manager, registry):
+    with manager.claim("bhavcopy", "bhavcopy") as job:
+        with registry.session_scope() as session:
+            session.execute(update(JobRun).where(JobRun.id == job.job_id)
+                            .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+
+        second = manager.submit("bhavcopy", lambda job: None, dedupe_key="bhavcopy")
+
+        assert registry.status(job.job_id) == "failed"
+        assert second["status"] == "queued"
+
+
+def test_cancel_is_seen_by_check_cancelled(manager):
+    with pytest.raises(JobCancelled):
+        with manager.claim("update_all_symbols", "update_all_symbols") as job:
+            job.check_cancelled()
+            assert manager.cancel(job.job_id)["cancel_requested"] is True
+            job.check_cancelled()
+
+
+def test_cancel_from_another_worker_is_picked_up_by_flush(manager, registry):
+    with manager.claim("update_all_symbols", "update_all_symbols") as job:
+        with registry.session_scope() as session:
+            session.execute(update(JobRun).where(JobRun.id == job.job_id).values(cancel_requested=True))
+        job.check_cancelled()
+
+        manager._flush([job.job_id])
+        with pytest.raises(JobCancelled):
+            job.check_cancelled()
+
+
+def test_queued_job_cancelled_before_run_never_starts(manager, registry):
+    started = []
+    job = manager.submit("sma_update", lambda context: started.append(context), dedupe_key="k")
+
+    assert manager.cancel(job["job_id"])["status"] == "cancelled"
+    manager.executor.run_all()
+
+    assert started == []
+    assert registry.status(job["job_id"]) == "cancelled"
+    assert job["job_id"] not in manager._local
+
+
+def test_report_progress_is_flushed_with_the_lease(manager, registry, monkeypatch):
+    monkeypatch.setattr(jobs_module, "PROGRESS_FLUSH_SECONDS", 0)
+    with manager.claim("update_all_symbols", "update_all_symbols") as job:
+        assert isinstance(job, JobContext)
+        job.report_progress(done=3, total=10)
+
+        with registry.session_scope() as session:
+            assert session.get(JobRun, job.job_id).progress == {"done": 3, "total": 10}
+    assert registry.status(job.job_id) == "completed"
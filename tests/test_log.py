@@ -0,0 +1,56 @@
+import logging
+
+import pytest
+
+from app.utils import log
+from app.utils.log import RateLimitFilter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(log.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _record(level=logging.INFO, lineno=10, msg="tick %s", args=(1,)):
+    return logging.LogRecord("test", level, "/app/x.py", lineno, msg, args, None)
+
+
+def test_allows_burst_then_drops(clock):
+    limiter = RateLimitFilter(rate=1, burst=3)
+
+    assert [limiter.filter(_record()) for _ in range(5)] == [True, True, True, False, False]
+
+
+def test_refills_and_reports_suppressed(clock):
+    limiter = RateLimitFilter(rate=2, burst=1)
+    assert limiter.filter(_record())
+    assert not limiter.filter(_record())
+    assert not limiter.filter(_record())
+
+    clock[0] += 0.5
+    record = _record()
+    assert limiter.filter(record)
+    assert record.getMessage() == "tick 1 [2 similar messages suppressed]"
+
+    clock[0] += 0.5
+    record = _record()
+    assert limiter.filter(record)
+    assert record.getMessage() == "tick 1"
+
+
+def test_call_sites_have_separate_buckets(clock):
+    limiter = RateLimitFilter(rate=1, burst=1)
+
+    assert limiter.filter(_record(lineno=10))
+    assert limiter.filter(_record(lineno=11))
+    assert not limiter.filter(_record(lineno=10))
+
+
+def test_warnings_and_disabled_rate_pass(clock):
+    limiter = RateLimitFilter(rate=1, burst=1)
+    assert all(limiter.filter(_record(level=logging.WARNING)) for _ in range(5))
+
+    disabled = RateLimitFilter(rate=0, burst=1)
+    assert all(disabled.filter(_record()) for _ in range(5))
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.services import bulk_loader, near_sma, shared_store, snapshot
+from app.services.price_arrays import PriceArrays
+from config import Config
+
+
+def _arrays(close):
+    return PriceArrays(["A"], np.array([0, len(close)]), {"close": np.array(close, dtype=np.float64)})
+
+
+class _FakeStore:
+    def __init__(self, arrays, data_version):
+        self.arrays = arrays
+        self.data_version = data_version
+        self.version = 1
+
+    def get(self):
+        return self.arrays
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    monkeypatch.setattr(Config, "SHARED_STORE_ENABLED", True)
+    monkeypatch.setattr(Config, "SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(shared_store, "shared_price_store", _FakeStore(_arrays([1.0]), "v1"))
+    monkeypatch.setattr(snapshot, "read_manifest", lambda: {"data_version": "v1"})
+    monkeypatch.setattr(snapshot, "load_price_arrays", lambda columns: _arrays([2.0]))
+    monkeypatch.setattr(bulk_loader, "load_price_arrays", lambda columns: _arrays([3.0]))
+
+
+def _first_close(data_version):
+    return near_sma._load_close_arrays(data_version).series("A")[0]
+
+
+def test_current_shared_store_is_used(sources):
+    assert _first_close("v1") == 1.0
+
+
+def test_stale_shared_store_falls_back_to_current_snapshot(sources, monkeypatch):
+    monkeypatch.setattr(snapshot, "read_manifest", lambda: {"data_version": "v2"})
+    assert _first_close("v2") == 2.0
+
+
+def test_stale_store_and_snapshot_fall_back_to_database(sources):
+    assert _first_close("v2") == 3.0
+
+
+def test_unknown_data_version_trusts_caches(sources, monkeypatch):
+    monkeypatch.setattr(near_sma, "current_data_version", lambda: None)
+    assert _first_close(None) == 1.0
@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services import pipeline
+from app.services.jobs import JobAlreadyRunning
+from app.services.pipeline import PipelineScheduler, default_stages
+from app.services.trading_calendar import TradingCalendar
+
+IST = ZoneInfo("Asia/Kolkata")
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    cal = TradingCalendar()
+    # Friday 2024-10-18 and Monday 2024-10-21 are listed holidays
+    cal._holidays = {date(2024, 10, 18), date(2024, 10, 21)}
+    cal._loaded_at = time.monotonic()
+    monkeypatch.setattr(pipeline, "trading_calendar", cal)
+    monkeypatch.setattr(pipeline.Config, "PIPELINE_RUN_AT", "18:30")
+    monkeypatch.setattr(pipeline.Config, "PIPELINE_TIMEZONE", "Asia/Kolkata")
+    return cal
+
+
+def test_next_run_is_today_before_run_time(calendar):
+    now = datetime(2024, 10, 17, 9, 0, tzinfo=IST)
+
+    assert PipelineScheduler().next_run(now) == datetime(2024, 10, 17, 18, 30, tzinfo=IST)
+
+
+def test_next_run_skips_weekends_and_holidays(calendar):
+    now = datetime(2024, 10, 17, 19, 0, tzinfo=IST)
+
+    assert PipelineScheduler().next_run(now) == datetime(2024, 10, 22, 18, 30, tzinfo=IST)
+
+
+def test_ingest_fingerprints_follow_the_latest_session(calendar, monkeypatch):
+    monkeypatch.setattr(calendar, "latest_session", lambda now=None: date(2024, 10, 17))
+    stages = {stage.name: stage for stage in default_stages()}
+
+    assert stages["bhavcopy"].fingerprint() == "2024-10-17"
+    assert stages["gap_fill"].fingerprint() == "2024-10-17"
+
+
+def test_sma_results_stage_holds_the_api_dedupe_key(monkeypatch):
+    monkeypatch.setattr(pipeline.Config, "PIPELINE_SMA_PERIOD", 50)
+    monkeypatch.setattr(pipeline.Config, "PIPELINE_SMA_THRESHOLD", 2.0)
+    claims = []
+
+    @contextmanager
+    def claim(job_type, dedupe_key, params=None):
+        claims.append((job_type, dedupe_key))
+        raise JobAlreadyRunning({"job_id": "api-job"})
+        yield
+
+    monkeypatch.setattr(pipeline.job_manager, "claim", claim)
+    monkeypatch.setattr(pipeline, "update_sma_results", lambda *a: pytest.fail("must not overlap the API job"))
+    stage = {stage.name: stage for stage in default_stages()}["sma_results"]
+
+    with pytest.raises(RuntimeError, match="api-job"):
+        stage.run(lambda **progress: None)
+    assert claims == [("sma_update", "sma_update:50:2.0")]
@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.services.price_arrays import PriceArrays, from_symbol_codes
+
+
+def test_from_symbol_codes_groups_by_name_then_date():
+    names = ["TCS", "INFY", "ABB"]
+    codes = np.array([0, 1, 0, 2, 1, 0])
+    dates = np.array([3, 2, 1, 5, 1, 2])
+    close = np.array([30.0, 22.0, 10.0, 5.0, 21.0, 20.0])
+
+    arrays = from_symbol_codes(names, codes, dates, {"close": close})
+
+    assert arrays.symbols == ["ABB", "INFY", "TCS"]
+    assert arrays.offsets.tolist() == [0, 1, 3, 6]
+    assert arrays.columns["date"].tolist() == [5, 1, 2, 1, 2, 3]
+    assert arrays.series("INFY").tolist() == [21.0, 22.0]
+    assert arrays.series("TCS").tolist() == [10.0, 20.0, 30.0]
+    assert arrays.row_count == 6
+
+
+def test_from_symbol_codes_keeps_symbols_without_rows():
+    arrays = from_symbol_codes(["B", "A"], np.array([0, 0]), np.array([2, 1]), {"close": np.array([2.0, 1.0])})
+
+    assert arrays.symbols == ["A", "B"]
+    assert arrays.offsets.tolist() == [0, 0, 2]
+    assert arrays.series("A").tolist() == []
+    assert arrays.series("B").tolist() == [1.0, 2.0]
+
+
+def test_dropna_rebuilds_offsets():
+    arrays = PriceArrays(["A", "B"], np.array([0, 3, 5]),
+                         {"close": np.array([1.0, np.nan, 3.0, np.nan, np.nan])})
+
+    cleaned = arrays.dropna("close")
+
+    assert cleaned.offsets.tolist() == [0, 2, 2]
+    assert cleaned.series("A").tolist() == [1.0, 3.0]
+    assert [symbol for symbol, _ in cleaned.iter_series(min_rows=1)] == ["A"]
@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.query_profiler import QueryProfiler
+from app.utils.sql import classify
+
+
+def test_record_aggregates_by_fingerprint():
+    profiler = QueryProfiler()
+    profiler.record("api", "SELECT * FROM t WHERE id = 1", {}, 0.010, 1)
+    profiler.record("analytics", "SELECT * FROM t WHERE id = 2", {}, 0.030, 3)
+
+    [summary] = profiler.top()
+    assert summary["count"] == 2
+    assert summary["rows"] == 4
+    assert summary["profiles"] == ["analytics", "api"]
+    assert summary["max_ms"] == 30.0
+    assert profiler.detail(summary["fingerprint_id"])["slowest_statement"] == "SELECT * FROM t WHERE id = 2"
+
+
+def test_executemany_is_timed_but_not_kept_for_explain():
+    profiler = QueryProfiler()
+    statement = "SELECT * FROM t WHERE id = %s"
+    profiler.record("ingest", statement, [(1,), (2,)], 0.5, 2, executemany=True)
+    fingerprint_id = classify(statement).fingerprint_id
+
+    assert profiler.detail(fingerprint_id)["max_ms"] == 500.0
+    assert profiler.detail(fingerprint_id)["slowest_statement"] is None
+    with pytest.raises(ValueError, match="executemany"):
+        profiler.explain(fingerprint_id)
+
+    profiler.record("api", statement, (3,), 0.1, 1)
+    assert profiler.detail(fingerprint_id)["slowest_statement"] == statement
+
+
+def test_explain_rejects_unknown_and_non_select():
+    profiler = QueryProfiler()
+    profiler.record("api", "DELETE FROM t WHERE id = 1", {}, 0.1, 1)
+
+    with pytest.raises(KeyError):
+        profiler.explain("missing")
+    with pytest.raises(ValueError, match="SELECT"):
+        profiler.explain(classify("DELETE FROM t WHERE id = 1").fingerprint_id)
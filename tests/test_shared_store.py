@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from app.services import shared_store
+from app.services.price_arrays import PriceArrays
+from app.services.shared_store import POINTER_NAME, SharedPriceStore, publish
+from config import Config
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SHARED_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _arrays(close):
+    return PriceArrays(["A", "B"], np.array([0, 2, 3]), {"close": np.asarray(close, dtype=np.float64)})
+
+
+def test_publish_and_map(store_dir):
+    version = publish(_arrays([1.0, 2.0, 3.0]), sma_windows=(2,), data_version="20250101-3")
+    store = SharedPriceStore()
+    arrays = store.get()
+
+    assert version == 1
+    assert store.version == 1 and store.data_version == "20250101-3"
+    assert arrays.series("A").tolist() == [1.0, 2.0]
+    assert np.isnan(arrays.columns["sma_2"][0]) and arrays.columns["sma_2"][1] == 1.5
+
+
+def test_concurrent_publishers_get_distinct_versions(store_dir, monkeypatch):
+    original = shared_store._read_pointer
+    barrier = threading.Barrier(2, timeout=0.2)
+
+    def slow_read_pointer():
+        # Without the lock both publishers would read the same pointer before either writes
+        pointer = original()
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return pointer
+
+    monkeypatch.setattr(shared_store, "_read_pointer", slow_read_pointer)
+    versions = []
+    threads = [threading.Thread(target=lambda i=i: versions.append(publish(_arrays([i, i, i]), data_version=str(i))))
+               for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(versions) == [1, 2]
+    pointer = json.loads((store_dir / POINTER_NAME).read_text())
+    assert pointer["version"] == 2
+    assert os.path.exists(store_dir / pointer["file"])
+
+
+def test_get_remaps_when_file_changes_under_same_version(store_dir):
+    publish(_arrays([1.0, 2.0, 3.0]), data_version="v1")
+    store = SharedPriceStore()
+    assert store.get().series("B").tolist() == [3.0]
+
+    pointer_path = store_dir / POINTER_NAME
+    pointer = json.loads(pointer_path.read_text())
+    os.rename(store_dir / pointer["file"], store_dir / "prices.v1.other.bin")
+    publish(_arrays([1.0, 2.0, 9.0]), data_version="v2")
+    newer = json.loads(pointer_path.read_text())
+    newer["version"] = 1
+    os.replace(store_dir / newer["file"], store_dir / "prices.v1.newer.bin")
+    newer["file"] = "prices.v1.newer.bin"
+    tmp = store_dir / "pointer.tmp"
+    tmp.write_text(json.dumps(newer))
+    os.replace(tmp, pointer_path)
+
+    assert store.get().series("B").tolist() == [9.0]
+    assert store.data_version == "v2"
@@ -0,0 +1,174 @@
+import threading
+
+import pytest
+
+from app.services import single_flight as single_flight_module
+from app.services.single_flight import SingleFlight, SingleFlightTimeout
+
+
+class _FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    def add(self, key, value, timeout=None):
+        if key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    def set(self, key, value, timeout=None):
+        self.values[key] = value
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def has(self, key):
+        return key in self.values
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def _start_leader(flight, key, result):
+    """Start a leader blocked inside its computation; returns (release, thread, results)."""
+    entered, release, results = threading.Event(), threading.Event(), []
+
+    def compute():
+        entered.set()
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def lead():
+        try:
+            results.append(flight.do("sma", key, compute))
+        except Exception as e:
+            results.append(e)
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    assert entered.wait(5)
+    return release, thread, results
+
+
+def _start_follower(flight, key):
+    results = []
+
+    def follow():
+        try:
+            results.append(flight.do("sma", key, lambda: pytest.fail("follower must not compute")))
+        except Exception as e:
+            results.append(e)
+
+    thread = threading.Thread(target=follow)
+    thread.start()
+    return thread, results
+
+
+def _wait_for_waiters(flight, key, count):
+    for _ in range(500):
+        with flight._lock:
+            call = flight._calls.get(f"sma:{key}")
+            if call is not None and call.waiters >= count:
+                return
+        threading.Event().wait(0.01)
+    raise AssertionError("follower never joined the in-flight call")
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    release, leader, leader_results = _start_leader(flight, "k", {"rows": 3})
+    follower, follower_results = _start_follower(flight, "k")
+    _wait_for_waiters(flight, "k", 1)
+
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert leader_results == [({"rows": 3}, False)]
+    assert follower_results == [({"rows": 3}, True)]
+    assert flight.in_flight() == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    error = RuntimeError("boom")
+    release, leader, leader_results = _start_leader(flight, "k", error)
+    follower, follower_results = _start_follower(flight, "k")
+    _wait_for_waiters(flight, "k", 1)
+
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert leader_results == [error]
+    assert follower_results == [error]
+
+
+def test_completed_calls_are_not_reused():
+    flight = SingleFlight()
+    calls = []
+
+    assert flight.do("sma", "k", lambda: calls.append(1) or len(calls)) == (1, False)
+    assert flight.do("sma", "k", lambda: calls.append(1) or len(calls)) == (2, False)
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight()
+    release, leader, _ = _start_leader(flight, "a", 1)
+
+    assert flight.do("sma", "b", lambda: 2) == (2, False)
+    release.set()
+    leader.join(5)
+
+
+def test_shared_cache_result_from_another_worker(monkeypatch):
+    cache = _FakeCache()
+    monkeypatch.setattr(single_flight_module, "_shared_cache", lambda: cache)
+    cache.add("single_flight:lock:sma:k", 1)
+    cache.set("single_flight:result:sma:k", {"rows": 7})
+
+    assert SingleFlight().do("sma", "k", lambda: pytest.fail("must use the published result")) == ({"rows": 7}, True)
+
+
+def test_shared_cache_leader_publishes_and_releases(monkeypatch):
+    cache = _FakeCache()
+    monkeypatch.setattr(single_flight_module, "_shared_cache", lambda: cache)
+
+    assert SingleFlight().do("sma", "k", lambda: {"rows": 1}) == ({"rows": 1}, False)
+    assert cache.get("single_flight:result:sma:k") == {"rows": 1}
+    assert not cache.has("single_flight:lock:sma:k")
+
+
+def test_follower_timeout_raises_instead_of_recomputing(monkeypatch):
+    monkeypatch.setattr(single_flight_module.Config, "SINGLE_FLIGHT_WAIT_SECONDS", 0.05)
+    flight = SingleFlight()
+    release, leader, leader_results = _start_leader(flight, "k", {"rows": 1})
+    follower, follower_results = _start_follower(flight, "k")
+    follower.join(5)
+
+    assert len(follower_results) == 1 and isinstance(follower_results[0], SingleFlightTimeout)
+    release.set()
+    leader.join(5)
+    assert leader_results == [({"rows": 1}, False)]
+
+
+def test_remote_lock_held_past_deadline_raises(monkeypatch):
+    monkeypatch.setattr(single_flight_module.Config, "SINGLE_FLIGHT_WAIT_SECONDS", 0.05)
+    monkeypatch.setattr(single_flight_module.Config, "SINGLE_FLIGHT_POLL_SECONDS", 0.01)
+    cache = _FakeCache()
+    monkeypatch.setattr(single_flight_module, "_shared_cache", lambda: cache)
+    cache.add("single_flight:lock:sma:k", 1)
+
+    with pytest.raises(SingleFlightTimeout):
+        SingleFlight().do("sma", "k", lambda: pytest.fail("must not compute while the lock is held"))
+
+
+def test_remote_leader_that_released_without_result_is_recomputed(monkeypatch):
+    cache = _FakeCache()
+    monkeypatch.setattr(single_flight_module, "_shared_cache", lambda: cache)
+    cache.add("single_flight:lock:sma:k", 1)
+    threading.Timer(0.05, cache.delete, ("single_flight:lock:sma:k",)).start()
+
+    assert SingleFlight().do("sma", "k", lambda: {"rows": 2}) == ({"rows": 2}, False)
@@ -0,0 +1,98 @@
+import json
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pytest
+
+from app.services import snapshot
+from config import Config
+
+
+def _write_partition(directory, year, rows):
+    table = pa.table({
+        "symbol": pa.array([r[0] for r in rows], pa.string()),
+        "date": pa.array(np.array([f"{year}-{r[1]}" for r in rows], dtype="datetime64[us]"),
+                         snapshot.SNAPSHOT_SCHEMA.field("date").type),
+        "open": np.array([r[2] for r in rows]),
+        "high": np.array([r[2] for r in rows]),
+        "low": np.array([r[2] for r in rows]),
+        "close": np.array([r[2] for r in rows]),
+        "volume": pa.array([r[3] for r in rows], pa.int64()),
+    }, schema=snapshot.SNAPSHOT_SCHEMA)
+    with pa.OSFile(str(directory / f"year={year}.arrow"), "wb") as sink:
+        with ipc.new_file(sink, snapshot.SNAPSHOT_SCHEMA) as writer:
+            writer.write_table(table)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SNAPSHOT_DIR", str(tmp_path))
+    _write_partition(tmp_path, 2024, [("A", "12-30", 1.0, 10), ("A", "12-31", 2.0, None), ("C", "12-31", 3.0, 5)])
+    _write_partition(tmp_path, 2025, [("A", "01-01", 4.0, 1), ("B", "01-01", np.nan, 2),
+                                      ("C", "01-01", 6.0, 3), ("C", "01-02", 7.0, 4)])
+    manifest = {"format": snapshot.SNAPSHOT_FORMAT, "version": 1, "partitions": {
+        "2024": {"file": "year=2024.arrow"}, "2025": {"file": "year=2025.arrow"}}}
+    (tmp_path / snapshot.MANIFEST_NAME).write_text(json.dumps(manifest))
+    return tmp_path
+
+
+def test_load_merges_partitions_by_symbol(snapshot_dir):
+    arrays = snapshot.load_price_arrays(("close", "volume"))
+
+    assert arrays.symbols == ["A", "B", "C"]
+    assert arrays.offsets.tolist() == [0, 3, 4, 7]
+    assert arrays.series("A").tolist() == [1.0, 2.0, 4.0]
+    assert arrays.series("C").tolist() == [3.0, 6.0, 7.0]
+    assert np.all(np.diff(arrays.columns["date"][0:3]) > np.timedelta64(0))
+    # Missing volume follows the bulk loader convention, missing prices stay NaN
+    assert arrays.series("A", "volume").tolist() == [10, -1, 1]
+    assert np.isnan(arrays.series("B")[0])
+
+
+def test_single_partition_read_is_zero_copy(snapshot_dir):
+    arrays = snapshot.load_price_arrays(("close",), start=date(2025, 1, 1))
+
+    assert arrays.symbols == ["A", "B", "C"]
+    assert arrays.offsets.tolist() == [0, 1, 2, 4]
+    assert not arrays.columns["close"].flags.owndata
+
+
+def test_date_bounds_filter_rows(snapshot_dir):
+    arrays = snapshot.load_price_arrays(("close",), start=date(2024, 12, 31), end=date(2025, 1, 1))
+
+    assert arrays.offsets.tolist() == [0, 2, 3, 5]
+    assert arrays.series("A").tolist() == [2.0, 4.0]
+    assert arrays.series("C").tolist() == [3.0, 6.0]
+
+
+def test_no_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SNAPSHOT_DIR", str(tmp_path))
+    assert snapshot.load_price_arrays(("close",)) is None
+
+
+def test_concurrent_refreshes_run_one_at_a_time(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    monkeypatch.setattr(Config, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(Config, "SHARED_STORE_ENABLED", True)
+    events = []
+
+    def export(since):
+        events.append(("export", since))
+        time.sleep(0.05)
+
+    monkeypatch.setattr(snapshot, "_export_snapshot", export)
+    monkeypatch.setattr(snapshot, "_publish_shared_store", lambda: events.append(("publish", None)))
+
+    threads = [threading.Thread(target=snapshot.refresh_snapshot_after_ingest, args=(date(2025, 1, d),))
+               for d in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert [kind for kind, _ in events] == ["export", "publish", "export", "publish"]
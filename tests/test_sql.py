@@ -0,0 +1,48 @@
+from app.utils.sql import classify, normalize
+
+
+def test_normalize_replaces_literals_and_parameters():
+    statement = """
+        SELECT "close" FROM "HistoricalData1D"  -- latest rows
+        WHERE symbol = 'TCS' AND "date" > %(start)s AND volume > 1500.5 AND id = $1 LIMIT %s
+    """
+
+    assert normalize(statement) == (
+        'SELECT "close" FROM "HistoricalData1D" WHERE symbol = ? AND "date" > ? AND volume > ? AND id = ? LIMIT ?'
+    )
+
+
+def test_normalize_keeps_digits_inside_identifiers():
+    assert normalize('SELECT sma_50 FROM "HistoricalData1D" t1 WHERE t1.x = 3') == (
+        'SELECT sma_50 FROM "HistoricalData1D" t1 WHERE t1.x = ?'
+    )
+
+
+def test_normalize_collapses_in_lists_and_values_rows():
+    assert normalize("SELECT * FROM t WHERE symbol IN ('A', 'B', 'C')") == "SELECT * FROM t WHERE symbol IN (?)"
+    assert normalize("SELECT * FROM t WHERE id IN (%s,%s)") == "SELECT * FROM t WHERE id IN (?)"
+    assert normalize("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y'), (3, 'z')") == (
+        "INSERT INTO t (a, b) VALUES (...)"
+    )
+
+
+def test_normalize_strips_block_comments_and_escaped_quotes():
+    assert normalize("/* job */ SELECT 'it''s' FROM t") == "SELECT ? FROM t"
+
+
+def test_classify_same_shape_shares_fingerprint():
+    first = classify("SELECT * FROM \"StockSymbol\" WHERE symbol = 'TCS'")
+    second = classify("SELECT * FROM \"StockSymbol\" WHERE symbol = 'INFY'")
+
+    assert first.fingerprint_id == second.fingerprint_id
+    assert len(first.fingerprint_id) == 12
+    assert first.operation == "SELECT"
+    assert first.table == "StockSymbol"
+
+
+def test_classify_operation_and_table():
+    assert classify("insert into sma_results (a) values (1)")[2:] == ("INSERT", "sma_results")
+    assert classify('UPDATE "JobRun" SET status = %s')[2:] == ("UPDATE", "JobRun")
+    assert classify("DELETE FROM public.exports WHERE id = 1")[2:] == ("DELETE", "public.exports")
+    assert classify("SELECT 1")[2:] == ("SELECT", "")
+    assert classify("   ")[2:] == ("UNKNOWN", "")
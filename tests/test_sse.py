@@ -0,0 +1,47 @@
+import pytest
+from flask import Flask
+
+from app.utils import sse
+from app.utils.sse import format_event, sse_response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(sse.Config, "SSE_MAX_STREAMS", 1)
+    monkeypatch.setattr(sse.Config, "ADMISSION_RETRY_AFTER_SECONDS", 7)
+    app = Flask(__name__)
+
+    @app.route("/events")
+    def events():
+        return sse_response(iter([("status", {"status": "running"}), ("keepalive", {})]))
+
+    return app.test_client()
+
+
+def test_events_have_no_connection_local_ids():
+    assert format_event("status", {"status": "done"}) == 'event: status\ndata: {"status": "done"}\n\n'
+    assert format_event("keepalive", {}) == ": keepalive\n\n"
+
+
+def test_stream_body_and_headers(client):
+    with client.get("/events") as response:
+        assert response.mimetype == "text/event-stream"
+        assert response.get_data(as_text=True) == ('retry: 5000\n\nevent: status\n'
+                                                   'data: {"status": "running"}\n\n: keepalive\n\n')
+    assert sse._open_streams == 0
+
+
+def test_streams_over_the_cap_get_503_until_one_closes(client):
+    first = client.get("/events")
+    assert first.status_code == 200
+
+    rejected = client.get("/events")
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "7"
+    assert rejected.get_json()["reason"] == "streams_full"
+
+    first.close()
+    assert sse._open_streams == 0
+    with client.get("/events") as second:
+        assert second.status_code == 200
+    assert sse._open_streams == 0
@@ -0,0 +1,71 @@
+import json
+import time
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.services import trading_calendar as calendar_module
+from app.services.trading_calendar import TradingCalendar, load_holidays
+
+# 2024-10-14 is a Monday
+MON, TUE, WED, THU, FRI, SAT, SUN = (date(2024, 10, d) for d in range(14, 21))
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    monkeypatch.setattr(calendar_module.Config, "CALENDAR_REFRESH_SECONDS", 3600)
+    monkeypatch.setattr(calendar_module.Config, "CALENDAR_PUBLISH_TIME", "17:00")
+    cal = TradingCalendar()
+    cal._ingested = {MON, WED, FRI}
+    cal._first, cal._last = MON, FRI
+    cal._holidays = {date(2024, 10, 21)}
+    cal._loaded_at = time.monotonic()
+    return cal
+
+
+def test_ingested_days_are_sessions(calendar):
+    assert calendar.is_trading_day(MON)
+    assert calendar.is_trading_day(FRI)
+
+
+def test_weekday_gap_inside_ingested_range_stays_a_session(calendar):
+    # Nothing was ingested for Tuesday and Thursday; they are missed days, not holidays
+    assert calendar.is_trading_day(TUE)
+    assert calendar.is_trading_day(THU)
+    assert calendar.has_session_between(TUE, TUE)
+
+
+def test_weekends_are_not_sessions(calendar):
+    assert not calendar.is_trading_day(SAT)
+    assert not calendar.is_trading_day(SUN)
+    assert not calendar.has_session_between(SAT, SUN)
+
+
+def test_listed_holiday_is_not_a_session(calendar):
+    assert not calendar.is_trading_day(date(2024, 10, 21))
+    assert not calendar.has_session_between(SAT, date(2024, 10, 21))
+    assert calendar.has_session_between(SAT, date(2024, 10, 22))
+
+
+def test_latest_session_respects_publish_time(calendar):
+    before = datetime(2024, 10, 18, 11, 0, tzinfo=timezone.utc)  # 16:30 IST
+    after = datetime(2024, 10, 18, 11, 45, tzinfo=timezone.utc)  # 17:15 IST
+
+    assert calendar.latest_session(before) == THU
+    assert calendar.latest_session(after) == FRI
+
+
+def test_latest_session_skips_weekend_and_holiday(calendar):
+    monday_evening = datetime(2024, 10, 21, 13, 0, tzinfo=timezone.utc)  # holiday, 18:30 IST
+    saturday = datetime(2024, 10, 19, 13, 0, tzinfo=timezone.utc)
+
+    assert calendar.latest_session(monday_evening) == FRI
+    assert calendar.latest_session(saturday) == FRI
+
+
+def test_load_holidays(tmp_path):
+    path = tmp_path / "holidays.json"
+    path.write_text(json.dumps(["2024-10-21", {"date": "2024-11-01", "name": "Diwali"}, "not-a-date"]))
+
+    assert load_holidays(str(path)) == {date(2024, 10, 21), date(2024, 11, 1)}
+    assert load_holidays(str(tmp_path / "missing.json")) == set()